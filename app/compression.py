@@ -0,0 +1,170 @@
+# app/compression.py
+"""
+响应压缩中间件：按 Accept-Encoding 选择 br / gzip，小于阈值的响应原样返回。
+
+- brotli 为可选依赖：未安装时只做 gzip；
+- 已带 Content-Encoding 的响应（例如预压缩的静态文件）不重复压缩；
+- 整包响应（JSON 接口）一次性压缩；流式响应逐块压缩。
+"""
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # 可选依赖
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+# 已经是压缩格式的内容不再压缩
+_SKIP_CONTENT_TYPES = ("image/", "video/", "audio/", "application/zip", "application/gzip", "font/woff")
+
+
+def accepted_encodings(accept_encoding: str) -> set[str]:
+    """解析 Accept-Encoding，忽略 q=0 的项"""
+    codings = set()
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q=") and params[2:] in ("0", "0.0", "0.00", "0.000"):
+            continue
+        if name:
+            codings.add(name)
+    return codings
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    codings = accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in codings:
+        return "br"
+    if "gzip" in codings:
+        return "gzip"
+    return None
+
+
+class _Encoder:
+    """gzip / brotli 统一的增量压缩接口"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits=31：带 gzip 头
+            self._c = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._c.process(data)
+        return self._c.compress(data)
+
+    def flush(self) -> bytes:
+        if self.encoding == "br":
+            return self._c.flush()
+        return self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._c.finish() if self.encoding == "br" else self._c.flush()
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(
+            send, encoding, self.minimum_size, self.gzip_level, self.brotli_quality
+        )
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, send: Send, encoding: str, minimum_size: int, gzip_level: int, brotli_quality: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.initial_message: Message = {}
+        self.passthrough = False
+        self.started = False
+        self.encoder: Optional[_Encoder] = None
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # 先扣住响应头，等看到第一块 body 再决定是否压缩
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] in (204, 304)
+                or content_type.startswith(_SKIP_CONTENT_TYPES)
+            )
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if self.passthrough:
+            if not self.started:
+                self.started = True
+                await self._send(self.initial_message)
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+            if len(body) < self.minimum_size and not more_body:
+                # 小响应不压缩
+                await self._send(self.initial_message)
+                await self._send(message)
+                self.passthrough = True
+                return
+
+            self.encoder = _Encoder(self.encoding, self.gzip_level, self.brotli_quality)
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body:
+                # 整包响应：一次性压缩，带准确的 Content-Length
+                data = self.encoder.compress(body) + self.encoder.finish()
+                headers["Content-Length"] = str(len(data))
+                message["body"] = data
+                await self._send(self.initial_message)
+                await self._send(message)
+                return
+            # 流式响应：长度未知
+            del headers["Content-Length"]
+            message["body"] = self.encoder.compress(body) + self.encoder.flush()
+            await self._send(self.initial_message)
+            await self._send(message)
+            return
+
+        if more_body:
+            message["body"] = self.encoder.compress(body) + self.encoder.flush()
+        else:
+            message["body"] = self.encoder.compress(body) + self.encoder.finish()
+        await self._send(message)
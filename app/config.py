@@ -25,6 +25,91 @@ class Settings(BaseSettings):
     mysql_user: str = "root"
     mysql_password: str = "rootpass"
     mysql_db: str = "timesheet"
+    # 直接指定主库 URL（如本地用 sqlite:///primary.db 调试）；为空则按上面的 mysql_* 拼接
+    primary_database_url: Optional[str] = None
+    # 只读副本；为空表示不做读写分离
+    replica_database_url: Optional[str] = None
+    # 用户自己写入后的这段时间内，读请求仍走主库（read-your-writes）
+    read_your_writes_seconds: float = 5.0
+    # 连接池（每个 worker 进程各一套；总连接数 ≈ workers × (pool_size + max_overflow)）
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    # 启动时预先建立的连接数，建好之后 worker 才开始接收请求；0 表示不预热
+    db_pool_warm: int = 0
+    # /readyz：SELECT 1 超过该毫秒数即视为未就绪（503）
+    readyz_db_budget_ms: float = 250.0
+
+    # ----- Serve（python -m app.serve） -----
+    web_workers: int = 0                # 0 表示按可用 CPU 数
+    web_max_requests: int = 0           # 每个 worker 处理这么多请求后自动重启（控制内存增长）；0 表示不限
+    web_max_requests_jitter: int = 0    # 在 max_requests 上加随机数，避免所有 worker 同时重启
+    web_graceful_timeout: int = 30      # 退出 / 重载时等待进行中请求的秒数
+    web_ready_timeout: int = 60         # 重载时等待新 worker 就绪的秒数，超时则保留旧 worker
+
+    # ----- HTTP -----
+    json_response: str = "orjson"       # orjson / std
+    compress_min_size: int = 1024       # 小于该字节数的响应不压缩
+    gzip_level: int = 6
+    brotli_quality: int = 4
+    # 响应头 X-DB-Queries 返回每请求 SQL 条数（压测 / 排查用，生产默认关闭）
+    expose_query_count: bool = False
+    # 管理员请求带 X-Profile: 1 时剖析该请求（app/profiling.py）；关闭时不注册中间件
+    profiling_enabled: bool = False
+    profile_interval_ms: float = 5.0    # 采样间隔
+    profile_dir: str = "var/profiles"
+    profile_keep: int = 50              # 只保留最近这么多份
+    # /static 的源目录；构建产物目录（python -m app.static_assets）存在 manifest.json 时优先挂载构建产物
+    static_dir: str = "static"
+    static_build_dir: str = "var/static"
+
+    # ----- 认证接口限流 / 准入（app/ratelimit.py） -----
+    # 以下限额是整个服务的总量；每个 worker 进程各自计数，按 auth_limit_workers 平分
+    ratelimit_enabled: bool = True
+    auth_limit_workers: int = 1                # 平分限额的 worker 数；python -m app.serve 按 --workers 自动设置
+    auth_rate_ip_per_minute: float = 30        # 同一 IP 每分钟的认证请求数
+    auth_rate_ip_burst: int = 10
+    auth_rate_identity_per_minute: float = 10  # 同一手机号 / openid 每分钟的请求数
+    auth_rate_identity_burst: int = 5
+    auth_max_concurrency: int = 8              # 同时进行中的认证请求上限；0 表示不限
+    auth_shed_retry_after: int = 1             # 超过并发上限时 503 的 Retry-After（秒）
+
+    # ----- 用户删除 -----
+    # 硬删除每批删除的工时条数；工时超过一批时 DELETE /users/{id}?purge=true 转为后台任务
+    user_purge_batch: int = 2000
+    # 任务 purge_deleted_users 默认清理软删除超过 N 天的用户
+    user_purge_after_days: int = 30
+
+    # ----- 批量查询（/users/batch 等） -----
+    batch_max_ids: int = 500
+
+    # ----- 参考数据缓存（项目 / 部门） -----
+    # 两次检查 cache_versions 的最小间隔（秒）；0 表示每次读取都检查。本进程的写操作提交后立即失效
+    refcache_check_interval: float = 1.0
+
+    # ----- Audit -----
+    audit_enabled: bool = True
+    audit_queue_max: int = 10000        # 队列上限，满了丢弃（不阻塞请求）
+    audit_batch_size: int = 500
+    audit_flush_interval: float = 1.0   # 秒
+
+    # ----- Timesheet 冷热分层 -----
+    # 默认只查询最近 N 个自然月（命中热分区）；0 表示不裁剪。显式传 from_date/to_date 时按请求范围查询
+    timesheet_hot_months: int = 0
+    # 创建时间早于 N 个自然月之前的记录可由归档任务迁入 timesheets_archive；0 表示不启用归档
+    timesheet_archive_after_months: int = 0
+    # 增量同步（GET /timesheets/changes）：删除记录的墓碑保留天数，由任务 purge_timesheet_tombstones 清理
+    timesheet_tombstone_days: int = 30
+    # 取号后超过该秒数仍未结束的事务视为已中止（进程崩溃等），不再挡住 /timesheets/changes 的低水位
+    timesheet_change_pending_seconds: int = 300
+
+    # ----- Jobs -----
+    jobs_enabled: bool = True
+    job_workers: int = 2                # 每个进程的任务线程数
+    job_poll_interval: float = 2.0      # 秒
+    job_stale_seconds: int = 120        # running 任务超过该时间无心跳视为崩溃遗留
+    job_max_attempts: int = 3
+    job_files_dir: str = "var/jobs"     # 导出文件目录
 
     # ----- WeChat -----
     wechat_appid: Optional[str] = None
@@ -33,6 +118,8 @@ class Settings(BaseSettings):
     # ✅ 计算属性：供 app/db.py 使用
     @property
     def database_url(self) -> str:
+        if self.primary_database_url:
+            return self.primary_database_url
         return (
             f"mysql+pymysql://{self.mysql_user}:{self.mysql_password}"
             f"@{self.mysql_host}:{self.mysql_port}/{self.mysql_db}?charset=utf8mb4"
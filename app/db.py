@@ -1,17 +1,165 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import math
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Depends, Request
+from sqlalchemy import BigInteger, create_engine, event
+from sqlalchemy.dialects.mysql import ENUM as MySQLEnum
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker, DeclarativeBase, Session
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from .config import settings
 
-engine = create_engine(settings.database_url, pool_pre_ping=True, pool_recycle=3600)
+
+def _make_engine(url: str):
+    if url.startswith("sqlite"):
+        # 本地调试 / 基准测试用；线程池里的请求会跨线程使用连接
+        return create_engine(url, connect_args={"check_same_thread": False})
+    return create_engine(
+        url,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+    )
+
+
+engine = _make_engine(settings.database_url)
+# 只读副本（可选）
+replica_engine = _make_engine(settings.replica_database_url) if settings.replica_database_url else None
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReplicaSessionLocal = (
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine) if replica_engine else None
+)
 
 class Base(DeclarativeBase):
     pass
 
+
+def warm_pool(target, n: int) -> int:
+    """预先建立 n 个连接并放回池中，首批请求不再承担建连开销；返回实际建立的连接数"""
+    size = getattr(target.pool, "size", None)
+    if callable(size):
+        # 超出 pool_size 的连接归还时会被直接关闭，预热没有意义
+        n = min(n, size())
+    conns = []
+    try:
+        for _ in range(max(0, n)):
+            conns.append(target.connect())
+    finally:
+        for conn in conns:
+            conn.close()
+    return len(conns)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+# ---------- 读写分离 ----------
+# read-your-writes：请求里提交过写事务时，响应带上截止时间（UNIX 秒）：
+# Cookie ryw_until，同时放在响应头 X-Read-Your-Writes-Until（不保存 Cookie 的客户端在之后的请求头里原样带回）。
+# 截止时间之前该客户端的读请求走主库。状态随客户端走，多 worker / 多实例时请求落到哪个进程都一样；
+# 时间取墙钟，各实例需做时钟同步（误差只影响这几秒的窗口）。
+STICKY_COOKIE = "ryw_until"
+STICKY_HEADER = "X-Read-Your-Writes-Until"
+
+# 中间件放入一个可变状态；同步路由 / 依赖在线程池里运行，会继承上下文并直接写入
+_request_writes: ContextVar[Optional[dict]] = ContextVar("request_writes", default=None)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _remember_write(session: Session) -> None:
+    state = _request_writes.get()
+    if state is not None:
+        state["until"] = time.time() + settings.read_your_writes_seconds
+
+
+def _sticky_until(request: Request) -> Optional[float]:
+    raw = request.headers.get(STICKY_HEADER) or request.cookies.get(STICKY_COOKIE)
+    try:
+        return float(raw) if raw else None
+    except ValueError:
+        return None
+
+
+def wrote_recently(request: Request) -> bool:
+    until = _sticky_until(request)
+    if until is None:
+        return False
+    now = time.time()
+    # 超过窗口长度的值不是本服务发出的，忽略（防止客户端把所有读请求都钉在主库）
+    return now < until <= now + settings.read_your_writes_seconds
+
+
+class ReadYourWritesMiddleware:
+    """未配置副本时不做任何事"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or ReplicaSessionLocal is None:
+            await self.app(scope, receive, send)
+            return
+
+        state: dict = {}
+        token = _request_writes.set(state)
+
+        async def send_with_deadline(message: Message) -> None:
+            until = state.get("until")
+            if message["type"] == "http.response.start" and until is not None:
+                headers = MutableHeaders(scope=message)
+                value = f"{until:.3f}"
+                headers[STICKY_HEADER] = value
+                headers.append(
+                    "Set-Cookie",
+                    f"{STICKY_COOKIE}={value}; Max-Age={math.ceil(settings.read_your_writes_seconds)}; "
+                    f"Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_deadline)
+        finally:
+            _request_writes.reset(token)
+
+
+if ReplicaSessionLocal is not None:
+    @event.listens_for(ReplicaSessionLocal, "before_flush")
+    def _reject_replica_writes(session: Session, flush_context, instances) -> None:
+        raise RuntimeError("replica session is read-only")
+
+
+def get_read_db(request: Request, db: Session = Depends(get_db)):
+    """
+    只读接口使用：配置了副本且调用方近期没有写入时，走副本；否则复用主库会话。
+    会修改数据的接口一律使用 get_db。
+    """
+    if ReplicaSessionLocal is None or wrote_recently(request):
+        yield db
+        return
+    rdb = ReplicaSessionLocal()
+    try:
+        yield rdb
+    finally:
+        rdb.close()
+
+
+# ---------- SQLite 兼容（仅本地调试 / 基准测试） ----------
+@compiles(MySQLEnum, "sqlite")
+def _mysql_enum_on_sqlite(type_, compiler, **kw):
+    return "VARCHAR(32)"
+
+
+@compiles(BigInteger, "sqlite")
+def _bigint_on_sqlite(type_, compiler, **kw):
+    # SQLite 只有 INTEGER PRIMARY KEY 才会自增
+    return "INTEGER"
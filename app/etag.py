@@ -0,0 +1,62 @@
+# app/etag.py
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+
+def weak_etag(*parts: Any) -> str:
+    """
+    由若干廉价的“变更标记”（cache_versions 版本号、change_seq、count、调用者身份等）拼出弱 ETag。
+    只要标记不变，就认为结果集没有变化。
+    """
+    raw = "|".join("" if p is None else str(p) for p in parts)
+    return 'W/"%s"' % hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 使用弱比较：忽略 W/ 前缀；支持逗号分隔的多个值与 *"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = etag.removeprefix("W/")
+    return any(t.strip().removeprefix("W/") == target for t in if_none_match.split(","))
+
+
+def conditional_response(request: Request, response: Response, *markers: Any) -> Optional[Response]:
+    """
+    列表接口的条件 GET：
+    - 以 路径 + 查询串 + markers 计算 ETag；
+    - 客户端 If-None-Match 命中时直接返回 304（跳过查询明细与序列化）；
+    - 否则把 ETag 写进响应头并返回 None，调用方继续正常处理。
+
+    markers 里应包含调用者身份（不同角色看到的结果不同），以及过滤后结果集的变更标记。
+    """
+    etag = weak_etag(request.url.path, request.url.query, *markers)
+    headers = {
+        "ETag": etag,
+        # 允许缓存但每次都要回源校验；结果依赖登录身份
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+# ---------- 单条记录的乐观锁 ----------
+def version_etag(version: int) -> str:
+    """单条记录的强 ETag：直接用版本号，客户端原样放进 If-Match"""
+    return '"%d"' % version
+
+
+def if_match_fails(if_match: Optional[str], etag: str) -> bool:
+    """
+    If-Match 使用强比较（弱 ETag 不匹配任何值）；未带 If-Match 或为 * 时视为通过（记录存在）。
+    返回 True 表示前提条件不成立，调用方应返回 412。
+    """
+    if not if_match or if_match.strip() == "*":
+        return False
+    return all(t.strip() != etag for t in if_match.split(","))
@@ -0,0 +1,76 @@
+# app/fields.py
+"""
+查询参数解析：稀疏字段集（?fields=a,b,c）与批量 id（?ids=1,2,3）。
+
+稀疏字段集：
+
+- parse_fields：字段名必须是响应模型里的字段，否则 400；id 总是包含；按模型定义顺序返回元组；
+- partial_model：按字段集裁剪出的 Pydantic 模型，按 (模型, 字段集) 缓存，同一组合只创建一次；
+- 路由只 SELECT 字段集对应的列，序列化时用 dump() + sparse_response() 输出，
+  绕过路由声明的完整 response_model（完整模型会因缺少字段校验失败）。
+
+批量 id：parse_ids 去重并保持请求顺序，个数上限 settings.batch_max_ids。
+"""
+from functools import lru_cache
+from typing import Any, Iterable, Optional
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel, TypeAdapter, create_model
+
+from app.config import settings
+from app.responses import get_json_response_class
+
+ALWAYS = ("id",)
+_json_response_class = get_json_response_class(settings.json_response)
+
+
+def parse_fields(raw: Optional[str], allowed: Iterable[str]) -> Optional[tuple[str, ...]]:
+    """未传 fields 时返回 None（完整输出）"""
+    if raw is None or not raw.strip():
+        return None
+    allowed = list(allowed)
+    requested = {f.strip() for f in raw.split(",") if f.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"unknown fields: {', '.join(sorted(unknown))}")
+    requested.update(ALWAYS)
+    return tuple(f for f in allowed if f in requested)
+
+
+def parse_ids(raw: str) -> list[int]:
+    try:
+        ids = [int(v) for v in raw.split(",") if v.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise HTTPException(status_code=400, detail="ids required")
+    if len(ids) > settings.batch_max_ids:
+        raise HTTPException(status_code=400, detail=f"at most {settings.batch_max_ids} ids per request")
+    return ids
+
+
+@lru_cache(maxsize=256)
+def partial_model(model: type[BaseModel], fields: tuple[str, ...]) -> type[BaseModel]:
+    return create_model(
+        f"{model.__name__}Partial",
+        __config__=model.model_config,
+        **{f: (model.model_fields[f].annotation, model.model_fields[f]) for f in fields},
+    )
+
+
+@lru_cache(maxsize=256)
+def _list_adapter(model: type[BaseModel], fields: tuple[str, ...]) -> TypeAdapter:
+    return TypeAdapter(list[partial_model(model, fields)])
+
+
+def dump(model: type[BaseModel], fields: tuple[str, ...], rows: list) -> list[dict]:
+    """按裁剪后的模型校验 rows，转成可直接 JSON 序列化的 dict 列表"""
+    adapter = _list_adapter(model, fields)
+    return adapter.dump_python(adapter.validate_python(rows), mode="json")
+
+
+def sparse_response(content: Any, response: Response) -> Response:
+    """直接返回响应对象时，FastAPI 不会合并注入的 response 上已写好的头（ETag、X-Next-Cursor 等），这里带上"""
+    headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+    return _json_response_class(content, headers=headers)
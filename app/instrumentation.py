@@ -0,0 +1,59 @@
+# app/instrumentation.py
+"""
+每请求 SQL 语句计数：开启 settings.expose_query_count 后，
+响应头 X-DB-Queries 返回本次请求执行的语句数（供 bench/load.py 统计 queries-per-request）。
+未开启时不注册监听器与中间件，没有任何开销。
+"""
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class _Counter:
+    __slots__ = ("n",)
+
+    def __init__(self) -> None:
+        self.n = 0
+
+
+# 中间件放入一个可变计数器；同步路由在线程池里运行，会继承上下文并直接累加
+_current: ContextVar[Optional[_Counter]] = ContextVar("db_query_counter", default=None)
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+    counter = _current.get()
+    if counter is not None:
+        counter.n += 1
+
+
+def install_query_counter() -> None:
+    if not event.contains(Engine, "before_cursor_execute", _count_statement):
+        event.listen(Engine, "before_cursor_execute", _count_statement)
+
+
+class QueryCountMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        install_query_counter()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        counter = _Counter()
+        token = _current.set(counter)
+
+        async def send_with_count(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-DB-Queries"] = str(counter.n)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            _current.reset(token)
@@ -1,14 +1,42 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from . import warmup
 from .config import settings
 from .routers import auth, projects, timesheets, reports, users, departments
-from fastapi.staticfiles import StaticFiles
-from .routers import auth_wechat
+from .routers import auth_wechat, audit, jobs, approvals, profiles
+from .services import audit as audit_service
+from .services.jobs import runner as job_runner
+from .compression import CompressionMiddleware
+from .db import STICKY_HEADER, ReadYourWritesMiddleware
+from .instrumentation import QueryCountMiddleware
+from .profiling import ProfileMiddleware
+from .responses import get_json_response_class
+from .static_assets import AssetStaticFiles, load_manifest
 
-app = FastAPI(title=settings.app_name)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 先预热（连接池、ORM 映射、参考数据、语句缓存）再接流量；
+    # python -m app.serve 以 lifespan 完成作为 worker 就绪信号，编排系统看 /readyz
+    warmup.run()
+    audit_service.writer.start()
+    if settings.jobs_enabled:
+        job_runner.start()
+    yield
+    job_runner.stop()
+    # 关闭前把审计队列写完
+    audit_service.writer.stop()
 
-#挂载静态文件目录
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app = FastAPI(
+    title=settings.app_name,
+    lifespan=lifespan,
+    default_response_class=get_json_response_class(settings.json_response),
+)
+
+#挂载静态文件目录：有构建产物（指纹 + 预压缩）时用构建产物，否则直接挂源目录
+_static_dir = settings.static_build_dir if load_manifest(settings.static_build_dir) else settings.static_dir
+app.mount("/static", AssetStaticFiles(directory=_static_dir), name="static")
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,8 +44,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-DB-Queries", "X-Profile-Id", "Retry-After", STICKY_HEADER],
 )
 
+# 写入后的读请求走主库：截止时间放在 Cookie / 响应头里随客户端走（见 app/db.py）
+app.add_middleware(ReadYourWritesMiddleware)
+
+# 大响应按 br / gzip 压缩（阈值见 settings.compress_min_size）
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compress_min_size,
+    gzip_level=settings.gzip_level,
+    brotli_quality=settings.brotli_quality,
+)
+
+if settings.expose_query_count:
+    app.add_middleware(QueryCountMiddleware)
+
+if settings.profiling_enabled:
+    app.add_middleware(ProfileMiddleware)
+
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(projects.router, tags=["projects"])
 app.include_router(timesheets.router, tags=["timesheets"])
@@ -25,11 +71,21 @@ app.include_router(reports.router, tags=["reports"])
 app.include_router(users.router, tags=["users"])
 app.include_router(auth_wechat.router, tags=["auth-wechat"])
 app.include_router(departments.router, tags=["departments"])
+app.include_router(audit.router, tags=["audit"])
+app.include_router(jobs.router, tags=["jobs"])
+app.include_router(approvals.router, tags=["approvals"])
+app.include_router(profiles.router, tags=["profiles"])
 
 @app.get("/healthz")
 def healthz():
     return {"status": "ok", "env": settings.app_env}
 
+@app.get("/readyz")
+def readyz():
+    """预热完成且数据库在延迟预算内应答才返回 200，否则 503（编排系统据此决定是否转发流量）"""
+    ready, body = warmup.readiness()
+    return JSONResponse(body, status_code=200 if ready else 503)
+
 @app.get("/ping")
 def ping():
     return {"ok": True, "msg": "hello from FastAPI"}
\ No newline at end of file
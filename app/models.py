@@ -16,6 +16,15 @@ user_departments = Table(
     UniqueConstraint("user_id", "department_id", name="uq_user_department")
 )
 
+# 部门层级闭包表：每对（祖先, 后代）一行，含自身（depth=0）；由 app/services/department_tree.py 维护
+department_closure = Table(
+    "department_closure",
+    Base.metadata,
+    Column("ancestor_id", Integer, ForeignKey("departments.id", ondelete="CASCADE"), primary_key=True),
+    Column("descendant_id", Integer, ForeignKey("departments.id", ondelete="CASCADE"), primary_key=True),
+    Column("depth", Integer, nullable=False),
+)
+
 class Department(Base):
     __tablename__ = "departments"
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -23,11 +32,12 @@ class Department(Base):
     parent_id = Column(BigInteger)
 
     # 反向：部门下的员工（多对多）
+    # 关系一律按需懒加载；需要预取时在查询里显式 selectinload/joinedload
     users = relationship(
         "User",
         secondary=user_departments,
         back_populates="departments",
-        lazy="selectin"
+        lazy="select"
     )
 
 class RoleEnum(str, enum.Enum):
@@ -78,17 +88,22 @@ class User(Base):
         default="first_come",
         nullable=True,
     )
+    # 软删除时间；非空的用户不能登录，也不出现在用户列表中（硬删除见 app/services/users.purge_user）
+    deleted_at = Column(DateTime, nullable=True, index=True)
+
+    # 不再 selectin：否则每次 get_current_user 都会把该用户全部工时/部门一起拉出来
+    # 不做 ORM 级联删除：删除用户时由 purge_user 分批集合 DELETE，passive_deletes 避免加载全部工时
     timesheets = relationship(
         "Timesheet",
         back_populates="user",
-        cascade="all, delete-orphan",
-        lazy="selectin",
+        lazy="select",
+        passive_deletes="all",
     )
     departments = relationship(
         "Department",
         secondary=user_departments,
         back_populates="users",
-        lazy="selectin"
+        lazy="select"
     )
 
 class Project(Base):
@@ -107,6 +122,21 @@ class Task(Base):
     project_id = Column(BigInteger, nullable=False)
     name = Column(String(128), nullable=False)
 
+def _detail_field(name: str):
+    """把 TimesheetDetail 的字段代理到 Timesheet 上：读取时按需加载明细，写入非空值时才创建明细行"""
+    def fget(self):
+        return getattr(self.detail, name) if self.detail is not None else None
+
+    def fset(self, value):
+        if self.detail is None:
+            if value is None:
+                return
+            self.detail = TimesheetDetail()
+        setattr(self.detail, name, value)
+
+    return property(fget, fset)
+
+
 class Timesheet(Base):
     __tablename__ = "timesheets"
 
@@ -124,20 +154,16 @@ class Timesheet(Base):
     fill_id = Column(Text, nullable=True)                  # 填写ID
     answer_time = Column(Text, nullable=True)              # 答题时间
     nickname = Column(Text, nullable=True)                 # 昵称
-    weekly_summary = Column(Text, nullable=True)           # 本周完成情况说明
     project_group_filter = Column(Text, nullable=True)     # 项目群筛选
     director_filter = Column(Text, nullable=True)          # 室主任筛选
     week_no = Column(Text, nullable=True)                  # 周数
     pm_reduce_hours = Column(Text, nullable=True)          # 项目负责人核减工时数（字符串）
     identified_by = Column(Text, nullable=True)            # 认定人
-    reduce_desc = Column(Text, nullable=True)              # 核减情况说明
     director_reduce_hours = Column(Text, nullable=True)    # 室主任核减工时（字符串）
     group_reduce_hours = Column(Text, nullable=True)       # 项目群核减工时（字符串）
-    reason_desc = Column(Text, nullable=True)              # 原因情况说明
 
     # 其它原有字段保留
     overtime = Column(Boolean, default=False)
-    note = Column(Text)
     attach_url = Column(String)
     geo_lat = Column(Float, nullable=True)
     geo_lng = Column(Float, nullable=True)
@@ -145,13 +171,84 @@ class Timesheet(Base):
 
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    # 增量同步的变更序号：每次新增 / 修改 / 审批时取全局递增的新值（app/services/timesheet_sync.py）
+    change_seq = Column(BigInteger, nullable=False, default=0)
+    # 乐观锁版本号：ORM 的 UPDATE/DELETE 带上 WHERE version = 读到的值，并发修改时抛 StaleDataError；
+    # 绕过 ORM 的批量 UPDATE 需自行 version = version + 1
+    version = Column(Integer, nullable=False, default=1)
 
+    __mapper_args__ = {"version_id_col": version}
+
+    # 列表接口从不使用 user；需要时在查询里显式 joinedload(Timesheet.user)
     user = relationship(
         "User",
         back_populates="timesheets",
-        lazy="joined",   # 或者 "selectin"，二选一
+        lazy="select",
     )
 
+    # 长文本在 timesheet_details（1:1，按需加载）；分区表不支持外键，关联条件显式声明
+    detail = relationship(
+        "TimesheetDetail",
+        primaryjoin="Timesheet.id == foreign(TimesheetDetail.timesheet_id)",
+        uselist=False,
+        lazy="select",
+        cascade="all, delete-orphan",
+    )
+    weekly_summary = _detail_field("weekly_summary")
+    reduce_desc = _detail_field("reduce_desc")
+    reason_desc = _detail_field("reason_desc")
+    note = _detail_field("note")
+
+
+class TimesheetDetail(Base):
+    """
+    工时的长文本字段，与 timesheets 一对一（见 migrations/009）。热表只保留定长 / 短字段，
+    列表、计数、审批扫描的行更窄；需要文本时按主键批量补齐（timesheet_store.attach_details）。
+    归档只搬迁 timesheets 的行，明细按 timesheet_id 保留在本表。
+    """
+    __tablename__ = "timesheet_details"
+    timesheet_id = Column(BigInteger, primary_key=True)
+    weekly_summary = Column(Text, nullable=True)           # 本周完成情况说明
+    reduce_desc = Column(Text, nullable=True)              # 核减情况说明
+    reason_desc = Column(Text, nullable=True)              # 原因情况说明
+    note = Column(Text, nullable=True)
+
+# 冷数据归档表：列与 timesheets 一致（不带外键），由归档任务搬迁已关闭月份的数据（见 migrations/005）
+timesheets_archive = Table(
+    "timesheets_archive",
+    Base.metadata,
+    *(Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable)
+      for c in Timesheet.__table__.columns),
+)
+
+# 已删除工时的墓碑：增量同步时告知客户端删掉本地副本；保留 settings.timesheet_tombstone_days 天
+class TimesheetTombstone(Base):
+    __tablename__ = "timesheet_tombstones"
+    change_seq = Column(BigInteger, primary_key=True)
+    timesheet_id = Column(BigInteger, primary_key=True)
+    user_id = Column(BigInteger, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+# 变更序号分配（app/services/timesheet_sync.py）：AUTO_INCREMENT 取号不持有事务级锁；
+# 表里只留下“已取号、事务未结束”的行，业务事务提交时删掉自己那一行
+timesheet_change_seq = Table(
+    "timesheet_change_seq",
+    Base.metadata,
+    Column("seq", BigInteger, primary_key=True, autoincrement=True),
+    Column("created_at", DateTime, nullable=False, index=True),
+    sqlite_autoincrement=True,
+)
+
+# 全文检索（app/services/timesheet_search.py）：MySQL 直接用 timesheet_details 上的 ngram FULLTEXT 索引；
+# 其它数据库（SQLite 调试 / 测试）用该倒排表代替
+timesheet_search_terms = Table(
+    "timesheet_search_terms",
+    Base.metadata,
+    Column("term", String(32), primary_key=True),
+    Column("timesheet_id", BigInteger, primary_key=True),
+    Column("tf", Integer, nullable=False),
+)
+
 class AuditLog(Base):
     __tablename__ = 'audit_logs'
     id = Column(BigInteger, primary_key=True, autoincrement=True)
@@ -161,3 +258,32 @@ class AuditLog(Base):
     entity_id = Column(BigInteger)
     detail = Column(JSON)
     created_at = Column(TIMESTAMP, server_default=func.current_timestamp())
+
+class Job(Base):
+    """后台任务（导出、批量审批等），由 app/services/jobs.py 的 JobRunner 执行"""
+    __tablename__ = "jobs"
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    type = Column(String(64), nullable=False)
+    # queued / running / succeeded / failed / cancelled
+    status = Column(String(16), nullable=False, default="queued")
+    params = Column(JSON)
+    progress = Column(Float, nullable=False, default=0.0)   # 0~100
+    message = Column(String(255))
+    result = Column(JSON)
+    result_path = Column(String(512))                       # 可下载的结果文件
+    error = Column(Text)
+    attempts = Column(Integer, nullable=False, default=0)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    worker = Column(String(128))                            # host:pid
+    created_by = Column(BigInteger)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+
+class CacheVersion(Base):
+    """参考数据缓存的版本号（app/refcache.py）；写操作在同一事务里 +1，各 worker 据此判断缓存是否过期"""
+    __tablename__ = "cache_versions"
+    name = Column(String(64), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP, server_default=func.current_timestamp(), onupdate=func.current_timestamp())
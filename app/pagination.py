@@ -0,0 +1,75 @@
+# app/pagination.py
+"""
+游标（keyset）分页工具：
+- 游标是排序键 + id 的不透明编码（base64 JSON），客户端原样回传；
+- 用 (sort_col, id) 做严格大于/小于比较，翻页代价与页码无关，只要 (sort_col, id) 上有索引即可。
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in values],
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int, types: Optional[Sequence[type]] = None) -> list:
+    """
+    解码游标；给出 types（int / float / str / datetime，与值一一对应）时顺带校验并还原类型，
+    客户端篡改过的游标统一返回 400，而不是在后面的 int() / 比较里变成 500。
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    if types is not None:
+        values = [cursor_value(v, t) for v, t in zip(values, types)]
+    return values
+
+
+def cursor_value(value: Any, kind: type) -> Any:
+    """游标里的单个值按 kind 校验 / 还原；不符合时 400"""
+    if kind is datetime:
+        return parse_datetime(value)
+    if kind is float:
+        ok = isinstance(value, (int, float))
+    else:
+        ok = isinstance(value, kind)
+    if not ok or isinstance(value, bool):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    return value
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """游标里的时间以 isoformat 存储，比较前还原成 datetime"""
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+
+
+def keyset_after(columns: Sequence, values: Sequence, desc: bool = False):
+    """
+    生成“位于游标之后”的条件，等价于 (c1, c2, ...) > (v1, v2, ...)（desc 时为 <），
+    展开成 OR/AND 形式以便 MySQL / SQLite 都能走索引范围扫描。
+    """
+    clauses = []
+    for i, (col, val) in enumerate(zip(columns, values)):
+        cmp = col < val if desc else col > val
+        eqs = [c == v for c, v in zip(columns[:i], values[:i])]
+        clauses.append(and_(*eqs, cmp) if eqs else cmp)
+    return or_(*clauses)
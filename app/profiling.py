@@ -0,0 +1,223 @@
+# app/profiling.py
+"""
+按需剖析单个请求（仅管理员）：开启 settings.profiling_enabled 后，
+管理员请求带上 X-Profile: 1，本次请求期间：
+
+- 采样线程每 settings.profile_interval_ms 毫秒抓一次调用栈（sys._current_frames），
+  只保留处理本请求的线程：事件循环线程 + 执行过本请求 SQL 的线程池线程，空闲栈（等待锁 / 队列 / select）丢弃；
+- 同时记录本请求执行的每条 SQL 及耗时（不记录参数，避免把密码、手机号写进文件）；
+- 结束后写入 settings.profile_dir/<id>.json，响应头 X-Profile-Id 返回 id，
+  通过 GET /admin/profiles/{id}?format=folded 下载 folded stacks（flamegraph.pl / speedscope 可直接打开）。
+
+未开启时不注册中间件；开启后未带 X-Profile 头的请求只多一次请求头查找。
+非管理员带 X-Profile 头时按普通请求处理。SQL 监听器在第一次剖析时才注册。
+"""
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.db import SessionLocal
+from app.security import get_current_user, require_admin
+
+_MAX_DEPTH = 128
+# 栈顶落在这些模块里视为空闲（线程在等锁 / 队列，事件循环在 select）
+_IDLE_MODULES = ("threading.py", "selectors.py", "queue.py")
+_ID_CHARS = set("0123456789abcdef")
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, interval: float) -> None:
+        super().__init__(name="request-profiler", daemon=True)
+        self.interval = interval
+        self.samples: list[tuple[int, tuple[str, ...]]] = []
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        me = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            for tid, frame in sys._current_frames().items():
+                if tid != me:
+                    stack = _stack(frame)
+                    if stack is not None:
+                        self.samples.append((tid, stack))
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename.replace("\\", "/")
+    short = "/".join(path.rsplit("/", 2)[-2:])
+    # folded 格式以 ; 分隔栈帧、以空格分隔计数
+    return f"{code.co_name} ({short}:{code.co_firstlineno})".replace(";", ",")
+
+
+def _stack(frame) -> Optional[tuple[str, ...]]:
+    if frame.f_code.co_filename.endswith(_IDLE_MODULES):
+        return None
+    names = []
+    while frame is not None and len(names) < _MAX_DEPTH:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return tuple(reversed(names))
+
+
+class _Profile:
+    def __init__(self) -> None:
+        self.id = uuid.uuid4().hex
+        # 事件循环线程；同步路由 / 依赖在线程池里执行，执行 SQL 时把所在线程记进来
+        self.threads = {threading.get_ident()}
+        self.statements: list[dict] = []
+
+
+_current: ContextVar[Optional[_Profile]] = ContextVar("request_profile", default=None)
+_started_at: ContextVar[Optional[float]] = ContextVar("request_profile_sql_started", default=None)
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.threads.add(threading.get_ident())
+        _started_at.set(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    profile = _current.get()
+    started = _started_at.get()
+    if profile is not None and started is not None:
+        profile.statements.append({
+            "sql": statement,
+            "ms": round((time.perf_counter() - started) * 1000, 3),
+            "executemany": executemany,
+        })
+
+
+def _install_sql_listeners() -> None:
+    if not event.contains(Engine, "before_cursor_execute", _before_execute):
+        event.listen(Engine, "before_cursor_execute", _before_execute)
+        event.listen(Engine, "after_cursor_execute", _after_execute)
+
+
+# ---------- 存储 ----------
+def profile_path(profile_id: str) -> Optional[str]:
+    """id 不合法时返回 None（防止路径穿越）"""
+    if len(profile_id) != 32 or not set(profile_id) <= _ID_CHARS:
+        return None
+    return os.path.join(settings.profile_dir, f"{profile_id}.json")
+
+
+def folded(samples: list[list]) -> str:
+    """[[stack, count], ...] -> folded stacks 文本"""
+    return "".join(f"{stack} {count}\n" for stack, count in samples)
+
+
+def _save(data: dict) -> None:
+    os.makedirs(settings.profile_dir, exist_ok=True)
+    with open(profile_path(data["id"]), "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    # 只保留最近 settings.profile_keep 个
+    files = sorted(
+        (os.path.join(settings.profile_dir, name) for name in os.listdir(settings.profile_dir)
+         if name.endswith(".json")),
+        key=os.path.getmtime,
+    )
+    for path in files[:max(0, len(files) - settings.profile_keep)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _is_admin(token: str) -> bool:
+    with SessionLocal() as db:
+        try:
+            user = get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token), db)
+            require_admin(user)
+        except HTTPException:
+            return False
+    return True
+
+
+def _bearer_token(scope: Scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return token.strip() if scheme.lower() == "bearer" and token.strip() else None
+    return None
+
+
+def _wants_profile(scope: Scope) -> bool:
+    return any(name == b"x-profile" and value not in (b"", b"0") for name, value in scope["headers"])
+
+
+class ProfileMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        token = _bearer_token(scope)
+        if token is None or not await run_in_threadpool(_is_admin, token):
+            await self.app(scope, receive, send)
+            return
+
+        _install_sql_listeners()
+        profile = _Profile()
+        status = {"code": None}
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                MutableHeaders(scope=message)["X-Profile-Id"] = profile.id
+            await send(message)
+
+        ctx_token = _current.set(profile)
+        sampler = _Sampler(settings.profile_interval_ms / 1000.0)
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop()
+            elapsed = time.perf_counter() - started
+            _current.reset(ctx_token)
+
+            counts: dict[str, int] = {}
+            for tid, stack in sampler.samples:
+                if tid in profile.threads:
+                    key = ";".join(stack)
+                    counts[key] = counts.get(key, 0) + 1
+            data = {
+                "id": profile.id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "status": status["code"],
+                "started_at": started_at.isoformat(),
+                "duration_ms": round(elapsed * 1000, 3),
+                "interval_ms": settings.profile_interval_ms,
+                "samples": sorted(([k, v] for k, v in counts.items()), key=lambda kv: -kv[1]),
+                "sql": profile.statements,
+                "sql_ms": round(sum(s["ms"] for s in profile.statements), 3),
+            }
+            await run_in_threadpool(_save, data)
@@ -0,0 +1,127 @@
+# app/ratelimit.py
+"""
+认证类接口的准入控制（全部在进程内，多 worker 时各自计数）：
+
+- 令牌桶限流：按客户端 IP、手机号、openid 分别限速，超出返回 429 + Retry-After；
+- 全局并发上限：同时进行中的认证请求（bcrypt、微信接口、建用户）超过上限时直接返回 503 + Retry-After，
+  不排队，保证工时提交等其它接口还有 worker 可用。
+
+用法：路由加 Depends(auth_admission)（IP 限流 + 并发名额），
+拿到手机号 / openid 后再调用 limit_identity("mobile", body.mobile)。
+
+配置里的限额是整个服务的总量。桶和并发名额都在进程内，不跨 worker 共享，
+所以按 settings.auth_limit_workers（python -m app.serve 按 --workers 下发）平分到每个进程；
+连接由内核在 worker 间大致均匀分配，合计约等于配置值。SIGTTIN 临时加的 worker 不会重新平分。
+"""
+import math
+import threading
+import time
+from typing import Optional
+
+from fastapi import HTTPException, Request
+
+from app.config import settings
+
+
+class TokenBucketLimiter:
+    def __init__(self, per_minute: float, burst: int, max_keys: int = 100_000):
+        self.rate = per_minute / 60.0        # 每秒补充的令牌数
+        self.burst = max(1, burst)
+        self.max_keys = max_keys
+        self._buckets: dict[str, tuple[float, float]] = {}   # key -> (剩余令牌, 上次更新时间)
+        self._lock = threading.Lock()
+
+    def hit(self, key: str) -> Optional[float]:
+        """消耗一个令牌；被限流时返回需要等待的秒数，否则返回 None"""
+        if self.rate <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+            if tokens < 1.0:
+                self._buckets[key] = (tokens, now)
+                return (1.0 - tokens) / self.rate
+            if key not in self._buckets and len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            self._buckets[key] = (tokens - 1.0, now)
+            return None
+
+    def _prune(self, now: float) -> None:
+        # 已经回满的桶与不存在等价，可以丢掉
+        full_after = self.burst / self.rate
+        for k in [k for k, (_, last) in self._buckets.items() if now - last >= full_after]:
+            del self._buckets[k]
+
+
+class ConcurrencyLimiter:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._sem = threading.BoundedSemaphore(limit) if limit > 0 else None
+
+    def try_acquire(self) -> bool:
+        return self._sem is None or self._sem.acquire(blocking=False)
+
+    def release(self) -> None:
+        if self._sem is not None:
+            self._sem.release()
+
+
+def per_worker(total: float, workers: int) -> float:
+    """服务总限额平分到每个 worker 进程"""
+    return total / max(1, workers)
+
+
+def per_worker_count(total: int, workers: int) -> int:
+    """名额 / 突发量按 worker 平分并向上取整（至少 1）；0 表示不限，保持不变"""
+    return math.ceil(total / max(1, workers)) if total > 0 else 0
+
+
+_workers = settings.auth_limit_workers
+ip_limiter = TokenBucketLimiter(per_worker(settings.auth_rate_ip_per_minute, _workers),
+                                per_worker_count(settings.auth_rate_ip_burst, _workers))
+identity_limiter = TokenBucketLimiter(per_worker(settings.auth_rate_identity_per_minute, _workers),
+                                      per_worker_count(settings.auth_rate_identity_burst, _workers))
+auth_slots = ConcurrencyLimiter(per_worker_count(settings.auth_max_concurrency, _workers))
+
+
+def _too_many(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many requests, please retry later",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def client_ip(request: Request) -> str:
+    # 反向代理后的真实 IP 由 uvicorn 的 proxy_headers 处理（见 app/serve.py）
+    return request.client.host if request.client else "unknown"
+
+
+def limit_identity(kind: str, value: Optional[str]) -> None:
+    """按账号标识（mobile / openid）限流；标识为空时不处理"""
+    if not settings.ratelimit_enabled or not value:
+        return
+    retry_after = identity_limiter.hit(f"{kind}:{value.strip()}")
+    if retry_after is not None:
+        raise _too_many(retry_after)
+
+
+def auth_admission(request: Request):
+    """依赖项：IP 限流 + 占用一个认证并发名额（请求结束时释放）"""
+    if not settings.ratelimit_enabled:
+        yield
+        return
+    retry_after = ip_limiter.hit(f"ip:{client_ip(request)}")
+    if retry_after is not None:
+        raise _too_many(retry_after)
+    if not auth_slots.try_acquire():
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, please retry later",
+            headers={"Retry-After": str(settings.auth_shed_retry_after)},
+        )
+    try:
+        yield
+    finally:
+        auth_slots.release()
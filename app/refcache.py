@@ -0,0 +1,109 @@
+# app/refcache.py
+"""
+进程内参考数据缓存（项目、部门这类很少变化的数据），跨 worker 失效靠 cache_versions 表：
+
+- 写操作在业务事务里调用 bump(db, name)，把该 name 的 version +1，随业务一起提交；
+- 读取时比对库里的 version（一次主键查询，间隔 settings.refcache_check_interval 秒才查一次），
+  变了才重新加载；本进程提交的写操作在 after_commit 里立即让缓存失效，不用等检查间隔；
+- 先读 version 再加载数据：并发写入只会让缓存“比 version 新”，下一次检查时重新加载，不会把旧数据挂在新版本号下；
+- 写入频繁的数据（如用户）用 bump_after_commit()：业务提交后另开一个单语句事务 +1，
+  版本行的锁不会持有到业务提交，写入之间不排队；代价是提交与 +1 之间有极短的窗口版本号尚未变化。
+"""
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models import CacheVersion
+
+_BUMPED_KEY = "refcache_bumped"
+_AFTER_COMMIT_KEY = "refcache_bump_after_commit"
+
+
+class VersionedCache:
+    def __init__(self, name: str, loader: Callable[[Session], Any], check_interval: Optional[float] = None):
+        self.name = name
+        self.loader = loader
+        self.check_interval = settings.refcache_check_interval if check_interval is None else check_interval
+        self._lock = threading.Lock()
+        # (version, value) 作为一个整体替换，无锁读取时不会读到不配对的两半
+        self._entry: Optional[tuple[int, Any]] = None
+        self._checked_at = 0.0
+
+    def get(self, db: Session) -> tuple[int, Any]:
+        """返回 (version, value)；version 可直接作为 ETag 的变更标记"""
+        entry = self._entry
+        if entry is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return entry
+        with self._lock:
+            version = current_version(db, self.name)
+            if self._entry is None or self._entry[0] != version:
+                self._entry = (version, self.loader(db))
+            self._checked_at = time.monotonic()
+            return self._entry
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entry = None
+
+
+_CACHES: dict[str, VersionedCache] = {}
+
+
+def register(name: str, loader: Callable[[Session], Any], check_interval: Optional[float] = None) -> VersionedCache:
+    cache = VersionedCache(name, loader, check_interval)
+    _CACHES[name] = cache
+    return cache
+
+
+def current_version(db: Session, name: str) -> int:
+    return db.execute(select(CacheVersion.version).where(CacheVersion.name == name)).scalar() or 0
+
+
+def _increment(db, name: str) -> None:
+    updated = db.execute(
+        update(CacheVersion).where(CacheVersion.name == name).values(version=CacheVersion.version + 1)
+    ).rowcount
+    if not updated:
+        # 新库未初始化该行（migrations/006 已预置 projects / departments）
+        db.execute(insert(CacheVersion).values(name=name, version=1))
+
+
+def bump(db: Session, *names: str) -> None:
+    """在写事务提交之前调用"""
+    for name in names:
+        _increment(db, name)
+    db.info.setdefault(_BUMPED_KEY, set()).update(names)
+
+
+def bump_after_commit(db: Session, *names: str) -> None:
+    """登记：本事务提交后再 +1（回滚则不变），见模块说明"""
+    db.info.setdefault(_AFTER_COMMIT_KEY, set()).update(names)
+
+
+def _invalidate(names) -> None:
+    for name in names:
+        cache = _CACHES.get(name)
+        if cache is not None:
+            cache.invalidate()
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_local(session: Session) -> None:
+    _invalidate(session.info.pop(_BUMPED_KEY, ()))
+    deferred = session.info.pop(_AFTER_COMMIT_KEY, ())
+    if deferred:
+        with session.get_bind().begin() as conn:
+            for name in sorted(deferred):
+                _increment(conn, name)
+        _invalidate(deferred)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_bumps(session: Session) -> None:
+    session.info.pop(_BUMPED_KEY, None)
+    session.info.pop(_AFTER_COMMIT_KEY, None)
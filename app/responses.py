@@ -0,0 +1,24 @@
+# app/responses.py
+"""
+全局 JSON 响应类：默认使用 orjson 序列化（比标准库 json 快数倍），
+可通过 settings.json_response = "std" 切回标准库；未安装 orjson 时自动回退。
+"""
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:  # 可选依赖
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def get_json_response_class(name: str) -> type[JSONResponse]:
+    if name == "orjson" and orjson is not None:
+        return ORJSONResponse
+    return JSONResponse
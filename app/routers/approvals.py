@@ -0,0 +1,178 @@
+# app/routers/approvals.py
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+from typing import Literal, Optional
+
+from app.db import get_read_db
+from app.models import Department, Project, Timesheet, User, department_closure as closure, user_departments
+from app.pagination import cursor_value, decode_cursor, encode_cursor, keyset_after
+from app.security import require_manager_or_admin
+from app.services.timesheet_store import attach_details
+from app.services.users import DEFAULT_DEPT_ID
+
+router = APIRouter(prefix="/approvals", tags=["approvals"])
+
+
+def _scoped_user_ids(me: User):
+    """
+    经理可处理的用户：自己所在部门及其全部下级部门的成员（子查询，由数据库一次完成）。
+    管理员不限范围，返回 None。
+    """
+    if me.role == "admin":
+        return None
+    my_depts = select(user_departments.c.department_id).where(user_departments.c.user_id == me.id)
+    return (
+        select(user_departments.c.user_id)
+        .join(closure, closure.c.descendant_id == user_departments.c.department_id)
+        .where(closure.c.ancestor_id.in_(my_depts))
+    )
+
+
+def _unassigned_user_ids():
+    """
+    还没有分到具体部门的用户：没有部门，或只在默认部门（微信注册时只会被放进默认部门）。
+    这类待审核注册不属于任何经理的子树，对所有经理可见（审批通过时再分配部门）。
+    """
+    return select(User.id).where(User.id.not_in(
+        select(user_departments.c.user_id).where(user_departments.c.department_id != DEFAULT_DEPT_ID)
+    ))
+
+
+def _positions(cursor: Optional[str]) -> tuple:
+    """游标里两个列表的位置：None 表示从头开始，False 表示该类已取完；类型不对时 400"""
+    if not cursor:
+        return None, None
+    ts_pos, reg_pos = decode_cursor(cursor, 2)
+    if ts_pos is not None and ts_pos is not False:
+        if not isinstance(ts_pos, list) or len(ts_pos) != 2:
+            raise HTTPException(status_code=400, detail="invalid cursor")
+        cursor_value(ts_pos[0], datetime)
+        cursor_value(ts_pos[1], int)
+    if reg_pos is not None and reg_pos is not False:
+        cursor_value(reg_pos, int)
+    return ts_pos, reg_pos
+
+
+def _members(db: Session, scope) -> list[dict]:
+    """范围内的全部用户及各自待审批工时数（经理工时页的用户列表），按姓名排序"""
+    pending = (
+        select(Timesheet.user_id, func.count().label("pending"))
+        .where(Timesheet.status == "submitted")
+        .group_by(Timesheet.user_id)
+        .subquery("pending")
+    )
+    stmt = (
+        select(User.id, User.name, User.mobile, User.role, func.coalesce(pending.c.pending, 0).label("pending"))
+        .outerjoin(pending, pending.c.user_id == User.id)
+        .where(User.deleted_at.is_(None))
+    )
+    if scope is not None:
+        stmt = stmt.where(User.id.in_(scope))
+    return [dict(r) for r in db.execute(stmt.order_by(User.name, User.id)).mappings()]
+
+
+def _assignable_departments(db: Session, me: User) -> list[dict]:
+    """审批通过时可以分配的部门：管理员为全部，经理为自己所在部门的子树"""
+    stmt = select(Department.id, Department.name)
+    if me.role != "admin":
+        my_depts = select(user_departments.c.department_id).where(user_departments.c.user_id == me.id)
+        stmt = stmt.where(Department.id.in_(
+            select(closure.c.descendant_id).where(closure.c.ancestor_id.in_(my_depts))
+        ))
+    return [dict(r) for r in db.execute(stmt.order_by(Department.id)).mappings()]
+
+
+# ---------- 待办：待审批工时 + 待审核的微信注册 ----------
+@router.get("/inbox")
+def approvals_inbox(
+    response: Response,
+    db: Session = Depends(get_read_db),
+    me: User = Depends(require_manager_or_admin),
+    kind: Optional[Literal["timesheets", "registrations"]] = Query(None, description="只返回其中一类；不传两类都返回"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+    with_members: bool = Query(False, description="同时返回范围内全部用户及各自待审批工时数（members）"),
+):
+    """
+    两类待办各自按提交先后排序、各取 limit 条；counts 为范围内的总数；
+    departments 为审批时可分配的部门，经理页面不必再逐个查询部门详情。
+    游标同时记录两个列表的位置，某一类取完后后续页该类返回空列表。
+    待审批工时只查热数据表（已归档的记录不会处于 submitted 状态）。
+    经理看到子树内成员的待办，以及还没分到具体部门的待审核注册。
+    """
+    scope = _scoped_user_ids(me)
+    ts_pos, reg_pos = _positions(cursor)
+    want_ts = kind in (None, "timesheets") and ts_pos is not False
+    want_reg = kind in (None, "registrations") and reg_pos is not False
+
+    ts_filters = [Timesheet.status == "submitted"]
+    reg_filters = [User.status == "pending", User.deleted_at.is_(None)]
+    if scope is not None:
+        ts_filters.append(Timesheet.user_id.in_(scope))
+        reg_filters.append(or_(User.id.in_(scope), User.id.in_(_unassigned_user_ids())))
+
+    counts = {
+        "timesheets": db.execute(select(func.count(Timesheet.id)).where(*ts_filters)).scalar(),
+        "registrations": db.execute(select(func.count(User.id)).where(*reg_filters)).scalar(),
+    }
+
+    timesheets: list = []
+    next_ts = False
+    if want_ts:
+        stmt = (
+            select(
+                Timesheet.id, Timesheet.user_id, User.name.label("user_name"),
+                Timesheet.project_id, Project.name.label("project_name"),
+                Timesheet.hours, Timesheet.week_no, Timesheet.created_at,
+            )
+            .join(User, User.id == Timesheet.user_id)
+            .outerjoin(Project, Project.id == Timesheet.project_id)
+            .where(*ts_filters)
+        )
+        if ts_pos:
+            stmt = stmt.where(keyset_after(
+                [Timesheet.created_at, Timesheet.id], [cursor_value(ts_pos[0], datetime), ts_pos[1]]
+            ))
+        timesheets = [dict(r) for r in db.execute(
+            stmt.order_by(Timesheet.created_at, Timesheet.id).limit(limit + 1)
+        ).mappings()]
+        if len(timesheets) > limit:
+            timesheets = timesheets[:limit]
+            next_ts = [timesheets[-1]["created_at"].isoformat(), timesheets[-1]["id"]]
+        attach_details(db, timesheets, ("note",))
+
+    registrations: list = []
+    next_reg = False
+    if want_reg:
+        stmt = select(
+            User.id, User.name, User.mobile, User.email, User.role, User.auth_provider, User.created_at,
+        ).where(*reg_filters)
+        if reg_pos:
+            stmt = stmt.where(User.id > reg_pos)
+        registrations = [dict(r) for r in db.execute(stmt.order_by(User.id).limit(limit + 1)).mappings()]
+        if len(registrations) > limit:
+            registrations = registrations[:limit]
+            next_reg = registrations[-1]["id"]
+
+    # 只请求一类时，另一类的位置原样保留；是否还有下一页只看请求的那一类
+    if kind == "timesheets":
+        has_more, next_reg = bool(next_ts), reg_pos
+    elif kind == "registrations":
+        has_more, next_ts = bool(next_reg), ts_pos
+    else:
+        has_more = bool(next_ts or next_reg)
+    if has_more:
+        response.headers["X-Next-Cursor"] = encode_cursor(next_ts, next_reg)
+
+    result = {
+        "counts": counts,
+        "timesheets": timesheets,
+        "registrations": registrations,
+        "departments": _assignable_departments(db, me),
+    }
+    if with_members:
+        result["members"] = _members(db, scope)
+    return result
@@ -0,0 +1,51 @@
+# app/routers/audit.py
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.db import get_read_db
+from app.models import AuditLog, User
+from app.pagination import decode_cursor, encode_cursor
+from app.security import require_admin
+
+router = APIRouter(prefix="/audit_logs", tags=["audit"])
+
+
+# ---------- 查询审计日志（仅 admin；按 id 倒序游标分页） ----------
+@router.get("/")
+def list_audit_logs(
+    response: Response,
+    db: Session = Depends(get_read_db),
+    _: User = Depends(require_admin),
+    actor_id: Optional[int] = None,
+    action: Optional[str] = None,
+    entity: Optional[str] = None,
+    entity_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+):
+    # 不同实体的 id 互相重叠，单独按 entity_id 过滤没有意义（也用不上 (entity, entity_id, id) 索引）
+    if entity_id is not None and not entity:
+        raise HTTPException(status_code=400, detail="entity_id requires entity")
+    stmt = select(
+        AuditLog.id, AuditLog.actor_id, AuditLog.action, AuditLog.entity,
+        AuditLog.entity_id, AuditLog.detail, AuditLog.created_at,
+    )
+    if actor_id is not None:
+        stmt = stmt.where(AuditLog.actor_id == actor_id)
+    if action:
+        stmt = stmt.where(AuditLog.action == action)
+    if entity:
+        stmt = stmt.where(AuditLog.entity == entity)
+    if entity_id is not None:
+        stmt = stmt.where(AuditLog.entity_id == entity_id)
+    if cursor:
+        (last_id,) = decode_cursor(cursor, 1, (int,))
+        stmt = stmt.where(AuditLog.id < last_id)
+
+    rows = [dict(r) for r in db.execute(stmt.order_by(AuditLog.id.desc()).limit(limit + 1)).mappings()]
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1]["id"])
+    return rows
@@ -5,22 +5,25 @@ from .. import models
 from ..schemas import LoginRequest, TokenResponse, UserOut, UserCreate
 from ..security import create_token, verify_password, hash_password
 from ..security import get_current_user
+from ..ratelimit import auth_admission, limit_identity
 from ..models import User as UserModel
 from sqlalchemy.exc import IntegrityError
 
 router = APIRouter()
 
-@router.post('/login', response_model=TokenResponse)
+@router.post('/login', response_model=TokenResponse, dependencies=[Depends(auth_admission)])
 def login(body: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.mobile == body.mobile).first()
+    limit_identity("mobile", body.mobile)
+    user = db.query(models.User).filter(models.User.mobile == body.mobile, models.User.deleted_at.is_(None)).first()
     if not user or not user.password_hash or not verify_password(body.password, user.password_hash):
         raise HTTPException(status_code=400, detail='Invalid credentials')
     token = create_token(user.id)
     return TokenResponse(token=token, user=UserOut.model_validate(user))
 
-@router.post('/register', response_model=UserOut)
+@router.post('/register', response_model=UserOut, dependencies=[Depends(auth_admission)])
 def register(body: UserCreate, db: Session = Depends(get_db)):
     mobile = body.mobile.strip()
+    limit_identity("mobile", mobile)
     # 先查：更友好
     if db.query(models.User).filter(models.User.mobile == mobile).first():
         raise HTTPException(status_code=400, detail="Mobile already registered")
@@ -9,6 +9,7 @@ from ..config import settings
 from ..security import create_token
 from ..db import SessionLocal, get_db
 from ..models import User, Department
+from ..ratelimit import auth_admission, limit_identity
 
 
 logger = logging.getLogger(__name__)
@@ -139,19 +140,25 @@ def _phone_in_use(db: Session, phone: str, exclude_user_id: int | None = None) -
 
 # ---------- 路由 ----------
 
-@router.post("/auth/wechat/login")
+@router.post("/auth/wechat/login", dependencies=[Depends(auth_admission)])
 async def wechat_login(body: WechatLoginIn):
     if not body.code:
         raise HTTPException(400, "code required")
+    # 开发模式下 openid 由前端给出，可以在调用微信接口之前就限流
+    limit_identity("openid", body.dev_openid)
 
     sess = await code2session_wrapper(body)
     openid = sess.get("openid")
     if not openid:
         # 极端容错：生成一个稳定 openid，避免联调被卡
         openid = f"devopenid_{hash(body.code) & 0xffffffff:08x}"
+    if openid != body.dev_openid:
+        limit_identity("openid", openid)
 
     with SessionLocal() as s:
         user = get_or_create_user_by_openid(s, openid)
+        if user.deleted_at is not None:
+            raise HTTPException(403, "Account deleted, contact admin")
 
         # 守卫：若缺姓名/手机号，则置为 first_come
         if (not user.name or user.name.strip() == "" or user.name == "WeChatUser") or (not user.mobile):
@@ -187,11 +194,12 @@ async def wechat_login(body: WechatLoginIn):
         # 兜底
         return {"need_register": True, "user_id": user.id, "status": user.status}
 
-@router.post("/auth/wechat/register")
+@router.post("/auth/wechat/register", dependencies=[Depends(auth_admission)])
 def wechat_register(body: WechatRegisterIn, db: Session = Depends(get_db)):
+    limit_identity("mobile", body.mobile)
     try:
         user = db.get(User, body.user_id)
-        if not user:
+        if not user or user.deleted_at is not None:
             raise HTTPException(404, "User not found")
 
         # 仅允许 first_come / rejected 提交注册
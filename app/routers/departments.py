@@ -1,11 +1,18 @@
 # app/routers/departments.py
-from fastapi import APIRouter, Depends, HTTPException, Body
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request, Response
+from sqlalchemy import and_, func, select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.db import get_db
-from app.models import Department, User
+from app.db import get_db, get_read_db
+from app.models import Department, User, department_closure as closure, user_departments
 from app.security import require_admin, require_manager_or_admin
+from app.etag import conditional_response
+from app.fields import parse_fields, parse_ids
+from app import refcache
+from app.services import audit, department_tree, refdata
+from app.services.timesheet_store import date_window, timesheet_source, window_filters
 
 
 router = APIRouter(prefix="/departments", tags=["departments"])
@@ -13,46 +20,190 @@ router = APIRouter(prefix="/departments", tags=["departments"])
 
 # 列出所有部门
 @router.get("/", response_model=List[dict])
-def list_departments(db: Session = Depends(get_db), _: User = Depends(require_manager_or_admin)):
-    depts = db.query(Department).all()
-    return [{"id": d.id, "name": d.name, "parent_id": d.parent_id} for d in depts]
+def list_departments(request: Request, response: Response,
+                     db: Session = Depends(get_read_db), _: User = Depends(require_manager_or_admin)):
+    # 部门列表来自进程内缓存，缓存版本号即变更标记
+    version, depts = refdata.departments.get(db)
+    not_modified = conditional_response(request, response, version)
+    if not_modified:
+        return not_modified
+    return [dict(d) for d in depts]
 
 
-# 创建新部门
+# 批量按 id 取部门（须在 /{dept_id} 之前声明；权限同部门详情）
+DEPARTMENT_BATCH_FIELDS = ("id", "name", "parent_id")
+
+
+@router.get("/batch", response_model=List[dict])
+def get_departments_batch(
+    ids: str = Query(..., description="逗号分隔的部门 id"),
+    fields: Optional[str] = Query(None, description="只返回这些字段（逗号分隔，id 总是返回）"),
+    db: Session = Depends(get_read_db),
+    _: User = Depends(require_manager_or_admin),
+):
+    """直接从进程内部门缓存取，不查库；不含成员列表（成员见 /{dept_id}）"""
+    wanted = parse_ids(ids)
+    selected = parse_fields(fields, DEPARTMENT_BATCH_FIELDS) or DEPARTMENT_BATCH_FIELDS
+    depts = refdata.departments.get(db)[1]
+    by_id = {d["id"]: d for d in depts}
+    return [{f: by_id[i][f] for f in selected} for i in wanted if i in by_id]
+
+
+# 创建新部门（body.parent_id 可选：上级部门）
 @router.post("/")
 def create_department(body: dict, db: Session = Depends(get_db), _: User = Depends(require_admin)):
     name = body.get("name", "").strip()
     if not name:
         raise HTTPException(400, "name required")
-    dept = Department(name=name)
+    parent_id = body.get("parent_id")
+    if parent_id is not None and not db.get(Department, parent_id):
+        raise HTTPException(404, "Parent department not found")
+    dept = Department(name=name, parent_id=parent_id)
     db.add(dept)
+    db.flush()
+    department_tree.add_node(db, dept.id, parent_id)
+    refcache.bump(db, refdata.DEPARTMENTS)
     db.commit()
     db.refresh(dept)
-    return {"id": dept.id, "name": dept.name}
+    return {"id": dept.id, "name": dept.name, "parent_id": dept.parent_id}
 
 
-# 删除部门
+# 移动部门（连同下级部门）；parent_id 为 null 表示移为顶级部门
+@router.patch("/{dept_id}/parent")
+def move_department(dept_id: int, body: dict = Body(...), db: Session = Depends(get_db),
+                    actor: User = Depends(require_admin)):
+    dept = db.get(Department, dept_id)
+    if not dept:
+        raise HTTPException(404, "Department not found")
+    parent_id = body.get("parent_id")
+    if parent_id is not None and not db.get(Department, parent_id):
+        raise HTTPException(404, "Parent department not found")
+    prev_parent = dept.parent_id
+    department_tree.move(db, dept_id, parent_id)
+    dept.parent_id = parent_id
+    refcache.bump(db, refdata.DEPARTMENTS)
+    db.commit()
+    audit.record(actor.id, "department.move", "department", dept_id, {"from": prev_parent, "to": parent_id})
+    return {"id": dept_id, "parent_id": parent_id}
+
+
+# 删除部门（有下级部门时拒绝）
 @router.delete("/{dept_id}")
-def delete_department(dept_id: int, db: Session = Depends(get_db), _: User = Depends(require_admin)):
+def delete_department(dept_id: int, db: Session = Depends(get_db), actor: User = Depends(require_admin)):
     dept = db.get(Department, dept_id)
     if not dept:
         raise HTTPException(404, "Department not found")
+    name = dept.name
+    department_tree.remove_node(db, dept_id)
     db.delete(dept)
+    refcache.bump(db, refdata.DEPARTMENTS)
     db.commit()
+    audit.record(actor.id, "department.delete", "department", dept_id, {"name": name})
     return {"msg": "Department deleted"}
 
 
 # 获取部门详情（含成员）
 @router.get("/{dept_id}")
-def get_department(dept_id: int, db: Session = Depends(get_db), _: User = Depends(require_manager_or_admin)):
+def get_department(dept_id: int, db: Session = Depends(get_read_db), _: User = Depends(require_manager_or_admin)):
     dept = db.get(Department, dept_id)
     if not dept:
         raise HTTPException(404, "Department not found")
+    members = db.execute(
+        select(User.id, User.name, User.mobile, User.email, User.role, User.status)
+        .join(user_departments, user_departments.c.user_id == User.id)
+        .where(user_departments.c.department_id == dept_id, User.deleted_at.is_(None))
+        .order_by(User.id)
+    ).mappings()
     return {
         "id": dept.id,
         "name": dept.name,
-        "users": [{"id": u.id, "name": u.name, "mobile": u.mobile, "email": u.email,
-                   "role": u.role, "status": u.status} for u in dept.users]
+        "users": [dict(u) for u in members]
+    }
+
+
+# ---------- 子树查询：都以 department_closure.ancestor_id = :id 为入口，一条查询，与层级深度无关 ----------
+def _get_department_or_404(db: Session, dept_id: int) -> None:
+    if db.execute(select(Department.id).where(Department.id == dept_id)).scalar() is None:
+        raise HTTPException(404, "Department not found")
+
+
+# 部门及全部下级部门
+@router.get("/{dept_id}/subtree")
+def get_subtree(dept_id: int, db: Session = Depends(get_read_db), _: User = Depends(require_manager_or_admin)):
+    _get_department_or_404(db, dept_id)
+    rows = db.execute(
+        select(Department.id, Department.name, Department.parent_id, closure.c.depth)
+        .join(closure, closure.c.descendant_id == Department.id)
+        .where(closure.c.ancestor_id == dept_id)
+        .order_by(closure.c.depth, Department.id)
+    ).mappings()
+    return [dict(r) for r in rows]
+
+
+# 子树内的全部成员（去重；同一人在多个下级部门只出现一次）
+@router.get("/{dept_id}/subtree/members")
+def get_subtree_members(dept_id: int, db: Session = Depends(get_read_db),
+                        _: User = Depends(require_manager_or_admin)):
+    _get_department_or_404(db, dept_id)
+    member_ids = (
+        select(user_departments.c.user_id)
+        .join(closure, closure.c.descendant_id == user_departments.c.department_id)
+        .where(closure.c.ancestor_id == dept_id)
+    )
+    rows = db.execute(
+        select(User.id, User.name, User.mobile, User.email, User.role, User.status)
+        .where(User.id.in_(member_ids), User.deleted_at.is_(None))
+        .order_by(User.id)
+    ).mappings()
+    return [dict(r) for r in rows]
+
+
+# 子树工时汇总：合计（按人去重）+ 各下级部门小计
+@router.get("/{dept_id}/subtree/hours")
+def get_subtree_hours(
+    dept_id: int,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    status: Optional[str] = Query("approved", description="submitted/approved/rejected；传空字符串表示全部"),
+    db: Session = Depends(get_read_db),
+    _: User = Depends(require_manager_or_admin),
+):
+    _get_department_or_404(db, dept_id)
+    dt_from, dt_to = date_window(from_date, to_date)
+    src = timesheet_source(dt_from)
+    filters = window_filters(src, dt_from, dt_to)
+    if status:
+        filters.append(src.c.status == status)
+
+    member_ids = (
+        select(user_departments.c.user_id)
+        .join(closure, closure.c.descendant_id == user_departments.c.department_id)
+        .where(closure.c.ancestor_id == dept_id)
+    )
+    total = db.execute(
+        select(func.coalesce(func.sum(src.c.hours), 0)).where(*filters, src.c.user_id.in_(member_ids))
+    ).scalar()
+
+    by_department = db.execute(
+        select(
+            closure.c.descendant_id.label("department_id"),
+            Department.name,
+            closure.c.depth,
+            func.coalesce(func.sum(src.c.hours), 0).label("hours"),
+        )
+        .select_from(closure)
+        .join(Department, Department.id == closure.c.descendant_id)
+        .outerjoin(user_departments, user_departments.c.department_id == closure.c.descendant_id)
+        .outerjoin(src, and_(src.c.user_id == user_departments.c.user_id, *filters))
+        .where(closure.c.ancestor_id == dept_id)
+        .group_by(closure.c.descendant_id, Department.name, closure.c.depth)
+        .order_by(closure.c.depth, closure.c.descendant_id)
+    ).mappings()
+    return {
+        "department_id": dept_id,
+        "hours": float(total or 0),
+        # 小计只算直接挂在该部门的成员，不含其下级部门
+        "departments": [{**r, "hours": float(r["hours"] or 0)} for r in by_department],
     }
 
 
@@ -70,7 +221,7 @@ def add_members(
         raise HTTPException(404, "Department not found")
     for uid in ids:
         user = db.get(User, uid)
-        if user and user not in dept.users:
+        if user and user.deleted_at is None and user not in dept.users:
             dept.users.append(user)
     db.commit()
     return {"msg": "Members added"}
@@ -0,0 +1,85 @@
+# app/routers/jobs.py
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.db import get_db
+from app.models import Job, User
+from app.schemas import JobCreate, JobOut
+from app.security import require_admin
+from app.services import audit, job_tasks  # noqa: F401  导入即注册内置任务
+from app.services.jobs import job_types, runner
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+def _get_job(db: Session, job_id: int) -> Job:
+    job = db.get(Job, job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return job
+
+
+# ---------- 可用任务类型 ----------
+@router.get("/types", response_model=List[str])
+def list_job_types(_: User = Depends(require_admin)):
+    return job_types()
+
+
+# ---------- 提交任务（仅 admin） ----------
+@router.post("/", response_model=JobOut, status_code=202)
+def submit_job(body: JobCreate, db: Session = Depends(get_db), actor: User = Depends(require_admin)):
+    job = runner.submit(db, body.type, body.params, created_by=actor.id)
+    audit.record(actor.id, "job.submit", "job", job.id, {"type": body.type, "params": body.params})
+    return job
+
+
+# ---------- 任务列表 ----------
+@router.get("/", response_model=List[JobOut])
+def list_jobs(
+    db: Session = Depends(get_db),
+    _: User = Depends(require_admin),
+    status: Optional[str] = None,
+    type: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+):
+    stmt = select(Job)
+    if status:
+        stmt = stmt.where(Job.status == status)
+    if type:
+        stmt = stmt.where(Job.type == type)
+    return db.execute(stmt.order_by(Job.id.desc()).limit(limit)).scalars().all()
+
+
+# ---------- 任务状态 / 进度 ----------
+@router.get("/{job_id}", response_model=JobOut)
+def get_job(job_id: int, db: Session = Depends(get_db), _: User = Depends(require_admin)):
+    return _get_job(db, job_id)
+
+
+# ---------- 取消 ----------
+@router.post("/{job_id}/cancel", response_model=JobOut)
+def cancel_job(job_id: int, db: Session = Depends(get_db), actor: User = Depends(require_admin)):
+    job = _get_job(db, job_id)
+    if job.status not in ("queued", "running"):
+        raise HTTPException(400, f"job already {job.status}")
+    runner.cancel(db, job_id)
+    audit.record(actor.id, "job.cancel", "job", job_id, {"type": job.type})
+    db.refresh(job)
+    return job
+
+
+# ---------- 下载结果文件 ----------
+@router.get("/{job_id}/download")
+def download_job_result(job_id: int, db: Session = Depends(get_db), _: User = Depends(require_admin)):
+    job = _get_job(db, job_id)
+    if job.status != "succeeded" or not job.result_path:
+        raise HTTPException(404, "No result file")
+    if not os.path.exists(job.result_path):
+        raise HTTPException(410, "Result file expired")
+    filename = os.path.basename(job.result_path).split("_", 1)[-1]
+    return FileResponse(job.result_path, filename=f"job{job_id}_{filename}")
@@ -0,0 +1,59 @@
+# app/routers/profiles.py
+"""请求剖析结果（app/profiling.py 写入）的列表与下载，仅 admin"""
+import json
+import os
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from app.config import settings
+from app.models import User
+from app.profiling import folded, profile_path
+from app.security import require_admin
+
+router = APIRouter(prefix="/admin/profiles", tags=["profiles"])
+
+
+@router.get("/")
+def list_profiles(_: User = Depends(require_admin), limit: int = Query(50, ge=1, le=500)):
+    """最近的剖析结果（新的在前），只返回摘要"""
+    if not os.path.isdir(settings.profile_dir):
+        return []
+    paths = sorted(
+        (os.path.join(settings.profile_dir, name) for name in os.listdir(settings.profile_dir)
+         if name.endswith(".json")),
+        key=os.path.getmtime,
+        reverse=True,
+    )[:limit]
+    items = []
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        items.append({
+            k: data.get(k)
+            for k in ("id", "method", "path", "status", "started_at", "duration_ms", "sql_ms")
+        } | {"sql_count": len(data.get("sql", []))})
+    return items
+
+
+@router.get("/{profile_id}")
+def get_profile(
+    profile_id: str,
+    _: User = Depends(require_admin),
+    format: Literal["json", "folded"] = Query("json", description="folded：flamegraph.pl / speedscope 可直接打开"),
+):
+    path = profile_path(profile_id)
+    if path is None or not os.path.exists(path):
+        raise HTTPException(404, "Profile not found")
+    if format == "json":
+        return FileResponse(path, media_type="application/json", filename=f"profile_{profile_id}.json")
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return PlainTextResponse(
+        folded(data["samples"]),
+        headers={"Content-Disposition": f'attachment; filename="profile_{profile_id}.folded"'},
+    )
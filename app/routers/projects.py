@@ -1,23 +1,35 @@
 # app/routers/projects.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
 
-from app.db import get_db
-from app.models import Project, Timesheet, User
+from app.db import get_db, get_read_db
+from app.models import Project, Timesheet, TimesheetDetail, User
 from app.security import require_admin, require_manager_or_admin, get_current_user
+from app.etag import conditional_response
+from app.fields import parse_fields, parse_ids
+from app import refcache
+from app.services import audit, refdata, timesheet_sync
+from app.services.timesheet_store import timesheet_source
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
 
 # ---------- helpers ----------
-def _row_to_dict(p: Project, count: int) -> dict:
+# 列表项字段（?fields= 可选的范围）
+PROJECT_LIST_FIELDS = ("id", "name", "description", "status", "timesheet_count")
+# 批量查询的字段：缓存里的项目投影
+PROJECT_BATCH_FIELDS = ("id", "name", "description", "status")
+
+
+def _row_to_dict(p: dict, count: int) -> dict:
     return {
-        "id": p.id,
-        "name": p.name,
-        "description": getattr(p, "description", None),
-        "status": getattr(p, "status", None),      # active / archived（若无该列则为 None）
+        "id": p["id"],
+        "name": p["name"],
+        "description": p["description"],
+        "status": p["status"],      # active / archived
         "timesheet_count": count,
     }
 
@@ -25,30 +37,65 @@ def _row_to_dict(p: Project, count: int) -> dict:
 # ---------- 查询项目 ----------
 @router.get("/", response_model=List[dict])
 def list_projects(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     me: User = Depends(get_current_user),
     # 对管理员/经理，可通过 ?all=1 强制返回全部；普通员工该参数被忽略，始终只返回 active
     all: bool = Query(False, description="管理员/经理设置为 true 返回全部项目；员工忽略"),
+    fields: Optional[str] = Query(None, description="只返回这些字段（逗号分隔，id 总是返回），如 id,name"),
 ):
-    q = db.query(Project)
-
+    selected = parse_fields(fields, PROJECT_LIST_FIELDS)
+    # 不要 timesheet_count 时，工时表的计数与变更标记都不用查
+    with_counts = selected is None or "timesheet_count" in selected
+    is_staff = me.role in ("manager", "admin")
     # 员工：只显示 active
-    if me.role not in ("manager", "admin"):
-        if hasattr(Project, "status"):
-            q = q.filter(Project.status == "active")
-        projects = q.all()
-    else:
-        # 经理/管理员：all=True 返回全部；all=False 返回 active（方便前端下拉）
-        if not all and hasattr(Project, "status"):
-            q = q.filter(Project.status == "active")
-        projects = q.all()
-
-    # timesheet 计数
-    result = []
-    for p in projects:
-        cnt = db.query(Timesheet).filter(Timesheet.project_id == p.id).count()
-        result.append(_row_to_dict(p, cnt))
-    return result
+    # 经理/管理员：all=True 返回全部；all=False 返回 active（方便前端下拉）
+    only_active = not is_staff or not all
+
+    # 项目行来自进程内缓存；timesheet_count 随工时变化，不进缓存
+    version, rows = refdata.projects.get(db)
+
+    # 变更标记：项目缓存版本 + 工时变更标记（timesheet_count 依赖后者）
+    markers = [only_active, version]
+    if with_counts:
+        markers += timesheet_sync.change_marker(db)
+    not_modified = conditional_response(request, response, *markers)
+    if not_modified:
+        return not_modified
+
+    # timesheet 计数：一次 GROUP BY，而不是每个项目一条 COUNT；
+    # 与 delete_project 一致，连同归档表一起计数（归档搬迁不改变计数）
+    counts = {}
+    if with_counts:
+        src = timesheet_source(None)
+        counts = dict(db.execute(
+            select(src.c.project_id, func.count()).group_by(src.c.project_id)
+        ).all())
+    items = [
+        _row_to_dict(row, counts.get(row["id"], 0))
+        for row in rows
+        if not only_active or row["status"] == "active"
+    ]
+    if selected is not None:
+        items = [{f: item[f] for f in selected} for item in items]
+    return items
+
+
+# ---------- 批量按 id 取项目（须在 /{project_id} 之前声明；权限同项目详情） ----------
+@router.get("/batch", response_model=List[dict])
+def get_projects_batch(
+    ids: str = Query(..., description="逗号分隔的项目 id"),
+    fields: Optional[str] = Query(None, description="只返回这些字段（逗号分隔，id 总是返回）"),
+    db: Session = Depends(get_read_db),
+    _: User = Depends(require_manager_or_admin),
+):
+    """直接从进程内项目缓存取，不查库；不存在的 id 不出现在结果里，其余按请求顺序返回"""
+    wanted = parse_ids(ids)
+    selected = parse_fields(fields, PROJECT_BATCH_FIELDS) or PROJECT_BATCH_FIELDS
+    rows = refdata.projects.get(db)[1]
+    by_id = {row["id"]: row for row in rows}
+    return [{f: by_id[i][f] for f in selected} for i in wanted if i in by_id]
 
 
 # ---------- 新建项目（仅 admin） ----------
@@ -69,6 +116,7 @@ def create_project(
 
     p = Project(name=name, description=description)
     db.add(p)
+    refcache.bump(db, refdata.PROJECTS)
     db.commit()
     db.refresh(p)
     return {"id": p.id, "name": p.name, "description": getattr(p, "description", None)}
@@ -79,18 +127,23 @@ def create_project(
 def delete_project(
     project_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    actor: User = Depends(require_admin),
 ):
     p = db.get(Project, project_id)
     if not p:
         raise HTTPException(404, "Project not found")
 
-    cnt = db.query(Timesheet).filter(Timesheet.project_id == project_id).count()
+    # 分区后 timesheets 不再有外键约束，这里连同归档表一起检查
+    src = timesheet_source(None)
+    cnt = db.execute(select(func.count()).select_from(src).where(src.c.project_id == project_id)).scalar()
     if cnt > 0:
         raise HTTPException(400, "Project has timesheets, cannot delete")
 
+    name = p.name
     db.delete(p)
+    refcache.bump(db, refdata.PROJECTS)
     db.commit()
+    audit.record(actor.id, "project.delete", "project", project_id, {"name": name})
     return {"msg": "Project deleted"}
 
 
@@ -98,20 +151,18 @@ def delete_project(
 @router.get("/{project_id}")
 def get_project(
     project_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: User = Depends(require_manager_or_admin),
 ):
     p = db.get(Project, project_id)
     if not p:
         raise HTTPException(404, "Project not found")
 
-    items = db.query(Timesheet).filter(Timesheet.project_id == project_id).all()
-
-    def to_iso(d):
-        try:
-            return d.isoformat() if d else None
-        except Exception:
-            return str(d) if d is not None else None
+    items = db.execute(
+        select(Timesheet.id, Timesheet.user_id, Timesheet.hours, TimesheetDetail.note, Timesheet.status)
+        .outerjoin(TimesheetDetail, TimesheetDetail.timesheet_id == Timesheet.id)
+        .where(Timesheet.project_id == project_id)
+    ).all()
 
     return {
         "id": p.id,
@@ -122,13 +173,13 @@ def get_project(
             {
                 "id": t.id,
                 "user_id": t.user_id,
-                # 后端字段是 work_date；返回统一键名 "date" 以兼容已有静态页
-                "date": to_iso(getattr(t, "work_date", None)),
+                # work_date/start_time/end_time 已从表结构移除；保留键名以兼容已有静态页
+                "date": None,
                 "hours": t.hours,
                 "note": t.note,
                 "status": t.status,
-                "start_time": to_iso(getattr(t, "start_time", None)),
-                "end_time": to_iso(getattr(t, "end_time", None)),
+                "start_time": None,
+                "end_time": None,
             }
             for t in items
         ],
@@ -146,7 +197,7 @@ def set_project_status(
     project_id: int,
     body: ProjectStatusIn,
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    actor: User = Depends(require_admin),
 ):
     if body.status not in ALLOWED_STATUS:
         raise HTTPException(400, "invalid status")
@@ -156,9 +207,12 @@ def set_project_status(
         raise HTTPException(404, "Project not found")
 
     # 有 timesheet 时允许改为 archived；删除仍由外键限制
+    prev_status = p.status
     setattr(p, "status", body.status)
     db.add(p)
+    refcache.bump(db, refdata.PROJECTS)
     db.commit()
+    audit.record(actor.id, "project.status", "project", project_id, {"from": prev_status, "to": body.status})
     db.refresh(p)
     return {"id": p.id, "status": getattr(p, "status", None)}
 
@@ -1,10 +1,11 @@
 # app/routers/reports.py
-from datetime import date, datetime, time, timedelta
+from datetime import date
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, select
 from .. import models
-from ..db import get_db
+from ..db import get_read_db
+from ..services.timesheet_store import date_window, timesheet_source, window_filters
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
@@ -12,36 +13,33 @@ router = APIRouter(prefix="/reports", tags=["reports"])
 def approved_hours_report(
     from_date: date | None = None,   # 可选：起始“日期”
     to_date:   date | None = None,   # 可选：结束“日期”（含当天）
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    # 把 date 转成可比较的 datetime 区间
-    dt_from = datetime.combine(from_date, time.min) if from_date else None
-    # 右开区间：第二天 00:00
-    dt_to   = datetime.combine(to_date + timedelta(days=1), time.min) if to_date else None
+    # 把 date 转成可比较的 datetime 区间（右开）；不传时默认只统计热数据窗口
+    dt_from, dt_to = date_window(from_date, to_date)
+    src = timesheet_source(dt_from)
 
     # 把所有筛选条件都放进 JOIN 条件里，这样仍然保持 OUTER JOIN 语义
     join_cond = and_(
-        models.Timesheet.user_id == models.User.id,
-        models.Timesheet.status == "approved",
+        src.c.user_id == models.User.id,
+        src.c.status == "approved",
+        *window_filters(src, dt_from, dt_to),
     )
-    if dt_from:
-        join_cond = and_(join_cond, models.Timesheet.created_at >= dt_from)
-    if dt_to:
-        join_cond = and_(join_cond, models.Timesheet.created_at < dt_to)
 
-    q = (
-        db.query(
-            models.User.id.label("user_id"),
-            models.User.name.label("name"),
-            func.coalesce(func.sum(models.Timesheet.hours), 0).label("hours"),
+    stmt = (
+        select(
+            models.User.id,
+            models.User.name,
+            func.coalesce(func.sum(src.c.hours), 0),
         )
-        .outerjoin(models.Timesheet, join_cond)
+        .outerjoin(src, join_cond)
+        .where(models.User.deleted_at.is_(None))
         .group_by(models.User.id, models.User.name)
         .order_by(models.User.id)
     )
 
-    rows = q.all()
+    # 直接消费行元组，不经过 ORM / Row 属性访问
     return [
-        {"user_id": r.user_id, "name": r.name, "hours": float(r.hours or 0)}
-        for r in rows
+        {"user_id": uid, "name": name, "hours": float(hours or 0)}
+        for uid, name, hours in db.execute(stmt)
     ]
@@ -1,13 +1,23 @@
 # app/routers/timesheets.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from typing import Optional, List
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy import func, select
 
-from ..db import get_db
+from ..db import get_db, get_read_db
 from .. import models
-from ..schemas import TimesheetCreate, TimesheetOut, TimesheetPage
+from ..schemas import (
+    TimesheetChanges, TimesheetCreate, TimesheetOut, TimesheetPage, TimesheetSearchHit, TimesheetWeek,
+    TimesheetWeekEntry,
+)
 from ..security import get_current_user
+from ..etag import conditional_response, if_match_fails, version_etag
+from ..fields import dump, parse_fields, sparse_response
+from ..pagination import decode_cursor, encode_cursor, keyset_after
+from ..services import audit, timesheet_search, timesheet_sync, timesheet_week
+from ..services.timesheet_store import DETAIL_FIELDS, attach_details, date_window, timesheet_source, window_filters
 
 # 统一前缀：/timesheets
 router = APIRouter(prefix="/timesheets", tags=["timesheets"])
@@ -15,6 +25,41 @@ router = APIRouter(prefix="/timesheets", tags=["timesheets"])
 # --- 兼容旧路径：/timesheet_counts（可选） ---
 legacy_router = APIRouter(tags=["timesheets-legacy"])
 
+# 列表只投影 TimesheetOut 需要的列，不做 ORM 实体装配；
+# 长文本不在热表上，分页后按当页 id 从 timesheet_details 补齐
+TIMESHEET_OUT_FIELDS = [name for name in TimesheetOut.model_fields if name not in DETAIL_FIELDS]
+
+
+# ---------- 乐观锁 ----------
+# 修改 / 审批不加行锁：Timesheet.version 是 version_id_col，提交时 UPDATE ... WHERE id = ? AND version = ?，
+# 期间被别人改过则影响 0 行（StaleDataError），返回 409 与当前状态，由客户端决定重试或提示用户。
+# 客户端带 If-Match: "<version>" 时，读到的版本与之不符直接 412（同样附当前状态），不做任何写入。
+
+def _precondition_failed(status_code: int, message: str, ts: models.Timesheet) -> HTTPException:
+    etag = version_etag(ts.version)
+    return HTTPException(
+        status_code=status_code,
+        detail={"message": message, "current": TimesheetOut.model_validate(ts).model_dump(mode="json")},
+        headers={"ETag": etag},
+    )
+
+
+def _check_if_match(request: Request, ts: models.Timesheet) -> None:
+    if if_match_fails(request.headers.get("if-match"), version_etag(ts.version)):
+        raise _precondition_failed(412, "Timesheet has been modified", ts)
+
+
+def _commit_versioned(db: Session, ts_id: int) -> None:
+    """提交；版本冲突时回滚并以当前状态返回 409（记录已被删除则 404）"""
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        current = db.get(models.Timesheet, ts_id)
+        if current is None:
+            raise HTTPException(status_code=404, detail="Not found")
+        raise _precondition_failed(409, "Timesheet was modified concurrently", current)
+
 
 # ========== 新增 ==========
 @router.post("/", response_model=TimesheetOut)
@@ -69,6 +114,8 @@ def create_timesheet(
 def update_timesheet(
     ts_id: int,
     body: TimesheetCreate,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 ):
@@ -83,6 +130,8 @@ def update_timesheet(
         if ts.status != "submitted":
             raise HTTPException(status_code=403, detail="非待审核记录不可修改")
 
+    _check_if_match(request, ts)
+
     hours = float(body.hours or 0)
     if hours <= 0 or hours > 1000:
         raise HTTPException(status_code=400, detail="工时数必须在 0~1000 之间")
@@ -116,64 +165,244 @@ def update_timesheet(
     if user.role == "employee":
         ts.status = "submitted"
 
-    db.commit()
+    _commit_versioned(db, ts_id)
     db.refresh(ts)
+    response.headers["ETag"] = version_etag(ts.version)
     return ts
 
 
+# ========== 整周提交 ==========
+@router.put("/week/{week_no}", response_model=TimesheetWeek)
+def replace_week(
+    week_no: str,
+    entries: List[TimesheetWeekEntry],
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    用 entries 替换当前用户这一周的记录：只对有差异的行新增 / 修改 / 删除，整周一个事务。
+    规则见 app/services/timesheet_week.py；并发修改导致版本冲突时整周回滚并返回 409。
+    """
+    week_no = week_no.strip()
+    if not week_no:
+        raise HTTPException(status_code=400, detail="week_no required")
+    counts = timesheet_week.replace_week(db, user.id, week_no, entries)
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Week was modified concurrently")
+    if counts["inserted"] or counts["updated"] or counts["deleted"]:
+        audit.record(user.id, "timesheet.week_replace", "timesheet", None, {"week_no": week_no, **counts})
+    items = [TimesheetOut.model_validate(ts) for ts in timesheet_week.load_week(db, user.id, week_no)]
+    return TimesheetWeek(items=items, **counts)
+
+
 # ========== 列表 ==========
 @router.get("/", response_model=TimesheetPage)
 def list_timesheets(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     user=Depends(get_current_user),
     user_id: Optional[int] = None,
     project_id: Optional[int] = None,
     status: Optional[str] = None,
+    from_date: Optional[date] = Query(None, description="创建日期起（含）；不传 from/to 时只查热数据窗口"),
+    to_date: Optional[date] = Query(None, description="创建日期止（含）"),
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=200),
+    fields: Optional[str] = Query(None, description="只返回这些字段（逗号分隔，id 总是返回），如 id,hours,status,created_at"),
 ):
-    q = db.query(models.Timesheet)
+    selected = parse_fields(fields, TimesheetOut.model_fields)
+
+    # 带 created_at 范围，MySQL 只扫描相关分区；范围早于归档线时自动合并归档表
+    dt_from, dt_to = date_window(from_date, to_date)
+    src = timesheet_source(dt_from)
+    filters = window_filters(src, dt_from, dt_to)
 
     # 员工仅看自己的；经理/管理员可查看指定 user_id 或全员
     if user.role == "employee":
-        q = q.filter(models.Timesheet.user_id == user.id)
+        filters.append(src.c.user_id == user.id)
     elif user.role in ["manager", "admin"] and user_id:
-        q = q.filter(models.Timesheet.user_id == user_id)
+        filters.append(src.c.user_id == user_id)
 
     if project_id:
-        q = q.filter(models.Timesheet.project_id == project_id)
+        filters.append(src.c.project_id == project_id)
     if status:
-        q = q.filter(models.Timesheet.status == status)
-
-    total = q.count()
-
-    # 按创建时间倒序，其次 id 倒序
-    q = q.order_by(
-        models.Timesheet.created_at.desc(),
-        models.Timesheet.id.desc(),
+        filters.append(src.c.status == status)
+
+    # 变更标记：过滤后的 count + max(change_seq)（每次写入都换新序号，不受 updated_at 秒级精度影响），
+    # 再加低水位，取号早、提交晚的写入也能让 ETag 失效；count 同时作为 total 复用
+    total, last_seq = db.execute(
+        select(func.count(src.c.id), func.max(src.c.change_seq))
+        .where(*filters)
+    ).one()
+    not_modified = conditional_response(
+        request, response, user.id, user.role, total, last_seq, timesheet_sync.safe_seq(db)
+    )
+    if not_modified:
+        return not_modified
+
+    # 按创建时间倒序，其次 id 倒序；指定 fields 时只查对应的列，不需要长文本时不查明细表
+    row_fields = TIMESHEET_OUT_FIELDS if selected is None else [f for f in selected if f not in DETAIL_FIELDS]
+    detail_fields = DETAIL_FIELDS if selected is None else [f for f in selected if f in DETAIL_FIELDS]
+    stmt = (
+        select(*(src.c[name] for name in row_fields))
+        .where(*filters)
+        .order_by(
+            src.c.created_at.desc(),
+            src.c.id.desc(),
+        )
+        .offset((page - 1) * size)
+        .limit(size)
     )
 
-    items = q.offset((page - 1) * size).limit(size).all()
+    items = [dict(row) for row in db.execute(stmt).mappings()]
+    if detail_fields:
+        attach_details(db, items, detail_fields)
+    if selected is not None:
+        return sparse_response(
+            {"items": dump(TimesheetOut, selected, items), "page": page, "size": size, "total": total},
+            response,
+        )
     return {"items": items, "page": page, "size": size, "total": total}
 
 @router.get("", response_model=TimesheetPage, include_in_schema=False)
 def list_timesheets_noslash(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     user=Depends(get_current_user),
     user_id: Optional[int] = None,
     project_id: Optional[int] = None,
     status: Optional[str] = None,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=200),
+    fields: Optional[str] = None,
 ):
-    return list_timesheets(db=db, user=user, user_id=user_id,
+    return list_timesheets(request=request, response=response,
+                           db=db, user=user, user_id=user_id,
                            project_id=project_id, status=status,
-                           page=page, size=size)
+                           from_date=from_date, to_date=to_date,
+                           page=page, size=size, fields=fields)
+
+# ========== 全文检索 ==========
+@router.get("/search", response_model=List[TimesheetSearchHit])
+def search_timesheets(
+    response: Response,
+    q: str = Query(..., min_length=2, max_length=200, description="检索词，空格分隔的多个词须同时出现；单字的词忽略"),
+    db: Session = Depends(get_read_db),
+    user=Depends(get_current_user),
+    user_id: Optional[int] = None,
+    project_id: Optional[int] = None,
+    status: Optional[str] = None,
+    from_date: Optional[date] = Query(None, description="创建日期起（含）；不传 from/to 时只查热数据窗口"),
+    to_date: Optional[date] = Query(None, description="创建日期止（含）"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+):
+    """
+    在 weekly_summary / note / reduce_desc / reason_desc 中检索，按相关度降序（同分按 id 降序）。
+    过滤条件与权限同 GET /timesheets；还有下一页时通过响应头 X-Next-Cursor 返回游标。
+    """
+    dt_from, dt_to = date_window(from_date, to_date)
+    src = timesheet_source(dt_from)
+    hits = timesheet_search.hits(db.get_bind(), q)
+    filters = window_filters(src, dt_from, dt_to)
+
+    if user.role == "employee":
+        filters.append(src.c.user_id == user.id)
+    elif user_id:
+        filters.append(src.c.user_id == user_id)
+    if project_id:
+        filters.append(src.c.project_id == project_id)
+    if status:
+        filters.append(src.c.status == status)
+    if cursor:
+        score, last_id = decode_cursor(cursor, 2, (float, int))
+        filters.append(keyset_after([hits.c.score, src.c.id], [score, last_id], desc=True))
+
+    stmt = (
+        select(*(src.c[name] for name in TIMESHEET_OUT_FIELDS), hits.c.score)
+        .join(hits, hits.c.timesheet_id == src.c.id)
+        .where(*filters)
+        .order_by(hits.c.score.desc(), src.c.id.desc())
+        .limit(limit + 1)
+    )
+    rows = [dict(row) for row in db.execute(stmt).mappings()]
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1]["score"], rows[-1]["id"])
+    return attach_details(db, rows)
+
+
+# ========== 增量同步 ==========
+@router.get("/changes", response_model=TimesheetChanges)
+def timesheet_changes(
+    since: Optional[str] = Query(None, description="上次响应的 next_token；不传表示从头全量同步"),
+    limit: int = Query(200, ge=1, le=1000),
+    user_id: Optional[int] = Query(None, description="经理/管理员可只同步某个用户的记录"),
+    db: Session = Depends(get_read_db),
+    user=Depends(get_current_user),
+):
+    """
+    返回令牌之后新增 / 修改的记录与删除的 id，按变更序号排序；客户端保存 next_token，
+    has_more 为 true 时继续拉取。仍在进行中的写事务之后的变更留到下次返回。令牌早于已清理的墓碑时返回 410，需要不带 since 全量重新同步。
+    只覆盖热表；归档不产生删除通知。
+    """
+    T = models.Timesheet
+    Tb = models.TimesheetTombstone
+    seq, last_id = decode_cursor(since, 2, (int, int)) if since else (0, 0)
+    if since and seq < timesheet_sync.purged_seq(db):
+        raise HTTPException(status_code=410, detail="Sync token expired, full resync required")
+
+    owner = user.id if user.role == "employee" else user_id
+    row_filters = [keyset_after([T.change_seq, T.id], [seq, last_id])]
+    tomb_filters = [keyset_after([Tb.change_seq, Tb.timesheet_id], [seq, last_id])]
+    # 还有未结束的事务时只返回低水位之前的变更，避免晚提交的小序号被令牌跳过
+    watermark = timesheet_sync.safe_seq(db)
+    if watermark is not None:
+        row_filters.append(T.change_seq <= watermark)
+        tomb_filters.append(Tb.change_seq <= watermark)
+    if owner:
+        row_filters.append(T.user_id == owner)
+        tomb_filters.append(Tb.user_id == owner)
+
+    rows = [dict(r) for r in db.execute(
+        select(*(T.__table__.c[name] for name in TIMESHEET_OUT_FIELDS), T.change_seq)
+        .where(*row_filters)
+        .order_by(T.change_seq, T.id)
+        .limit(limit + 1)
+    ).mappings()]
+    tombs = db.execute(
+        select(Tb.change_seq, Tb.timesheet_id)
+        .where(*tomb_filters)
+        .order_by(Tb.change_seq, Tb.timesheet_id)
+        .limit(limit + 1)
+    ).all()
+
+    # 两路按 (序号, id) 归并，取前 limit 条；两路合计超过 limit 说明还有下一批
+    merged = sorted(
+        [(r["change_seq"], r["id"], r) for r in rows] + [(t.change_seq, t.timesheet_id, None) for t in tombs],
+        key=lambda x: (x[0], x[1]),
+    )[:limit]
+    if merged:
+        seq, last_id = merged[-1][0], merged[-1][1]
+    return {
+        "items": attach_details(db, [r for _, _, r in merged if r is not None]),
+        "deleted": [ts_id for _, ts_id, r in merged if r is None],
+        "next_token": encode_cursor(seq, last_id),
+        "has_more": len(rows) + len(tombs) > limit,
+    }
+
 
 # ========== 删除 ==========
 @router.delete("/{ts_id}")
 def delete_timesheet(
-    ts_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)
+    ts_id: int, request: Request, db: Session = Depends(get_db), user=Depends(get_current_user)
 ):
     ts = db.get(models.Timesheet, ts_id)
     if not ts:
@@ -181,9 +410,12 @@ def delete_timesheet(
 
     if user.role == "employee" and ts.user_id != user.id:
         raise HTTPException(status_code=403, detail="No permission")
+    _check_if_match(request, ts)
 
+    owner_id = ts.user_id
     db.delete(ts)
-    db.commit()
+    _commit_versioned(db, ts_id)
+    audit.record(user.id, "timesheet.delete", "timesheet", ts_id, {"user_id": owner_id})
     return {"ok": True}
 
 
@@ -191,6 +423,8 @@ def delete_timesheet(
 @router.post("/{ts_id}/approve")
 def approve_timesheet(
     ts_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 ):
@@ -199,14 +433,20 @@ def approve_timesheet(
     ts = db.get(models.Timesheet, ts_id)
     if not ts:
         raise HTTPException(status_code=404, detail="未找到记录")
+    _check_if_match(request, ts)
+    prev_status = ts.status
     ts.status = "approved"
-    db.commit()
-    return {"ok": True}
+    _commit_versioned(db, ts_id)
+    audit.record(user.id, "timesheet.approve", "timesheet", ts_id, {"from": prev_status})
+    response.headers["ETag"] = version_etag(ts.version)
+    return {"ok": True, "version": ts.version}
 
 
 @router.post("/{ts_id}/reject")
 def reject_timesheet(
     ts_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 ):
@@ -215,16 +455,22 @@ def reject_timesheet(
     ts = db.get(models.Timesheet, ts_id)
     if not ts:
         raise HTTPException(status_code=404, detail="未找到记录")
+    _check_if_match(request, ts)
+    prev_status = ts.status
     ts.status = "rejected"
-    db.commit()
-    return {"ok": True}
+    _commit_versioned(db, ts_id)
+    audit.record(user.id, "timesheet.reject", "timesheet", ts_id, {"from": prev_status})
+    response.headers["ETag"] = version_etag(ts.version)
+    return {"ok": True, "version": ts.version}
 
 
 # ========== 统计 ==========
 @router.get("/counts")
 def timesheet_counts(
     status: Optional[str] = Query(None, description="submitted/approved/rejected"),
-    db: Session = Depends(get_db),
+    from_date: Optional[date] = Query(None, description="创建日期起（含）；不传 from/to 时只统计热数据窗口"),
+    to_date: Optional[date] = Query(None, description="创建日期止（含）"),
+    db: Session = Depends(get_read_db),
     user=Depends(get_current_user),
 ):
     """
@@ -236,18 +482,21 @@ def timesheet_counts(
     ]
     员工：只能看自己的；经理/管理员：全员。
     """
-    q = db.query(
-        models.Timesheet.user_id, func.count(models.Timesheet.id).label("count")
-    )
+    dt_from, dt_to = date_window(from_date, to_date)
+    src = timesheet_source(dt_from)
+    stmt = select(src.c.user_id, func.count(src.c.id)).where(*window_filters(src, dt_from, dt_to))
     if status:
-        q = q.filter(models.Timesheet.status == status)
+        stmt = stmt.where(src.c.status == status)
 
     if user.role == "employee":
-        q = q.filter(models.Timesheet.user_id == user.id)
+        stmt = stmt.where(src.c.user_id == user.id)
+    else:
+        # 已软删除的用户不出现在统计里（走 deleted_at 索引，删除的用户通常很少）
+        deleted = select(models.User.id).where(models.User.deleted_at.is_not(None))
+        stmt = stmt.where(src.c.user_id.not_in(deleted))
 
-    q = q.group_by(models.Timesheet.user_id)
-    rows = q.all()
-    return [{"user_id": uid, "count": cnt} for (uid, cnt) in rows]
+    stmt = stmt.group_by(src.c.user_id)
+    return [{"user_id": uid, "count": cnt} for (uid, cnt) in db.execute(stmt)]
 
 
 # ========== 批量通过 ==========
@@ -264,8 +513,18 @@ def bulk_approve_timesheets(
     if user_id:
         q = q.filter(models.Timesheet.user_id == user_id)
 
-    affected = q.update({models.Timesheet.status: "approved"}, synchronize_session=False)
+    # next_seq 只做一次自增取号，不持锁；并发的单条审批 / 修改不会在这里排队
+    affected = q.update(
+        {
+            models.Timesheet.status: "approved",
+            models.Timesheet.change_seq: timesheet_sync.next_seq(db),
+            models.Timesheet.version: models.Timesheet.version + 1,
+        },
+        synchronize_session=False,
+    )
     db.commit()
+    audit.record(user.id, "timesheet.bulk_approve", "timesheet", None,
+                 {"user_id": user_id, "approved": int(affected)})
     return {"approved": int(affected)}
 
 
@@ -273,7 +532,9 @@ def bulk_approve_timesheets(
 @legacy_router.get("/timesheet_counts")
 def timesheet_counts_alias(
     status: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    db: Session = Depends(get_read_db),
     user=Depends(get_current_user),
 ):
-    return timesheet_counts(status=status, db=db, user=user)
+    return timesheet_counts(status=status, from_date=from_date, to_date=to_date, db=db, user=user)
@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from sqlalchemy import and_
+from sqlalchemy import and_, or_, select
 
-from app import models, schemas
-from app.db import get_db
+from app import models, refcache, schemas
+from app.db import get_db, get_read_db
 from app.security import get_current_user, require_admin, require_manager_or_admin, hash_password
+from app.etag import conditional_response
+from app.fields import dump, parse_fields, parse_ids, sparse_response
+from app.config import settings
+from app.services import audit, users as user_service
+from app.services.jobs import runner
+from app.pagination import decode_cursor, encode_cursor, keyset_after
 from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel
-from ..models import User
+from ..models import User, user_departments
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -18,21 +27,35 @@ class UserStatusUpdate(BaseModel):
 
 ALLOWED_USER_STATUS = {"first_come", "pending", "approved", "rejected", "suspended"}
 
+# 列表只投影 UserOut 需要的列；字段名 -> 列（导入时即校验每个字段都有对应列）
+USER_FIELD_COLUMNS = {name: getattr(models.User, name) for name in schemas.UserOut.model_fields}
+USER_OUT_COLUMNS = list(USER_FIELD_COLUMNS.values())
+
+
+def _live_user(db: Session, user_id: int) -> User:
+    """未删除的用户；不存在或已软删除都返回 404（已删除的只能通过 /restore 恢复）"""
+    user = db.execute(
+        select(User).where(User.id == user_id, User.deleted_at.is_(None))
+    ).scalar_one_or_none()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
 @router.patch("/{user_id}/status")
 def set_user_status(user_id: int, payload: UserStatusUpdate,
                     db: Session = Depends(get_db),
-                    _: dict = Depends(require_admin)):  # 仅 admin
+                    actor: User = Depends(require_admin)):  # 仅 admin
     if payload.status not in ALLOWED_USER_STATUS:
         raise HTTPException(status_code=400, detail="invalid status")
 
-    user = db.get(User, user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    user = _live_user(db, user_id)
 
+    prev_status = user.status
     user.status = payload.status
     user.is_active = (payload.status == "approved")
     db.add(user)
     db.commit()
+    audit.record(actor.id, "user.status", "user", user_id, {"from": prev_status, "to": payload.status})
     db.refresh(user)
     return {
         "id": user.id,
@@ -70,12 +93,111 @@ def update_me(
     db.refresh(user)
     return user
 
+# 可排序字段：键 -> (列, 游标值还原函数)
+USER_SORTS = {
+    "id": (models.User.id, int),
+    "name": (models.User.name, str),
+    "created_at": (models.User.created_at, datetime),
+}
+
 @router.get("/", response_model=List[schemas.UserOut])
 def get_users(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(require_manager_or_admin),
+    q: Optional[str] = Query(None, max_length=64, description="按姓名或手机号前缀搜索"),
+    role: Optional[schemas.RoleEnum] = None,
+    user_status: Optional[str] = Query(None, alias="status"),
+    department_id: Optional[int] = None,
+    sort: str = Query("id", description="id / name / created_at，前缀 - 表示倒序"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="不传则返回全部（兼容旧前端）"),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+    fields: Optional[str] = Query(None, description="只返回这些字段（逗号分隔，id 总是返回），如 id,name,status"),
 ):
-    return db.query(models.User).all()
+    """
+    用户目录：服务端搜索 / 过滤 / 排序 + 游标分页。
+    响应体仍是 UserOut 数组；还有下一页时，通过响应头 X-Next-Cursor 返回游标。
+    """
+    selected = parse_fields(fields, USER_FIELD_COLUMNS)
+    desc = sort.startswith("-")
+    sort_key = sort.lstrip("-")
+    if sort_key not in USER_SORTS:
+        raise HTTPException(status_code=400, detail="invalid sort")
+    if user_status is not None and user_status not in ALLOWED_USER_STATUS:
+        raise HTTPException(status_code=400, detail="invalid status")
+    sort_col, value_type = USER_SORTS[sort_key]
+
+    filters = [models.User.deleted_at.is_(None)]
+    if q and q.strip():
+        # 前缀匹配才能用上 name / mobile 索引
+        prefix = q.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        filters.append(or_(
+            models.User.name.like(prefix, escape="\\"),
+            models.User.mobile.like(prefix, escape="\\"),
+        ))
+    if role is not None:
+        filters.append(models.User.role == role.value)
+    if user_status is not None:
+        filters.append(models.User.status == user_status)
+    if department_id is not None:
+        filters.append(models.User.id.in_(
+            select(user_departments.c.user_id).where(user_departments.c.department_id == department_id)
+        ))
+
+    # 变更标记：用户与部门成员关系的任何写入都会 bump 该版本号（见 services/users.py）
+    version = refcache.current_version(db, user_service.USERS_VERSION)
+    not_modified = conditional_response(request, response, current_user.role, version)
+    if not_modified:
+        return not_modified
+
+    columns = USER_OUT_COLUMNS if selected is None else [USER_FIELD_COLUMNS[f] for f in selected]
+    stmt = select(*columns).where(*filters)
+    if cursor:
+        value, last_id = decode_cursor(cursor, 2, (value_type, int))
+        stmt = stmt.where(keyset_after([sort_col, models.User.id], [value, last_id], desc))
+    if desc:
+        stmt = stmt.order_by(sort_col.desc(), models.User.id.desc())
+    else:
+        stmt = stmt.order_by(sort_col, models.User.id)
+    if limit is None:
+        items = [dict(row) for row in db.execute(stmt).mappings()]
+    else:
+        # 多取一条判断是否还有下一页；排序列一并取出用于生成游标
+        rows = db.execute(stmt.add_columns(sort_col.label("sort_value")).limit(limit + 1)).mappings().all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            response.headers["X-Next-Cursor"] = encode_cursor(rows[-1]["sort_value"], rows[-1]["id"])
+        items = [{k: v for k, v in row.items() if k != "sort_value"} for row in rows]
+    if selected is not None:
+        return sparse_response(dump(schemas.UserOut, selected, items), response)
+    return items
+
+# 批量按 id 取用户（须在 /{user_id} 之前声明）；权限同单个查询：非管理员只能查自己
+@router.get("/batch", response_model=List[schemas.UserOut])
+def get_users_batch(
+    response: Response,
+    ids: str = Query(..., description="逗号分隔的用户 id"),
+    fields: Optional[str] = Query(None, description="只返回这些字段（逗号分隔，id 总是返回）"),
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """一次 IN 查询；不存在的 id 不出现在结果里，其余按请求顺序返回"""
+    wanted = parse_ids(ids)
+    if current_user.role != "admin" and any(i != current_user.id for i in wanted):
+        raise HTTPException(status_code=403, detail="Permission denied")
+    selected = parse_fields(fields, USER_FIELD_COLUMNS)
+    columns = USER_OUT_COLUMNS if selected is None else [USER_FIELD_COLUMNS[f] for f in selected]
+    found = {
+        row["id"]: dict(row)
+        for row in db.execute(
+            select(*columns).where(models.User.id.in_(wanted), models.User.deleted_at.is_(None))
+        ).mappings()
+    }
+    items = [found[i] for i in wanted if i in found]
+    if selected is not None:
+        return sparse_response(dump(schemas.UserOut, selected, items), response)
+    return items
 
 @router.get("/{user_id}", response_model=schemas.UserOut)
 def get_user_by_id(
@@ -83,9 +205,7 @@ def get_user_by_id(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    user = _live_user(db, user_id)
 
     if current_user.id != user.id and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Permission denied")
@@ -102,9 +222,7 @@ def update_user(
     if actor.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    user = db.get(models.User, user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    user = _live_user(db, user_id)
 
     # mobile 唯一性检查
     if body.mobile is not None:
@@ -128,63 +246,101 @@ def update_user(
     if body.password:  # 只要传了就更新
         user.password_hash = hash_password(body.password)
 
+    changed = sorted(body.model_dump(exclude_none=True, exclude={"password"}))
     db.commit()
+    audit.record(actor.id, "user.update", "user", user_id,
+                 {"fields": changed, "password_changed": bool(body.password)})
     db.refresh(user)
     return user
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_user(
     user_id: int,
+    purge: bool = Query(False, description="true：连同全部工时硬删除；工时较多时转为后台任务并返回 202"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_admin),
 ):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    """
+    默认软删除：停用并从列表中隐藏，工时保留，可通过 /{user_id}/restore 恢复。
+    purge=true 时按主键分批集合删除工时与用户本身，不把工时加载进内存。
+    """
+    user = db.get(models.User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    db.delete(user)
+    detail = {"name": user.name, "mobile": user.mobile}
+    if user.deleted_at is None:
+        user_service.soft_delete_user(db, user)
+        db.commit()
+    if not purge:
+        audit.record(current_user.id, "user.delete", "user", user_id, detail)
+        return
+
+    if user_service.count_user_timesheets(db, user_id) > settings.user_purge_batch:
+        job = runner.submit(db, "purge_deleted_users", {"user_id": user_id}, created_by=current_user.id)
+        audit.record(current_user.id, "user.purge", "user", user_id, {**detail, "job_id": job.id})
+        return JSONResponse({"job_id": job.id}, status_code=status.HTTP_202_ACCEPTED)
+
+    purged = user_service.purge_user(db, user_id, settings.user_purge_batch)
+    audit.record(current_user.id, "user.purge", "user", user_id, {**detail, "timesheets": purged})
+
+
+@router.post("/{user_id}/restore", response_model=schemas.UserOut)
+def restore_user(
+    user_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin),
+):
+    user = db.get(models.User, user_id)
+    if not user or user.deleted_at is None:
+        raise HTTPException(status_code=404, detail="Deleted user not found")
+    user.deleted_at = None
+    user.is_active = user.status == "approved"
     db.commit()
+    audit.record(current_user.id, "user.restore", "user", user_id, None)
+    db.refresh(user)
+    return user
 
 # 审批接口路径修正：最终路径为 /users/{user_id}/approve|reject|suspend
 @router.post("/{user_id}/approve")
 def approve_user(
     user_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager_or_admin),
+    actor: models.User = Depends(require_manager_or_admin),
 ):
-    user = db.get(models.User, user_id)
-    if not user:
-        raise HTTPException(404, "User not found")
+    user = _live_user(db, user_id)
     # 允许管理员从异常状态拉正
+    prev_status = user.status
     user.status = "approved"
     user.is_active = True
     db.commit()
+    audit.record(actor.id, "user.status", "user", user_id, {"from": prev_status, "to": "approved"})
     return {"msg": "User approved"}
 
 @router.post("/{user_id}/reject")
 def reject_user(
     user_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager_or_admin),
+    actor: models.User = Depends(require_manager_or_admin),
 ):
-    user = db.get(models.User, user_id)
-    if not user:
-        raise HTTPException(404, "User not found")
+    user = _live_user(db, user_id)
+    prev_status = user.status
     user.status = "rejected"
     user.is_active = False
     db.commit()
+    audit.record(actor.id, "user.status", "user", user_id, {"from": prev_status, "to": "rejected"})
     return {"msg": "User rejected"}
 
 @router.post("/{user_id}/suspend")
 def suspend_user(
     user_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(require_manager_or_admin),
+    actor: models.User = Depends(require_manager_or_admin),
 ):
-    user = db.get(models.User, user_id)
-    if not user:
-        raise HTTPException(404, "User not found")
+    user = _live_user(db, user_id)
+    prev_status = user.status
     user.status = "suspended"
     user.is_active = False
     db.commit()
+    audit.record(actor.id, "user.status", "user", user_id, {"from": prev_status, "to": "suspended"})
     return {"msg": "User suspended"}
@@ -122,10 +122,35 @@ class TimesheetOut(BaseModel):
     status: Literal["submitted", "approved", "rejected"]
     created_at: datetime
     updated_at: datetime
+    version: int   # 乐观锁版本号；修改 / 审批时放进 If-Match 头
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class TimesheetWeekEntry(TimesheetCreate):
+    id: Optional[int] = None        # 已有记录的 id；不带为新增
+    version: Optional[int] = None   # 读到的版本号；带上时与库里不一致返回 409
+
+
+class TimesheetWeek(BaseModel):
+    items: List[TimesheetOut]   # 提交后这一周的全部记录
+    inserted: int
+    updated: int
+    deleted: int
+    unchanged: int
+
+
+class TimesheetSearchHit(TimesheetOut):
+    score: float  # 相关度，越大越靠前
+
+
+class TimesheetChanges(BaseModel):
+    items: List[TimesheetOut]   # 令牌之后新增 / 修改的记录（当前值）
+    deleted: List[int]          # 令牌之后删除的记录 id
+    next_token: str             # 下次请求的 since
+    has_more: bool              # 为 true 时立即用 next_token 继续拉取
+
+
 class SummaryRow(BaseModel):
     key: str
     total_hours: float
@@ -140,3 +165,28 @@ class UserHoursRow(BaseModel):
     user_id: int
     name: Optional[str] = None
     total_hours: float
+
+
+# ---------- 后台任务 ----------
+
+class JobCreate(BaseModel):
+    type: str
+    params: dict = Field(default_factory=dict)
+
+
+class JobOut(BaseModel):
+    id: int
+    type: str
+    status: str
+    params: Optional[dict] = None
+    progress: float
+    message: Optional[str] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    attempts: int
+    created_by: Optional[int] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -31,7 +31,8 @@ def get_current_user(creds: HTTPAuthorizationCredentials = Depends(security), db
     except Exception:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
     user = db.get(models.User, user_id)
-    if not user or not user.is_active:
+    # 已软删除的账号无论 status / is_active 如何都不再接受旧 token
+    if not user or not user.is_active or user.deleted_at is not None:
         raise HTTPException(status_code=401, detail='User inactive or not found')
     return user
 
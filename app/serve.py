@@ -0,0 +1,194 @@
+# app/serve.py
+"""
+生产环境启动入口（多进程 prefork）：
+
+  python -m app.serve --workers 4 --max-requests 20000 --max-requests-jitter 2000
+
+- 父进程绑定端口后拉起 N 个 worker（默认按可用 CPU 数，见 settings.web_workers），各自独立的连接池；
+- worker 在 lifespan 完成（连接池预热等）之后才算就绪；全部就绪后写入 --ready-file，退出时删除；
+- SIGHUP：滚动重载——逐个先启动新 worker，等它就绪后再让旧 worker 处理完进行中的请求退出，
+  新进程会重新加载代码与 .env；新 worker 超时未就绪则保留旧 worker；
+- worker 处理 max_requests(+随机 jitter) 个请求后自行退出，由父进程补上，控制内存增长；
+- SIGTTIN / SIGTTOU 增减 worker，SIGINT / SIGTERM 优雅退出。
+"""
+import argparse
+import logging
+import os
+import random
+import time
+from typing import Optional
+
+import uvicorn
+from uvicorn._subprocess import spawn
+from uvicorn.supervisors.multiprocess import Multiprocess, Process
+
+from app.config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def default_workers() -> int:
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:   # macOS / Windows
+        cpus = os.cpu_count() or 1
+    return max(1, cpus)
+
+
+class WorkerServer(uvicorn.Server):
+    """在子进程中运行；startup 完成后通过 ready 事件通知父进程"""
+
+    def __init__(self, config: uvicorn.Config, ready, max_requests: int, jitter: int) -> None:
+        super().__init__(config)
+        self.ready = ready
+        self.max_requests = max_requests
+        self.jitter = jitter
+
+    def run(self, sockets=None) -> None:
+        if self.max_requests:
+            # 各 worker 的上限错开，避免同时重启
+            self.config.limit_max_requests = self.max_requests + random.randint(0, max(0, self.jitter))
+        super().run(sockets=sockets)
+
+    async def startup(self, sockets=None) -> None:
+        await super().startup(sockets=sockets)
+        if self.started:
+            self.ready.set()
+
+
+class Supervisor(Multiprocess):
+    def __init__(self, config: uvicorn.Config, sockets, max_requests: int, jitter: int,
+                 ready_timeout: float, ready_file: Optional[str]) -> None:
+        super().__init__(config, target=None, sockets=sockets)
+        self.max_requests = max_requests
+        self.jitter = jitter
+        self.ready_timeout = ready_timeout
+        self.ready_file = ready_file
+
+    def _spawn(self) -> tuple[Process, object]:
+        ready = spawn.Event()
+        server = WorkerServer(self.config, ready, self.max_requests, self.jitter)
+        process = Process(self.config, server.run, self.sockets)
+        process.start()
+        return process, ready
+
+    def _wait_ready(self, process: Process, ready) -> bool:
+        deadline = time.monotonic() + self.ready_timeout
+        while time.monotonic() < deadline:
+            if ready.wait(0.2):
+                return True
+            if not process.process.is_alive():
+                return False
+        return False
+
+    # ---------- 生命周期 ----------
+    def init_processes(self) -> None:
+        started = [self._spawn() for _ in range(self.processes_num)]
+        self.processes = [process for process, _ in started]
+        if all(self._wait_ready(process, ready) for process, ready in started):
+            logger.info("All %d workers ready", len(started))
+            self._write_ready_file()
+        else:
+            logger.error("Some workers did not become ready within %ss", self.ready_timeout)
+
+    def run(self) -> None:
+        try:
+            super().run()
+        finally:
+            self._remove_ready_file()
+
+    def restart_all(self) -> None:
+        """滚动重载：新 worker 就绪后才停旧 worker，任意时刻都有 worker 在接流量"""
+        for idx, old in enumerate(list(self.processes)):
+            new, ready = self._spawn()
+            if not self._wait_ready(new, ready):
+                logger.error("New worker [%s] not ready within %ss, keeping [%s]",
+                             new.pid, self.ready_timeout, old.pid)
+                new.terminate()
+                new.join()
+                continue
+            self.processes[idx] = new
+            old.terminate()   # 旧 worker 停止 accept，进行中的请求处理完再退出
+            old.join()
+        logger.info("Reload finished")
+
+    def keep_subprocess_alive(self) -> None:
+        if self.should_exit.is_set():
+            return
+        for idx, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+            process.kill()
+            process.join()
+            if self.should_exit.is_set():
+                return
+            # 达到 max_requests 正常退出，或异常退出：都补一个新 worker
+            logger.info("Worker [%s] exited (code %s), replacing", process.pid, process.process.exitcode)
+            self.processes[idx], _ = self._spawn()
+
+    def handle_ttin(self) -> None:
+        logger.info("Received SIGTTIN, increasing the number of processes.")
+        self.processes_num += 1
+        process, _ = self._spawn()
+        self.processes.append(process)
+
+    # ---------- 就绪文件 ----------
+    def _write_ready_file(self) -> None:
+        if self.ready_file:
+            with open(self.ready_file, "w", encoding="utf-8") as f:
+                f.write(str(os.getpid()))
+
+    def _remove_ready_file(self) -> None:
+        if self.ready_file and os.path.exists(self.ready_file):
+            os.remove(self.ready_file)
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default=settings.app_host)
+    ap.add_argument("--port", type=int, default=settings.app_port)
+    ap.add_argument("--workers", type=int, default=settings.web_workers or default_workers())
+    ap.add_argument("--max-requests", type=int, default=settings.web_max_requests)
+    ap.add_argument("--max-requests-jitter", type=int, default=settings.web_max_requests_jitter)
+    ap.add_argument("--graceful-timeout", type=int, default=settings.web_graceful_timeout)
+    ap.add_argument("--ready-timeout", type=int, default=settings.web_ready_timeout)
+    ap.add_argument("--ready-file", help="所有 worker 就绪后写入该文件（可供容器健康检查）")
+    ap.add_argument("--db-max-connections", type=int,
+                    help="整个服务允许占用的数据库连接总数，按 worker 数平分为每个进程的 pool_size")
+    ap.add_argument("--log-level", default="info")
+    args = ap.parse_args(argv)
+
+    # 子进程以 spawn 方式启动、重新读取环境变量，所以每进程的连接池参数通过环境变量下发
+    if args.db_max_connections:
+        os.environ["DB_POOL_SIZE"] = str(max(1, args.db_max_connections // args.workers))
+        os.environ["DB_MAX_OVERFLOW"] = "0"
+    # 认证限流在进程内计数，服务总限额按 worker 数平分（app/ratelimit.py）
+    if "auth_limit_workers" not in settings.model_fields_set:
+        os.environ["AUTH_LIMIT_WORKERS"] = str(args.workers)
+    # 未显式配置预热数时，worker 就绪前把整个 pool_size 建满
+    if "db_pool_warm" not in settings.model_fields_set:
+        os.environ["DB_POOL_WARM"] = os.environ.get("DB_POOL_SIZE", str(settings.db_pool_size))
+
+    config = uvicorn.Config(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+    )
+    sock = config.bind_socket()
+    logger.info("Starting %d workers on %s:%d", args.workers, args.host, args.port)
+    Supervisor(
+        config,
+        sockets=[sock],
+        max_requests=args.max_requests,
+        jitter=args.max_requests_jitter,
+        ready_timeout=args.ready_timeout,
+        ready_file=args.ready_file,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# app/services/audit.py
+"""
+审计日志：路由里调用 record() 把事件放进进程内队列，由后台线程批量写入 audit_logs。
+
+- 请求线程只做一次 put_nowait，不增加额外的 commit；
+- 队列有上限（settings.audit_queue_max），满了直接丢弃并计数，绝不阻塞请求；
+- 后台线程攒够 audit_batch_size 条或等满 audit_flush_interval 秒后，一条多行 INSERT 落库；
+- 应用关闭时（lifespan）stop() 会把剩余事件全部写完。
+"""
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from sqlalchemy import insert
+
+from app.config import settings
+from app.models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+
+class AuditWriter:
+    def __init__(self, max_queue: int, batch_size: int, flush_interval: float, bind=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # 为空时写入 app.db.engine（主库）；测试可替换
+        self.bind = bind
+        self.dropped = 0
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- 生产者 ----
+    def enqueue(self, event: dict) -> bool:
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning("audit queue full, %d events dropped so far", self.dropped)
+            return False
+
+    # ---- 生命周期 ----
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def flush(self) -> None:
+        """同步写完队列里现有的事件"""
+        while True:
+            batch = self._drain([], self.batch_size)
+            if not batch:
+                return
+            self._write(batch)
+
+    # ---- 消费者 ----
+    def _drain(self, batch: list, limit: int) -> list:
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            # 攒批：直到批满、超时或收到停止信号
+            while len(batch) < self.batch_size and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=min(remaining, 0.1)))
+                except queue.Empty:
+                    continue
+                self._drain(batch, self.batch_size)
+            self._write(batch)
+
+    def _write(self, batch: list) -> None:
+        bind = self.bind
+        if bind is None:
+            from app.db import engine as bind
+        try:
+            with bind.begin() as conn:
+                conn.execute(insert(AuditLog), batch)
+        except Exception:
+            logger.exception("audit flush failed, %d events lost", len(batch))
+
+
+writer = AuditWriter(
+    max_queue=settings.audit_queue_max,
+    batch_size=settings.audit_batch_size,
+    flush_interval=settings.audit_flush_interval,
+)
+
+
+def record(actor_id: Optional[int], action: str, entity: str, entity_id: Optional[int],
+           detail: Optional[dict[str, Any]] = None) -> None:
+    """记录一条审计事件（在业务事务提交成功之后调用）"""
+    if not settings.audit_enabled:
+        return
+    writer.enqueue({
+        "actor_id": actor_id,
+        "action": action,
+        "entity": entity,
+        "entity_id": entity_id,
+        "detail": detail,
+        # 以事件发生时间为准，而不是落库时间
+        "created_at": datetime.now(timezone.utc).replace(tzinfo=None),
+    })
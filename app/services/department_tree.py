@@ -0,0 +1,85 @@
+# app/services/department_tree.py
+"""
+部门层级：departments.parent_id 记录直接上级，department_closure 记录所有（祖先, 后代, 深度）对，
+子树查询只需 WHERE ancestor_id = :id 一次索引查找，与层级深度无关。
+
+新增、移动、删除部门时在同一事务里维护闭包表；rebuild() 按 parent_id 整表重建（数据修复用）。
+"""
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import Department, department_closure as closure
+
+
+def ancestors(db: Session, dept_id: int) -> list[tuple[int, int]]:
+    """[(ancestor_id, depth)]，含自身"""
+    return db.execute(
+        select(closure.c.ancestor_id, closure.c.depth).where(closure.c.descendant_id == dept_id)
+    ).all()
+
+
+def subtree(db: Session, dept_id: int) -> list[tuple[int, int]]:
+    """[(descendant_id, depth)]，含自身"""
+    return db.execute(
+        select(closure.c.descendant_id, closure.c.depth).where(closure.c.ancestor_id == dept_id)
+    ).all()
+
+
+def add_node(db: Session, dept_id: int, parent_id: Optional[int]) -> None:
+    """新部门：自身一行 + 父部门的每个祖先各一行"""
+    rows = [{"ancestor_id": dept_id, "descendant_id": dept_id, "depth": 0}]
+    if parent_id is not None:
+        rows += [
+            {"ancestor_id": a, "descendant_id": dept_id, "depth": depth + 1}
+            for a, depth in ancestors(db, parent_id)
+        ]
+    db.execute(insert(closure), rows)
+
+
+def move(db: Session, dept_id: int, new_parent_id: Optional[int]) -> None:
+    """把 dept_id 及其子树挂到 new_parent_id 下（None 表示移为顶级部门）"""
+    nodes = subtree(db, dept_id)
+    node_ids = [d for d, _ in nodes]
+    if new_parent_id is not None and new_parent_id in node_ids:
+        raise HTTPException(400, "Cannot move a department under itself or its descendants")
+
+    # 断开子树与原祖先之间的路径（子树内部的路径保持不变）
+    old_ancestors = [a for a, depth in ancestors(db, dept_id) if depth > 0]
+    if old_ancestors:
+        db.execute(
+            delete(closure).where(closure.c.descendant_id.in_(node_ids), closure.c.ancestor_id.in_(old_ancestors))
+        )
+    # 新父部门的每个祖先 × 子树的每个节点
+    if new_parent_id is not None:
+        rows = [
+            {"ancestor_id": a, "descendant_id": d, "depth": a_depth + d_depth + 1}
+            for a, a_depth in ancestors(db, new_parent_id)
+            for d, d_depth in nodes
+        ]
+        db.execute(insert(closure), rows)
+
+
+def remove_node(db: Session, dept_id: int) -> None:
+    """删除叶子部门的闭包行；有下级部门时拒绝"""
+    if any(depth > 0 for _, depth in subtree(db, dept_id)):
+        raise HTTPException(400, "Department has sub-departments")
+    db.execute(delete(closure).where(closure.c.descendant_id == dept_id))
+
+
+def rebuild(db: Session) -> int:
+    """按 departments.parent_id 重建整张闭包表，返回行数"""
+    parents = dict(db.execute(select(Department.id, Department.parent_id)).all())
+    rows = []
+    for dept_id in parents:
+        node, depth, seen = dept_id, 0, set()
+        while node is not None and node in parents and node not in seen:
+            seen.add(node)
+            rows.append({"ancestor_id": node, "descendant_id": dept_id, "depth": depth})
+            node, depth = parents[node], depth + 1
+    db.execute(delete(closure))
+    if rows:
+        db.execute(insert(closure), rows)
+    return len(rows)
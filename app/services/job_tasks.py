@@ -0,0 +1,317 @@
+# app/services/job_tasks.py
+"""
+内置后台任务。新增任务类型：在此文件（或其它被导入的模块）里用 @job_handler 注册即可。
+"""
+import csv
+import logging
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import delete, func, insert, select, text, update
+
+from app import models
+from app import refcache
+from app.config import settings
+from app.services import audit, department_tree, refdata, timesheet_search, timesheet_sync
+from app.services import users as user_service
+from app.services.jobs import JobContext, job_handler
+from app.services.timesheet_store import DETAIL_FIELDS, archive_cutoff, month_start, timesheet_source
+
+logger = logging.getLogger(__name__)
+
+_CHUNK = 5000
+
+EXPORT_COLUMNS = [
+    "id", "user_id", "project_id", "hours", "status", "week_no", "submit_time", "nickname",
+    "weekly_summary", "pm_reduce_hours", "identified_by", "reduce_desc", "director_reduce_hours",
+    "group_reduce_hours", "reason_desc", "overtime", "note", "created_at", "updated_at",
+]
+
+
+def _timesheet_filters(T, params: dict) -> list:
+    filters = []
+    if params.get("user_id"):
+        filters.append(T.user_id == int(params["user_id"]))
+    if params.get("project_id"):
+        filters.append(T.project_id == int(params["project_id"]))
+    if params.get("status"):
+        filters.append(T.status == params["status"])
+    if params.get("from_date"):
+        filters.append(T.created_at >= datetime.combine(datetime.fromisoformat(params["from_date"]).date(), time.min))
+    if params.get("to_date"):
+        to_date = datetime.fromisoformat(params["to_date"]).date() + timedelta(days=1)
+        filters.append(T.created_at < datetime.combine(to_date, time.min))
+    return filters
+
+
+# ---------- 导出工时（CSV） ----------
+@job_handler("export_timesheets", max_concurrency=2)
+def export_timesheets(ctx: JobContext, params: dict) -> dict:
+    """params: user_id / project_id / status / from_date / to_date（均可选）；包含已归档的记录"""
+    from_date = params.get("from_date")
+    src = timesheet_source(datetime.fromisoformat(from_date) if from_date else None)
+    T = src.c
+    D = models.TimesheetDetail
+    filters = _timesheet_filters(T, params)
+    # 长文本在 timesheet_details；导出需要全部字段，分块读取时按主键左连接
+    columns = [getattr(D, name) if name in DETAIL_FIELDS else T[name] for name in EXPORT_COLUMNS]
+    with ctx.session() as db:
+        total = db.execute(select(func.count(T.id)).where(*filters)).scalar() or 0
+
+    path = ctx.output_path("timesheets.csv")
+    done, last_id = 0, 0
+    # utf-8-sig：Excel 直接打开不乱码
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_COLUMNS)
+        while True:
+            # 按 id 游标分块读取，单次查询与内存占用都有上界
+            with ctx.session() as db:
+                rows = db.execute(
+                    select(*columns)
+                    .select_from(src)
+                    .outerjoin(D, D.timesheet_id == T.id)
+                    .where(*filters, T.id > last_id)
+                    .order_by(T.id)
+                    .limit(_CHUNK)
+                ).all()
+            if not rows:
+                break
+            writer.writerows(rows)
+            done += len(rows)
+            last_id = rows[-1][0]
+            ctx.progress(done * 100.0 / total if total else 100.0, f"{done}/{total}")
+    return {"rows": done, "filename": "timesheets.csv"}
+
+
+# ---------- 全员批量审批 ----------
+@job_handler("bulk_approve", max_concurrency=1)
+def bulk_approve(ctx: JobContext, params: dict) -> dict:
+    """params: user_id（可选，不传则审批全员的待审核记录）"""
+    T = models.Timesheet
+    filters = [T.status == "submitted"]
+    if params.get("user_id"):
+        filters.append(T.user_id == int(params["user_id"]))
+    with ctx.session() as db:
+        total = db.execute(select(func.count(T.id)).where(*filters)).scalar() or 0
+
+    approved = 0
+    while True:
+        # 每批单独提交，避免一个大事务长时间持有行锁
+        with ctx.session() as db:
+            ids = db.execute(select(T.id).where(*filters).order_by(T.id).limit(_CHUNK)).scalars().all()
+            if not ids:
+                break
+            approved += db.execute(
+                update(T).where(T.id.in_(ids), T.status == "submitted")
+                .values(status="approved", change_seq=timesheet_sync.next_seq(db), version=T.version + 1)
+            ).rowcount
+            db.commit()
+        ctx.progress(approved * 100.0 / total if total else 100.0, f"{approved}/{total}")
+
+    audit.record(ctx.created_by, "timesheet.bulk_approve", "timesheet", None,
+                 {"user_id": params.get("user_id"), "approved": approved, "job_id": ctx.job_id})
+    return {"approved": approved}
+
+
+# ---------- 冷数据归档 ----------
+@job_handler("archive_timesheets", max_concurrency=1)
+def archive_timesheets(ctx: JobContext, params: dict) -> dict:
+    """
+    把 created_at 早于归档线的记录搬到 timesheets_archive。
+    params: before（可选，ISO 日期；默认 settings.timesheet_archive_after_months 个月前的 1 号）
+    """
+    before = datetime.fromisoformat(params["before"]) if params.get("before") else archive_cutoff()
+    if before is None:
+        return {"archived": 0, "message": "archiving disabled"}
+
+    T = models.Timesheet
+    A = models.timesheets_archive
+    columns = [c.name for c in T.__table__.columns]
+    with ctx.session() as db:
+        total = db.execute(select(func.count(T.id)).where(T.created_at < before)).scalar() or 0
+
+    archived = 0
+    while True:
+        # 每批一个事务：先复制再删除，中途失败重跑也不会丢数据（已复制的行按主键跳过）
+        with ctx.session() as db:
+            ids = db.execute(
+                select(T.id).where(T.created_at < before).order_by(T.id).limit(_CHUNK)
+            ).scalars().all()
+            if not ids:
+                break
+            copied = select(A.c.id).where(A.c.id.in_(ids))
+            db.execute(
+                insert(A).from_select(
+                    columns,
+                    select(*(T.__table__.c[name] for name in columns))
+                    .where(T.id.in_(ids), T.id.not_in(copied)),
+                )
+            )
+            archived += db.execute(delete(T).where(T.id.in_(ids))).rowcount
+            db.commit()
+        ctx.progress(archived * 100.0 / total if total else 100.0, f"{archived}/{total}")
+
+    audit.record(ctx.created_by, "timesheet.archive", "timesheet", None,
+                 {"before": before.isoformat(), "archived": archived, "job_id": ctx.job_id})
+    return {"archived": archived, "before": before.isoformat()}
+
+
+# ---------- 分区维护（仅 MySQL） ----------
+def _partition_name(dt: datetime) -> str:
+    return f"p{dt:%Y%m}"
+
+
+@job_handler("maintain_timesheet_partitions", max_concurrency=1)
+def maintain_timesheet_partitions(ctx: JobContext, params: dict) -> dict:
+    """
+    为 timesheets 预建未来的月度分区，并删除已全部归档的旧分区。
+    params: months_ahead（默认 3）
+    分区结构见 migrations/005_timesheets_partitioning.sql：pYYYYMM 存放该月数据，pmax 兜底。
+    """
+    months_ahead = int(params.get("months_ahead", 3))
+    with ctx.session() as db:
+        if db.get_bind().dialect.name != "mysql":
+            return {"message": "partitioning is only supported on MySQL"}
+        existing = db.execute(text(
+            "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'timesheets' "
+            "AND PARTITION_NAME IS NOT NULL ORDER BY PARTITION_ORDINAL_POSITION"
+        )).all()
+        if not existing or existing[-1][0] != "pmax":
+            return {"message": "timesheets is not partitioned; run migrations/005 first"}
+        # pmax 之前最后一个分区的上界（UNIX 时间戳）；新分区只能接在它后面
+        upper = int(existing[-2][1]) if len(existing) > 1 else 0
+
+        # 从 pmax 中依次拆出缺少的月份分区（pmax 里通常没有数据，REORGANIZE 几乎不搬数据）
+        # 边界一律由 MySQL 计算 UNIX_TIMESTAMP('YYYY-MM-01')（会话时区，与分区表达式 UNIX_TIMESTAMP(created_at) 一致），
+        # 不用 Python 的 datetime.timestamp()：那是应用进程的本地时区，与数据库时区不同时边界会错开
+        added = []
+        for i in range(0, months_ahead + 1):
+            start, end = month_start(-i), month_start(-i - 1)
+            boundary = f"UNIX_TIMESTAMP('{end:%Y-%m-%d}')"
+            end_ts = int(db.execute(text(f"SELECT {boundary}")).scalar())
+            if end_ts <= upper:
+                continue
+            db.execute(text(
+                f"ALTER TABLE timesheets REORGANIZE PARTITION pmax INTO ("
+                f"PARTITION {_partition_name(start)} VALUES LESS THAN ({boundary}), "
+                f"PARTITION pmax VALUES LESS THAN MAXVALUE)"
+            ))
+            added.append(_partition_name(start))
+            upper = end_ts
+
+        # 归档线之前的月度分区：确认没有数据后直接 DROP（秒级，不产生大事务）
+        dropped = []
+        cutoff = archive_cutoff()
+        if cutoff is not None:
+            for name, _ in existing:
+                if not (name.startswith("p") and name[1:].isdigit()) or name >= _partition_name(cutoff):
+                    continue
+                left = db.execute(text(f"SELECT COUNT(*) FROM timesheets PARTITION ({name})")).scalar()
+                if left:
+                    logger.warning("partition %s still has %d rows, run archive_timesheets first", name, left)
+                    continue
+                db.execute(text(f"ALTER TABLE timesheets DROP PARTITION {name}"))
+                dropped.append(name)
+        db.commit()
+        ctx.progress(100.0, f"added {len(added)}, dropped {len(dropped)}")
+    return {"added": added, "dropped": dropped}
+
+
+# ---------- 部门闭包表重建 ----------
+@job_handler("rebuild_department_closure", max_concurrency=1)
+def rebuild_department_closure(ctx: JobContext, params: dict) -> dict:
+    """按 departments.parent_id 重建 department_closure（数据修复 / 手工改过 parent_id 之后）"""
+    with ctx.session() as db:
+        rows = department_tree.rebuild(db)
+        refcache.bump(db, refdata.DEPARTMENTS)
+        db.commit()
+    return {"rows": rows}
+
+
+# ---------- 增量同步墓碑清理 ----------
+@job_handler("purge_timesheet_tombstones", max_concurrency=1)
+def purge_timesheet_tombstones(ctx: JobContext, params: dict) -> dict:
+    """
+    删除早于 days 天（默认 settings.timesheet_tombstone_days）的墓碑，并推进清理线：
+    令牌早于清理线的客户端会收到 410 并全量重新同步，不会漏掉删除。
+    同时清掉超时未结束的变更序号取号行（进程崩溃遗留）。
+    """
+    days = int(params.get("days", settings.timesheet_tombstone_days))
+    Tb = models.TimesheetTombstone
+    with ctx.session() as db:
+        upto = db.execute(
+            select(func.max(Tb.change_seq)).where(Tb.deleted_at < datetime.utcnow() - timedelta(days=days))
+        ).scalar()
+        stale = timesheet_sync.purge_stale_allocations(db)
+        if upto is None:
+            db.commit()
+            return {"purged": 0, "stale_allocations": stale}
+        timesheet_sync.mark_purged(db, upto)
+        purged = db.execute(delete(Tb).where(Tb.change_seq <= upto)).rowcount
+        db.commit()
+    return {"purged": purged, "upto": upto, "stale_allocations": stale}
+
+
+# ---------- 全文检索数据重建 ----------
+@job_handler("rebuild_timesheet_search", max_concurrency=1)
+def rebuild_timesheet_search(ctx: JobContext, params: dict) -> dict:
+    """
+    按 timesheet_details 重建倒排表：SQLite 等没有 FULLTEXT 的数据库上线后回填，或数据修复时使用。
+    MySQL 的 FULLTEXT 索引由 InnoDB 维护，无需重建。
+    """
+    D = models.TimesheetDetail
+    columns = [D.timesheet_id, *(getattr(D, f) for f in timesheet_search.SEARCH_FIELDS)]
+    with ctx.session() as db:
+        if db.get_bind().dialect.name == "mysql":
+            return {"message": "MySQL uses the FULLTEXT index on timesheet_details"}
+        total = db.execute(select(func.count(D.timesheet_id))).scalar() or 0
+
+    done, last_id = 0, 0
+    while True:
+        with ctx.session() as db:
+            rows = db.execute(
+                select(*columns).where(D.timesheet_id > last_id).order_by(D.timesheet_id).limit(_CHUNK)
+            ).mappings().all()
+            if not rows:
+                break
+            timesheet_search.reindex(
+                db.connection(), {r["timesheet_id"]: timesheet_search.document(r) for r in rows}
+            )
+            db.commit()
+        done += len(rows)
+        last_id = rows[-1]["timesheet_id"]
+        ctx.progress(done * 100.0 / total if total else 100.0, f"{done}/{total}")
+    return {"indexed": done}
+
+
+# ---------- 已删除用户的硬清理 ----------
+@job_handler("purge_deleted_users", max_concurrency=1)
+def purge_deleted_users(ctx: JobContext, params: dict) -> dict:
+    """
+    params.user_id：清理指定的（已软删除的）用户；
+    否则清理软删除超过 days 天（默认 settings.user_purge_after_days）的全部用户。
+    每批 settings.user_purge_batch 条工时一个事务，中途失败重跑即可从剩余部分继续。
+    """
+    U = models.User
+    with ctx.session() as db:
+        stmt = select(U.id).where(U.deleted_at.is_not(None))
+        if params.get("user_id") is not None:
+            stmt = stmt.where(U.id == int(params["user_id"]))
+        else:
+            days = int(params.get("days", settings.user_purge_after_days))
+            stmt = stmt.where(U.deleted_at < datetime.utcnow() - timedelta(days=days))
+        user_ids = db.execute(stmt.order_by(U.id)).scalars().all()
+        total = sum(user_service.count_user_timesheets(db, uid) for uid in user_ids)
+
+    done = 0
+    for uid in user_ids:
+        def report(n: int, base: int = done, uid: int = uid) -> None:
+            pct = (base + n) * 100.0 / total if total else 0.0
+            ctx.progress(min(pct, 99.0), f"user {uid}: {base + n}/{total}")
+
+        with ctx.session() as db:
+            purged = user_service.purge_user(db, uid, settings.user_purge_batch, on_batch=report)
+        done += purged
+        audit.record(ctx.created_by, "user.purge", "user", uid, {"timesheets": purged, "job": True})
+    return {"users": len(user_ids), "timesheets": done}
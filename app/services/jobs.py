@@ -0,0 +1,323 @@
+# app/services/jobs.py
+"""
+进程内后台任务调度（以 jobs 表为队列）：
+
+- submit() 写入一条 queued 任务并唤醒调度线程；
+- 调度线程按 id 顺序认领任务：UPDATE ... WHERE status='queued'，影响行数为 1 才算认领成功，
+  多个进程 / worker 同时运行也不会重复执行；
+- 每种任务类型有并发上限（注册时指定）：全局 running 数作为认领 UPDATE 的条件，与状态变更在同一条语句里判断；
+- 运行中的任务定期刷新 heartbeat_at；启动时把心跳超时的 running 任务重新入队（或在超过重试次数后置为失败）；
+- 取消：queued 直接取消；running 置 cancel_requested，任务在下一次 ctx.progress() 时退出；
+- 停止（进程退出）：不再认领，运行中的任务在下一次 ctx.progress() 时退出并重新入队；
+  等待超时仍未退出的任务继续运行到结束，期间照常刷新心跳，不会被其它进程的 recover() 重复执行。
+
+任务处理函数用 @job_handler 注册，签名为 func(ctx: JobContext, params: dict) -> dict | None。
+"""
+import logging
+import os
+import socket
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Job
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class JobType:
+    name: str
+    func: Callable[["JobContext", dict], Optional[dict]]
+    max_concurrency: int = 1
+
+
+_HANDLERS: dict[str, JobType] = {}
+
+
+def job_handler(name: str, max_concurrency: int = 1):
+    def decorator(func):
+        _HANDLERS[name] = JobType(name=name, func=func, max_concurrency=max_concurrency)
+        return func
+    return decorator
+
+
+def job_types() -> list[str]:
+    return sorted(_HANDLERS)
+
+
+def _below_limit(spec: JobType):
+    """认领条件：该类型全局 running 数低于并发上限"""
+    # 包一层派生表：MySQL 不允许 UPDATE 的子查询直接引用被更新的表（聚合使派生表物化而不会被合并回来）；
+    # InnoDB 对 UPDATE 里的子查询加共享 next-key 锁，两个进程同时认领同一类型时后者等待或被判死锁，不会双双成功
+    running = (
+        select(func.count().label("n")).select_from(Job)
+        .where(Job.type == spec.name, Job.status == "running")
+        .subquery("running_jobs")
+    )
+    return select(running.c.n).scalar_subquery() < spec.max_concurrency
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobInterrupted(Exception):
+    """本进程正在停止；任务重新入队，由之后的进程继续"""
+
+
+class JobContext:
+    def __init__(self, runner: "JobRunner", job_id: int, created_by: Optional[int]):
+        self.runner = runner
+        self.job_id = job_id
+        self.created_by = created_by
+        self.result_path: Optional[str] = None
+
+    def session(self) -> Session:
+        return self.runner.session_factory()
+
+    def progress(self, pct: float, message: Optional[str] = None) -> None:
+        """上报进度并刷新心跳；若已请求取消则抛出 JobCancelled"""
+        values: dict[str, Any] = {"progress": max(0.0, min(100.0, float(pct))), "heartbeat_at": datetime.utcnow()}
+        if message is not None:
+            values["message"] = message[:255]
+        with self.session() as db:
+            db.execute(update(Job).where(Job.id == self.job_id).values(**values))
+            cancel = db.execute(select(Job.cancel_requested).where(Job.id == self.job_id)).scalar()
+            db.commit()
+        if cancel:
+            raise JobCancelled()
+        if self.runner.stopping:
+            raise JobInterrupted()
+
+    def output_path(self, filename: str) -> str:
+        """任务结果文件路径；任务成功后可通过 /jobs/{id}/download 下载"""
+        os.makedirs(self.runner.files_dir, exist_ok=True)
+        self.result_path = os.path.join(self.runner.files_dir, f"{self.job_id}_{filename}")
+        return self.result_path
+
+
+class JobRunner:
+    def __init__(self, workers: int, poll_interval: float, stale_seconds: int,
+                 max_attempts: int, files_dir: str, session_factory=None):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_seconds = stale_seconds
+        self.max_attempts = max_attempts
+        self.files_dir = files_dir
+        self._session_factory = session_factory
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)   # 本进程的任务全部结束时通知
+        self._claim_lock = threading.Lock()            # 认领 + 提交到线程池，stop() 据此等待进行中的认领
+        self._running: dict[int, str] = {}   # 本进程正在执行的 job_id -> type
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            from app.db import SessionLocal
+            return SessionLocal
+        return self._session_factory
+
+    @session_factory.setter
+    def session_factory(self, factory) -> None:
+        self._session_factory = factory
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop.is_set()
+
+    # ---------- 生命周期 ----------
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            if not self._stop.is_set():
+                return
+            # 上一次 stop() 之后还有任务没退出，等它们结束（调度线程随之退出）
+            self._thread.join()
+        self._stop.clear()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"   # prefork 后 pid 会变
+        self.recover()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self._thread = threading.Thread(target=self._loop, name="job-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        停止认领；运行中的任务在下一次 ctx.progress() 时退出并重新入队，最多等待 timeout 秒。
+        仍未退出的任务继续运行（解释器退出前会等待线程池），调度线程继续为它们刷新心跳直到结束。
+        """
+        self._stop.set()
+        self._wake.set()
+        with self._claim_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        with self._idle:
+            drained = self._idle.wait_for(lambda: not self._running, timeout)
+        if drained and self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        elif not drained:
+            logger.warning("job runner stopping with %d job(s) still running", len(self._running))
+
+    def recover(self) -> None:
+        """崩溃恢复：心跳超时的 running 任务重新入队，超过重试次数的置为失败"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+        stale = (Job.status == "running") & ((Job.heartbeat_at == None) | (Job.heartbeat_at < cutoff))  # noqa: E711
+        with self.session_factory() as db:
+            failed = db.execute(
+                update(Job).where(stale, Job.attempts >= self.max_attempts).values(
+                    status="failed", finished_at=datetime.utcnow(),
+                    error=f"abandoned after {self.max_attempts} attempts",
+                )
+            ).rowcount
+            requeued = db.execute(
+                update(Job).where(stale).values(status="queued", worker=None, message="recovered after crash")
+            ).rowcount
+            db.commit()
+        if failed or requeued:
+            logger.warning("job recovery: %d requeued, %d failed", requeued, failed)
+
+    # ---------- 提交 / 取消 ----------
+    def submit(self, db: Session, job_type: str, params: dict, created_by: Optional[int]) -> Job:
+        if job_type not in _HANDLERS:
+            raise HTTPException(status_code=400, detail=f"unknown job type: {job_type}")
+        job = Job(type=job_type, params=params or {}, status="queued", created_by=created_by,
+                  progress=0.0, attempts=0, cancel_requested=False, created_at=datetime.utcnow())
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self._wake.set()
+        return job
+
+    def cancel(self, db: Session, job_id: int) -> None:
+        db.execute(
+            update(Job).where(Job.id == job_id, Job.status == "queued")
+            .values(status="cancelled", finished_at=datetime.utcnow())
+        )
+        db.execute(
+            update(Job).where(Job.id == job_id, Job.status == "running").values(cancel_requested=True)
+        )
+        db.commit()
+
+    # ---------- 调度 ----------
+    def _loop(self) -> None:
+        # 停止后不再认领，但要一直刷新心跳到本进程的任务全部结束
+        while not self._stop.is_set() or self._running:
+            try:
+                self._heartbeat()
+                if not self._stop.is_set():
+                    self._claim_available()
+            except Exception:
+                logger.exception("job scheduler iteration failed")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _heartbeat(self) -> None:
+        with self._lock:
+            ids = list(self._running)
+        if not ids:
+            return
+        with self.session_factory() as db:
+            db.execute(update(Job).where(Job.id.in_(ids)).values(heartbeat_at=datetime.utcnow()))
+            db.commit()
+
+    def _claim_available(self) -> None:
+        while not self._stop.is_set():
+            with self._lock:
+                if len(self._running) >= self.workers:
+                    return
+            with self._claim_lock:
+                if self._stop.is_set():
+                    return
+                job = self._claim_one()
+                if job is None:
+                    return
+                self._executor.submit(self._execute, *job)
+
+    def _claim_one(self) -> Optional[tuple]:
+        with self.session_factory() as db:
+            candidates = db.execute(
+                select(Job.id, Job.type, Job.params, Job.created_by)
+                .where(Job.status == "queued").order_by(Job.id).limit(50)
+            ).all()
+            full: set[str] = set()   # 本轮已认领失败的类型（多半已到并发上限），同类型的其余任务不再尝试
+            for job_id, job_type, params, created_by in candidates:
+                spec = _HANDLERS.get(job_type)
+                if spec is None or job_type in full:
+                    continue
+                now = datetime.utcnow()
+                try:
+                    claimed = db.execute(
+                        update(Job).where(Job.id == job_id, Job.status == "queued", _below_limit(spec)).values(
+                            status="running", worker=self.worker_id, started_at=now, heartbeat_at=now,
+                            attempts=Job.attempts + 1,
+                        )
+                    ).rowcount
+                    db.commit()
+                except OperationalError:
+                    # 与其它进程同时认领同一类型时可能被判死锁；下一轮再试
+                    db.rollback()
+                    logger.info("job claim conflict on %s (%s), retrying later", job_id, job_type)
+                    claimed = 0
+                if claimed != 1:
+                    full.add(job_type)
+                    continue
+                with self._lock:
+                    self._running[job_id] = job_type
+                return job_id, job_type, params or {}, created_by
+        return None
+
+    def _finish(self, job_id: int, **values) -> None:
+        with self.session_factory() as db:
+            db.execute(update(Job).where(Job.id == job_id).values(finished_at=datetime.utcnow(), **values))
+            db.commit()
+
+    def _requeue(self, job_id: int) -> None:
+        """因进程停止而中断：放回队列，本次不计入重试次数"""
+        with self.session_factory() as db:
+            db.execute(update(Job).where(Job.id == job_id, Job.status == "running").values(
+                status="queued", worker=None, message="interrupted by shutdown", attempts=Job.attempts - 1,
+            ))
+            db.commit()
+
+    def _execute(self, job_id: int, job_type: str, params: dict, created_by: Optional[int]) -> None:
+        ctx = JobContext(self, job_id, created_by)
+        try:
+            if self.stopping:
+                raise JobInterrupted()
+            result = _HANDLERS[job_type].func(ctx, params)
+            self._finish(job_id, status="succeeded", progress=100.0, result=result, result_path=ctx.result_path)
+        except JobCancelled:
+            self._finish(job_id, status="cancelled", message="cancelled")
+        except JobInterrupted:
+            self._requeue(job_id)
+        except Exception as e:
+            logger.exception("job %s (%s) failed", job_id, job_type)
+            self._finish(job_id, status="failed", error="".join(traceback.format_exception(e))[-4000:])
+        finally:
+            with self._idle:
+                self._running.pop(job_id, None)
+                self._idle.notify_all()
+            self._wake.set()
+
+
+runner = JobRunner(
+    workers=settings.job_workers,
+    poll_interval=settings.job_poll_interval,
+    stale_seconds=settings.job_stale_seconds,
+    max_attempts=settings.job_max_attempts,
+    files_dir=settings.job_files_dir,
+)
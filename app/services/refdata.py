@@ -0,0 +1,31 @@
+# app/services/refdata.py
+"""
+项目、部门的参考数据缓存（机制见 app/refcache.py）。
+缓存的是整表的轻量投影，调用方按需过滤；修改这两张表的接口要在提交前调用 refcache.bump()。
+"""
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import refcache
+from app.models import Department, Project
+
+PROJECTS = "projects"
+DEPARTMENTS = "departments"
+
+
+def _load_projects(db: Session) -> list[dict]:
+    rows = db.execute(
+        select(Project.id, Project.name, Project.description, Project.status).order_by(Project.id)
+    ).mappings()
+    return [dict(r) for r in rows]
+
+
+def _load_departments(db: Session) -> list[dict]:
+    rows = db.execute(
+        select(Department.id, Department.name, Department.parent_id).order_by(Department.id)
+    ).mappings()
+    return [dict(r) for r in rows]
+
+
+projects = refcache.register(PROJECTS, _load_projects)
+departments = refcache.register(DEPARTMENTS, _load_departments)
@@ -0,0 +1,134 @@
+# app/services/timesheet_search.py
+"""
+工时全文检索（weekly_summary / note / reduce_desc / reason_desc）：
+
+- MySQL：timesheet_details 上四个字段的 FULLTEXT ... WITH PARSER ngram 索引（InnoDB 自动维护），
+  查询用 BOOLEAN MODE，每个检索词都必须出现（+"词"），相关度取 MATCH 的得分；
+- 其它数据库：按同样的 2-gram 规则切词，写入倒排表 timesheet_search_terms(term, timesheet_id, tf)，
+  要求检索词的全部 2-gram 都出现，得分为词频之和；两种方式都不支持单字检索（query_words 丢弃单字词）。
+
+倒排表随 ORM 写入自动维护（after_flush）；已有数据运行后台任务 rebuild_timesheet_search 回填。
+归档只搬迁工时行，明细与检索数据按 timesheet_id 保留。
+"""
+import re
+from collections import Counter
+from typing import Iterable
+
+from fastapi import HTTPException
+from sqlalchemy import delete, event, func, insert, inspect, select
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app import models
+from app.db import SessionLocal
+
+SEARCH_FIELDS = ("weekly_summary", "note", "reduce_desc", "reason_desc")
+NGRAM = 2                 # 与 MySQL ngram_token_size 默认值一致
+MAX_QUERY_WORDS = 8
+
+_WORD = re.compile(r"\w+")
+# BOOLEAN MODE 的操作符，检索词里出现时直接去掉
+_OPERATORS = re.compile(r'[+\-<>()~*"@]+')
+
+details = models.TimesheetDetail.__table__
+terms = models.timesheet_search_terms
+
+
+def _fulltext(bind) -> bool:
+    return bind.dialect.name == "mysql"
+
+
+def document(row) -> str:
+    """row 可以是 ORM 对象或 mapping"""
+    get = row.get if hasattr(row, "get") else lambda f: getattr(row, f, None)
+    return "\n".join(v for v in (get(f) for f in SEARCH_FIELDS) if v)
+
+
+def ngrams(word: str) -> list[str]:
+    if len(word) <= NGRAM:
+        return [word]
+    return [word[i:i + NGRAM] for i in range(len(word) - NGRAM + 1)]
+
+
+def tokenize(content: str) -> Counter:
+    counts: Counter = Counter()
+    for word in _WORD.findall(content.lower()):
+        counts.update(ngrams(word))
+    return counts
+
+
+def query_words(q: str) -> list[str]:
+    """
+    检索词；短于 NGRAM 的词直接丢弃：文档只按 2-gram 入索引，单字永远匹配不到
+    （MySQL ngram 全文索引同样查不到单字），留着只会让整个查询返回空。
+    """
+    words = [w for w in _OPERATORS.sub(" ", q).lower().split() if w]
+    if not words:
+        raise HTTPException(400, "Empty search query")
+    words = [w for w in words if len(w) >= NGRAM]
+    if not words:
+        raise HTTPException(400, f"Search words must be at least {NGRAM} characters")
+    return words[:MAX_QUERY_WORDS]
+
+
+# ---------- 写索引 ----------
+def reindex(conn: Connection, contents: dict[int, str]) -> None:
+    """重建这些工时的倒排数据；内容为空的只删除。MySQL 的 FULLTEXT 索引由 InnoDB 维护，这里不做处理"""
+    if not contents or _fulltext(conn):
+        return
+    conn.execute(delete(terms).where(terms.c.timesheet_id.in_(list(contents))))
+    rows = [
+        {"term": term, "timesheet_id": i, "tf": tf}
+        for i, c in contents.items() if c
+        for term, tf in tokenize(c).items()
+    ]
+    if rows:
+        conn.execute(insert(terms), rows)
+
+
+def unindex(conn: Connection, ids: Iterable[int]) -> None:
+    ids = list(ids)
+    if ids and not _fulltext(conn):
+        conn.execute(delete(terms).where(terms.c.timesheet_id.in_(ids)))
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _sync_index(session: Session, flush_context) -> None:
+    changed = {
+        obj.timesheet_id: document(obj)
+        for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, models.TimesheetDetail)
+        and (obj in session.new or any(inspect(obj).attrs[f].history.has_changes() for f in SEARCH_FIELDS))
+    }
+    removed = [obj.timesheet_id for obj in session.deleted if isinstance(obj, models.TimesheetDetail)]
+    if changed or removed:
+        conn = session.connection()
+        reindex(conn, changed)
+        unindex(conn, removed)
+
+
+# ---------- 查询 ----------
+def hits(bind, q: str):
+    """
+    命中的工时及得分：子查询 (timesheet_id, score)，由调用方与工时数据源连接并叠加其它过滤条件。
+    """
+    words = query_words(q)
+    if _fulltext(bind):
+        against = " ".join(f'+"{w}"' for w in words)
+        # 列的顺序须与 FULLTEXT 索引定义一致（migrations/009）
+        relevance = match(*(details.c[f] for f in SEARCH_FIELDS), against=against).in_boolean_mode()
+        # 得分保留 6 位小数，作为游标比较时不受浮点往返误差影响
+        return (
+            select(details.c.timesheet_id, func.round(relevance, 6).label("score"))
+            .where(relevance > 0)
+            .subquery("hits")
+        )
+    wanted = sorted({g for w in words for g in ngrams(w)})
+    return (
+        select(terms.c.timesheet_id, func.sum(terms.c.tf).label("score"))
+        .where(terms.c.term.in_(wanted))
+        .group_by(terms.c.timesheet_id)
+        .having(func.count() == len(wanted))
+        .subquery("hits")
+    )
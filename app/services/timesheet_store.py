@@ -0,0 +1,105 @@
+# app/services/timesheet_store.py
+"""
+工时冷热分层：
+- 热数据：timesheets（MySQL 上按 created_at 月度 RANGE 分区，见 migrations/005）；
+- 冷数据：timesheets_archive（归档任务按月整体搬迁）。
+
+查询默认只看最近 settings.timesheet_hot_months 个自然月，WHERE 里带上 created_at 范围，
+MySQL 只扫描对应分区；请求的范围早于归档线时，自动 UNION ALL 归档表。
+
+长文本字段（DETAIL_FIELDS）在 timesheet_details，热表和归档表共用：
+查询先在窄表上完成过滤、排序、分页，再按当页 id 批量补齐文本（attach_details）。
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import select, union_all
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+
+
+DETAIL_FIELDS = ("weekly_summary", "reduce_desc", "reason_desc", "note")
+
+
+def month_start(months_back: int, today: Optional[date] = None) -> datetime:
+    """今天所在月往前推 months_back 个月的 1 号 00:00"""
+    today = today or date.today()
+    y, m = divmod(today.year * 12 + today.month - 1 - months_back, 12)
+    return datetime(y, m + 1, 1)
+
+
+def hot_cutoff() -> Optional[datetime]:
+    if settings.timesheet_hot_months <= 0:
+        return None
+    return month_start(settings.timesheet_hot_months - 1)
+
+
+def archive_cutoff() -> Optional[datetime]:
+    """早于该时间的记录可能已在归档表中；未启用归档时为 None"""
+    if settings.timesheet_archive_after_months <= 0:
+        return None
+    return month_start(settings.timesheet_archive_after_months)
+
+
+def date_window(from_date: Optional[date], to_date: Optional[date]) -> tuple[Optional[datetime], Optional[datetime]]:
+    """
+    把请求的日期范围转成 [dt_from, dt_to) 的 datetime 区间；
+    两者都没传时默认只看热数据窗口。
+    """
+    dt_from = datetime.combine(from_date, time.min) if from_date else None
+    # 右开区间：第二天 00:00
+    dt_to = datetime.combine(to_date + timedelta(days=1), time.min) if to_date else None
+    if from_date is None and to_date is None:
+        dt_from = hot_cutoff()
+    return dt_from, dt_to
+
+
+def needs_archive(dt_from: Optional[datetime]) -> bool:
+    cutoff = archive_cutoff()
+    return cutoff is not None and (dt_from is None or dt_from < cutoff)
+
+
+def timesheet_source(dt_from: Optional[datetime]):
+    """
+    返回查询用的数据源，列名与 timesheets 相同（调用方统一用 src.c.xxx）：
+    范围不涉及归档数据时就是 timesheets 表本身，否则是两表的 UNION ALL。
+    """
+    hot = models.Timesheet.__table__
+    if not needs_archive(dt_from):
+        return hot
+    cold = models.timesheets_archive
+    return union_all(
+        select(*hot.c),
+        select(*(cold.c[c.name] for c in hot.c)),
+    ).subquery("timesheets_all")
+
+
+def window_filters(src, dt_from: Optional[datetime], dt_to: Optional[datetime]) -> list:
+    filters = []
+    if dt_from is not None:
+        filters.append(src.c.created_at >= dt_from)
+    if dt_to is not None:
+        filters.append(src.c.created_at < dt_to)
+    return filters
+
+
+def attach_details(db: Session, rows: list[dict], fields: Iterable[str] = DETAIL_FIELDS) -> list[dict]:
+    """按 rows 里的 id 一次主键查询取回明细字段并就地填入；没有明细行的记为 None"""
+    fields = list(fields)
+    D = models.TimesheetDetail
+    found = {}
+    if rows:
+        found = {
+            r["timesheet_id"]: r
+            for r in db.execute(
+                select(D.timesheet_id, *(getattr(D, f) for f in fields))
+                .where(D.timesheet_id.in_([row["id"] for row in rows]))
+            ).mappings()
+        }
+    for row in rows:
+        detail = found.get(row["id"])
+        for f in fields:
+            row[f] = detail[f] if detail is not None else None
+    return rows
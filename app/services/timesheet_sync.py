@@ -0,0 +1,128 @@
+# app/services/timesheet_sync.py
+"""
+工时增量同步（GET /timesheets/changes）：
+
+- 变更序号由 timesheet_change_seq 的 AUTO_INCREMENT 分配，每个事务取一次号（缓存在 session.info）：
+  MySQL 上在独立的短事务里插入并立即提交，不持有任何到业务提交为止的锁，写入之间互不等待；
+  业务事务里删除自己的取号行，随业务一起提交；回滚时另开连接删除。
+  因此表里剩下的就是“已取号、尚未结束”的事务；
+- 取号顺序不等于提交顺序，/changes 只返回低水位（未结束事务的最小序号 - 1）之前的变更，
+  晚提交的小序号不会被跳过；超过 settings.timesheet_change_pending_seconds 的取号行视为已中止（进程崩溃），不再计入；
+- SQLite 等单写者数据库：取号放在业务事务里，写锁持有到提交，取号顺序即提交顺序；
+- 新增、修改（含只改长文本明细）、审批都会给工时行写入新的 change_seq；
+  ORM 删除时写一条墓碑（timesheet_tombstones），批量 UPDATE 由调用方用 next_seq() 自行带上；
+- 同步令牌是 (change_seq, id) 的游标；墓碑被清理后，早于清理线的令牌返回 410，客户端需全量重新同步。
+
+归档任务搬走的记录不产生墓碑（数据仍在，只是不在热表）。
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app import models, refcache
+from app.config import settings
+from app.db import SessionLocal
+
+# 已清理墓碑的最大序号（存放在 cache_versions，由 purge_timesheet_tombstones 写入）
+TOMBSTONES_PURGED = "timesheet_tombstones_purged"
+
+_SEQ_KEY = "timesheet_change_seq"
+seqs = models.timesheet_change_seq
+
+
+def _separate_allocation(db: Session) -> bool:
+    return db.get_bind().dialect.name == "mysql"
+
+
+def next_seq(db: Session) -> int:
+    """本事务的变更序号（同一事务多次调用返回同一个值）"""
+    seq = db.info.get(_SEQ_KEY)
+    if seq is not None:
+        return seq
+    row = {"created_at": datetime.utcnow()}
+    if _separate_allocation(db):
+        with db.get_bind().begin() as conn:
+            seq = conn.execute(insert(seqs).values(**row)).inserted_primary_key[0]
+    else:
+        seq = db.execute(insert(seqs).values(**row)).inserted_primary_key[0]
+    # 提交即表示本事务结束；不影响自增计数
+    db.execute(delete(seqs).where(seqs.c.seq == seq))
+    db.info[_SEQ_KEY] = seq
+    return seq
+
+
+def safe_seq(db: Session) -> Optional[int]:
+    """低水位：不超过该值的变更都已提交；None 表示没有未结束的事务，不需要限制"""
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.timesheet_change_pending_seconds)
+    pending = db.execute(select(func.min(seqs.c.seq)).where(seqs.c.created_at >= cutoff)).scalar()
+    return None if pending is None else pending - 1
+
+
+def change_marker(db: Session) -> tuple:
+    """
+    工时数据的变更标记（列表 ETag 用）：新增 / 修改取新序号，删除写墓碑，任何写入都会让它变化；
+    带上低水位，取号早、提交晚的事务提交时标记同样会变。只用到两个索引的最大值和一次取号表查询。
+    """
+    return (
+        db.execute(select(func.max(models.Timesheet.change_seq))).scalar(),
+        db.execute(select(func.max(models.TimesheetTombstone.change_seq))).scalar(),
+        safe_seq(db),
+    )
+
+
+def purge_stale_allocations(db: Session) -> int:
+    """删除超时未结束的取号行（崩溃遗留），由 purge_timesheet_tombstones 顺带执行"""
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.timesheet_change_pending_seconds)
+    return db.execute(delete(seqs).where(seqs.c.created_at < cutoff)).rowcount
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _forget_seq(session: Session) -> None:
+    session.info.pop(_SEQ_KEY, None)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _release_seq(session: Session) -> None:
+    seq = session.info.pop(_SEQ_KEY, None)
+    if seq is not None and _separate_allocation(session):
+        # 取号行已在独立事务里提交，业务回滚后不删掉会一直挡住低水位（直到超时）
+        with session.get_bind().begin() as conn:
+            conn.execute(delete(seqs).where(seqs.c.seq == seq))
+
+
+def purged_seq(db: Session) -> int:
+    return refcache.current_version(db, TOMBSTONES_PURGED)
+
+
+def mark_purged(db: Session, seq: int) -> None:
+    """记录墓碑清理线：与删除墓碑在同一事务提交"""
+    updated = db.execute(
+        update(models.CacheVersion).where(models.CacheVersion.name == TOMBSTONES_PURGED).values(version=seq)
+    ).rowcount
+    if not updated:
+        db.execute(insert(models.CacheVersion).values(name=TOMBSTONES_PURGED, version=seq))
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _stamp_changes(session: Session, flush_context, instances) -> None:
+    changed = [
+        obj for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, models.Timesheet) and (obj in session.new or session.is_modified(obj))
+    ]
+    # 只改了明细（note 等）时，主表行也要换新序号
+    for obj in session.dirty:
+        if isinstance(obj, models.TimesheetDetail) and session.is_modified(obj):
+            parent = session.get(models.Timesheet, obj.timesheet_id)
+            if parent is not None and parent not in changed:
+                changed.append(parent)
+    deleted = [obj for obj in session.deleted if isinstance(obj, models.Timesheet)]
+    if not changed and not deleted:
+        return
+
+    seq = next_seq(session)
+    for obj in changed:
+        obj.change_seq = seq
+    for obj in deleted:
+        session.add(models.TimesheetTombstone(change_seq=seq, timesheet_id=obj.id, user_id=obj.user_id))
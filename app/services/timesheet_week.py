@@ -0,0 +1,88 @@
+# app/services/timesheet_week.py
+"""
+整周提交（PUT /timesheets/week/{week_no}）：客户端提交当前用户这一周的全部条目，
+服务端与库里已有的行逐字段比较，只对有差异的行做新增 / 修改 / 删除，整周一个事务。
+
+- 带 id 的条目对应已有行；不带 id 的是新增；已有而未提交的行删除；
+- 只有待审核（submitted）的行可以改动：已审批 / 已驳回的行原样带回或省略都保持不变，
+  内容有变化则 403；
+- 条目带 version 时须与库里一致，否则 409；未带时仍由 Timesheet.version 在提交时做 CAS；
+- 内容完全相同的行不产生任何语句，也不会换新 change_seq / version。
+
+写入走 ORM 工作单元：同构的 UPDATE / DELETE 在一次 flush 里合并为 executemany，
+change_seq、墓碑、检索数据与版本号照常由各自的 flush 钩子维护。
+只看热数据表：已归档月份的周不可修改。
+"""
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from app import models
+from app.schemas import TimesheetCreate, TimesheetWeekEntry
+
+# 整周提交可以写入的字段（与单条 PUT 一致；task_id 不由前端维护）
+WRITABLE_FIELDS = tuple(f for f in TimesheetCreate.model_fields if f != "task_id")
+
+
+def load_week(db: Session, user_id: int, week_no: str) -> list[models.Timesheet]:
+    T = models.Timesheet
+    return db.execute(
+        select(T).options(selectinload(T.detail))
+        .where(T.user_id == user_id, T.week_no == week_no)
+        .order_by(T.id)
+    ).scalars().all()
+
+
+def _values(entry: TimesheetWeekEntry, week_no: str) -> dict:
+    values = {f: getattr(entry, f) for f in WRITABLE_FIELDS}
+    values["hours"] = float(values["hours"] or 0)
+    values["overtime"] = bool(values["overtime"])
+    values["week_no"] = week_no
+    return values
+
+
+def _changes(ts: models.Timesheet, values: dict) -> dict:
+    return {f: v for f, v in values.items() if getattr(ts, f) != v}
+
+
+def replace_week(db: Session, user_id: int, week_no: str, entries: list[TimesheetWeekEntry]) -> dict:
+    """在 db 上应用差异（不提交），返回 {inserted, updated, deleted, unchanged}"""
+    ids = [e.id for e in entries if e.id is not None]
+    if len(ids) != len(set(ids)):
+        raise HTTPException(status_code=400, detail="Duplicate timesheet id in week")
+    for e in entries:
+        if e.hours <= 0 or e.hours > 1000:
+            raise HTTPException(status_code=400, detail="工时数必须在 0~1000 之间")
+
+    existing = {ts.id: ts for ts in load_week(db, user_id, week_no)}
+    unknown = set(ids).difference(existing)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Not in week {week_no}: {', '.join(map(str, sorted(unknown)))}")
+
+    counts = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+    for e in entries:
+        values = _values(e, week_no)
+        if e.id is None:
+            db.add(models.Timesheet(user_id=user_id, status="submitted", **values))
+            counts["inserted"] += 1
+            continue
+
+        ts = existing[e.id]
+        if e.version is not None and e.version != ts.version:
+            raise HTTPException(status_code=409, detail=f"Timesheet {ts.id} has been modified")
+        changes = _changes(ts, values)
+        if not changes:
+            counts["unchanged"] += 1
+            continue
+        if ts.status != "submitted":
+            raise HTTPException(status_code=403, detail="非待审核记录不可修改")
+        for f, v in changes.items():
+            setattr(ts, f, v)
+        counts["updated"] += 1
+
+    kept = set(ids)
+    for ts_id, ts in existing.items():
+        if ts_id not in kept and ts.status == "submitted":
+            db.delete(ts)
+            counts["deleted"] += 1
+    return counts
@@ -1,8 +1,36 @@
 # app/services/users.py
+from datetime import datetime
+
+from sqlalchemy import delete, event, func, insert, inspect, literal, select
 from sqlalchemy.orm import Session
-from app.models import User, Department
+
+from app import refcache
+from app.db import SessionLocal
+from app.models import (
+    Department, Timesheet, TimesheetDetail, TimesheetTombstone, User, timesheets_archive, user_departments,
+)
+from app.services import timesheet_search, timesheet_sync
 
 DEFAULT_DEPT_ID = 1  # General 部门 ID
+# 用户列表 ETag 的变更标记（cache_versions 中的一行）：用户或部门成员关系有任何变化，提交后 +1
+USERS_VERSION = "users"
+
+
+def _affects_user_list(session: Session, obj) -> bool:
+    if isinstance(obj, User):
+        return obj not in session.dirty or session.is_modified(obj)
+    if isinstance(obj, Department):
+        # 部门只关心成员关系；删除部门会连带删除成员关系
+        return obj in session.deleted or inspect(obj).attrs.users.history.has_changes()
+    return False
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _bump_users_version(session: Session, flush_context, instances) -> None:
+    """ORM 写入用户（含软删除 / 恢复 / 改状态）或增删部门成员时登记；业务提交后再 +1，不在事务里持有版本行的锁"""
+    if any(_affects_user_list(session, obj) for obj in (*session.new, *session.dirty, *session.deleted)):
+        refcache.bump_after_commit(session, USERS_VERSION)
+
 
 def create_user_with_default_department(db: Session, **user_data) -> User:
     """
@@ -19,3 +47,62 @@ def create_user_with_default_department(db: Session, **user_data) -> User:
     db.commit()
     db.refresh(user)
     return user
+
+
+# ---------- 删除：软删除 + 分批硬清理 ----------
+# 不走 ORM 级联（那会把该用户全部工时加载进内存再逐行 DELETE），全部用按主键分批的集合 DELETE。
+
+def soft_delete_user(db: Session, user: User) -> None:
+    """标记删除并停用；工时与部门关系保留，查询里按 deleted_at 过滤"""
+    user.deleted_at = datetime.utcnow()
+    user.is_active = False
+
+
+def count_user_timesheets(db: Session, user_id: int) -> int:
+    return sum(
+        db.execute(select(func.count()).select_from(table).where(table.c.user_id == user_id)).scalar() or 0
+        for table in (Timesheet.__table__, timesheets_archive)
+    )
+
+
+def purge_timesheets_batch(db: Session, user_id: int, batch: int) -> int:
+    """删除该用户的一批工时（先热表后归档表）及其明细、检索数据，返回本批条数；0 表示已删完"""
+    for table in (Timesheet.__table__, timesheets_archive):
+        ids = db.execute(
+            select(table.c.id).where(table.c.user_id == user_id).order_by(table.c.id).limit(batch)
+        ).scalars().all()
+        if not ids:
+            continue
+        db.execute(delete(TimesheetDetail).where(TimesheetDetail.timesheet_id.in_(ids)))
+        timesheet_search.unindex(db.connection(), ids)
+        # 删除要让增量同步的客户端知道；归档表里的行也曾同步给客户端（归档搬迁不写墓碑），同样写墓碑
+        seq = timesheet_sync.next_seq(db)
+        db.execute(insert(TimesheetTombstone).from_select(
+            ["change_seq", "timesheet_id", "user_id"],
+            select(literal(seq), table.c.id, table.c.user_id).where(table.c.id.in_(ids)),
+        ))
+        db.execute(delete(table).where(table.c.id.in_(ids)))
+        return len(ids)
+    return 0
+
+
+def purge_user(db: Session, user_id: int, batch: int, on_batch=None) -> int:
+    """
+    硬删除用户：每批工时一个事务，最后删除部门关系与用户行；返回删除的工时条数。
+    on_batch(已删条数) 在每批提交后调用（后台任务用来上报进度）。
+    """
+    purged = 0
+    while True:
+        n = purge_timesheets_batch(db, user_id, batch)
+        db.commit()
+        if not n:
+            break
+        purged += n
+        if on_batch is not None:
+            on_batch(purged)
+    db.execute(delete(user_departments).where(user_departments.c.user_id == user_id))
+    db.execute(delete(User).where(User.id == user_id))
+    # 绕过了 ORM，before_flush 钩子看不到
+    refcache.bump_after_commit(db, USERS_VERSION)
+    db.commit()
+    return purged
@@ -0,0 +1,212 @@
+# app/static_assets.py
+"""
+静态资源：构建（指纹 + 预压缩 + manifest）与带缓存头的服务。
+
+构建：
+  python -m app.static_assets static var/static --url-prefix /static
+  python -m app.static_assets frontend/dist var/frontend --url-prefix /
+
+- HTML 是入口，保留原文件名；其余文件复制为 name.<hash>.ext，HTML / CSS 里的引用改写为指纹文件名；
+  已带哈希的文件（如 Vite 产出的 assets/index-3fA9c1Xe.js）不再改名；
+- 文本类文件额外生成 .gz / .br（brotli 为可选依赖），服务时按 Accept-Encoding 直接发送，不再实时压缩；
+- manifest.json 记录每个文件的内容哈希、可用编码以及 原文件名 -> 指纹文件名 的映射。
+
+服务（AssetStaticFiles）：
+- 指纹文件：Cache-Control: public, max-age=31536000, immutable；
+- HTML 等非指纹文件：Cache-Control: no-cache + 内容哈希 ETag，重复访问只返回 304；
+- 目录下没有 manifest.json（开发时直接挂载源码目录）时退化为普通 StaticFiles + no-cache。
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.compression import accepted_encodings
+
+try:  # 可选依赖
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+MANIFEST = "manifest.json"
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+_COMPRESSIBLE = (".html", ".htm", ".css", ".js", ".mjs", ".json", ".svg", ".txt", ".xml", ".map", ".ico")
+_MIN_COMPRESS_SIZE = 256
+# Vite 产物：assets/name-<8 位哈希>.ext，文件名已经随内容变化
+_HASHED_NAME = re.compile(r"(^|/)assets/[^/]+-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$")
+_HTML_REF = re.compile(r"""(?P<pre>\b(?:src|href)\s*=\s*["'])(?P<url>[^"'#?]+)""", re.I)
+_CSS_REF = re.compile(r"""(?P<pre>url\(\s*["']?)(?P<url>[^"')#?]+)""", re.I)
+
+
+# ---------- 构建 ----------
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def _fingerprinted(rel: str, digest: str) -> str:
+    stem, ext = os.path.splitext(rel)
+    return f"{stem}.{digest}{ext}"
+
+
+def _rewrite(text: str, rel: str, renamed: dict[str, str], url_prefix: str, pattern: re.Pattern) -> str:
+    """把文件里对其它资源的引用替换为指纹文件名（绝对前缀与相对路径两种写法）"""
+    base = os.path.dirname(rel)
+    prefix = url_prefix.rstrip("/") + "/"
+
+    def replace(m: re.Match) -> str:
+        url = m.group("url")
+        if url.startswith(prefix):
+            target = renamed.get(url[len(prefix):])
+            new = prefix + target if target else url
+        elif "://" in url or url.startswith(("/", "data:", "mailto:")):
+            new = url
+        else:
+            target = renamed.get(os.path.normpath(os.path.join(base, url)).replace(os.sep, "/"))
+            new = os.path.relpath(target, base or ".").replace(os.sep, "/") if target else url
+        return m.group("pre") + new
+
+    return pattern.sub(replace, text)
+
+
+def _write_variants(path: str, data: bytes) -> list[str]:
+    """生成预压缩文件；只保留确实变小的编码"""
+    encodings = []
+    if not path.endswith(_COMPRESSIBLE) or len(data) < _MIN_COMPRESS_SIZE:
+        return encodings
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data):
+            with open(path + ".br", "wb") as f:
+                f.write(compressed)
+            encodings.append("br")
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) < len(data):
+        with open(path + ".gz", "wb") as f:
+            f.write(compressed)
+        encodings.append("gzip")
+    return encodings
+
+
+def build(src_dir: str, out_dir: str, url_prefix: str = "/static") -> dict:
+    sources: dict[str, bytes] = {}
+    for root, _, files in os.walk(src_dir):
+        for name in files:
+            full = os.path.join(root, name)
+            rel = os.path.relpath(full, src_dir).replace(os.sep, "/")
+            with open(full, "rb") as f:
+                sources[rel] = f.read()
+
+    # 先处理被引用的资源，再处理引用它们的 CSS，最后是 HTML 入口
+    def stage(rel: str) -> int:
+        return 2 if rel.endswith((".html", ".htm")) else 1 if rel.endswith(".css") else 0
+
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+    renamed: dict[str, str] = {}
+    files: dict[str, dict] = {}
+    for rel in sorted(sources, key=lambda r: (stage(r), r)):
+        data = sources[rel]
+        if stage(rel) == 1:
+            data = _rewrite(data.decode("utf-8"), rel, renamed, url_prefix, _CSS_REF).encode("utf-8")
+        elif stage(rel) == 2:
+            data = _rewrite(data.decode("utf-8"), rel, renamed, url_prefix, _HTML_REF).encode("utf-8")
+        digest = _digest(data)
+
+        if stage(rel) == 2:
+            served, immutable = rel, False
+        elif _HASHED_NAME.search(rel):
+            served, immutable = rel, True
+        else:
+            served, immutable = _fingerprinted(rel, digest), True
+            renamed[rel] = served
+
+        path = os.path.join(out_dir, served)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        files[served] = {
+            "source": rel,
+            "hash": digest,
+            "immutable": immutable,
+            "encodings": _write_variants(path, data),
+        }
+
+    manifest = {"url_prefix": url_prefix, "assets": renamed, "files": files}
+    with open(os.path.join(out_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(directory: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+# ---------- 服务 ----------
+class AssetStaticFiles(StaticFiles):
+    def __init__(self, *, directory: str, **kwargs) -> None:
+        super().__init__(directory=directory, **kwargs)
+        manifest = load_manifest(directory) or {}
+        self.files: dict[str, dict] = manifest.get("files", {})
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope,
+                      status_code: int = 200) -> Response:
+        rel = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        entry = self.files.get(rel)
+        if entry is None:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+            response.headers.setdefault("Cache-Control", REVALIDATE)
+            return response
+
+        request_headers = Headers(scope=scope)
+        accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+        encoding = next((e for e in ("br", "gzip") if e in entry["encodings"] and e in accepted), None)
+        path = f"{full_path}.{'gz' if encoding == 'gzip' else encoding}" if encoding else full_path
+
+        # 内容哈希做 ETag：与 mtime 无关，重新部署后内容不变仍然命中；不同编码的表示各自一个 ETag
+        headers = {
+            "Cache-Control": IMMUTABLE if entry["immutable"] else REVALIDATE,
+            "ETag": f'"{entry["hash"]}-{encoding}"' if encoding else f'"{entry["hash"]}"',
+            "Vary": "Accept-Encoding",
+        }
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        response = FileResponse(
+            path,
+            status_code=status_code,
+            headers=headers,
+            media_type=mimetypes.guess_type(full_path)[0] or "application/octet-stream",
+            stat_result=os.stat(path) if encoding else stat_result,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("src")
+    ap.add_argument("out")
+    ap.add_argument("--url-prefix", default="/static", help="资源挂载路径，用于改写绝对路径引用")
+    args = ap.parse_args(argv)
+    manifest = build(args.src, args.out, args.url_prefix)
+    print(f"{len(manifest['files'])} files, {len(manifest['assets'])} fingerprinted -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# app/warmup.py
+"""
+worker 启动预热与就绪探针（/readyz）。
+
+lifespan 在开始接流量之前调用 run()，把首批请求原本要承担的一次性开销提前付掉：
+- 连接池：预先建立 settings.db_pool_warm 个连接（主库、副本各一套）；
+- ORM：configure_mappers()，否则第一个用到模型的请求才去解析全部关系；
+- 参考数据：加载项目 / 部门缓存（app/services/refdata.py）；
+- 语句缓存：按主键取用户 / 工时、按 id 补明细等高频语句各执行一次（查不存在的 id），
+  编译结果进入引擎的 compiled cache，之后同结构的语句不再编译；
+- 密码哈希：dummy_verify() 加载 bcrypt 后端。
+
+/healthz 只表示进程活着；/readyz 在预热完成、且每个数据库在 settings.readyz_db_budget_ms 内应答 SELECT 1 时才返回 200。
+"""
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session, configure_mappers
+
+from app import models
+from app.config import settings
+from app.db import ReplicaSessionLocal, SessionLocal, engine, replica_engine, warm_pool
+from app.security import pwd_context
+from app.services import refdata
+from app.services.timesheet_store import attach_details
+
+logger = logging.getLogger(__name__)
+
+_ready = False
+# 各步骤耗时（毫秒），/readyz 原样返回，便于排查启动慢在哪一步
+_timings: dict[str, float] = {}
+
+
+def _engines() -> dict:
+    engines = {"primary": engine}
+    if replica_engine is not None:
+        engines["replica"] = replica_engine
+    return engines
+
+
+def _step(name: str, fn, *args) -> None:
+    started = time.perf_counter()
+    fn(*args)
+    _timings[name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def _warm_statements(db: Session) -> None:
+    db.get(models.User, 0)
+    db.get(models.Timesheet, 0)
+    attach_details(db, [{"id": 0}])
+    db.rollback()
+
+
+def _prime_refdata(db: Session) -> None:
+    refdata.projects.get(db)
+    refdata.departments.get(db)
+    db.rollback()
+
+
+def run() -> None:
+    """预热；任何一步失败都直接抛出（lifespan 失败，worker 不会进入就绪状态）"""
+    global _ready
+    _ready = False
+    for name, target in _engines().items():
+        _step(f"pool.{name}", warm_pool, target, settings.db_pool_warm)
+    _step("mappers", configure_mappers)
+    with SessionLocal() as db:
+        _step("refdata", _prime_refdata, db)
+        _step("statements.primary", _warm_statements, db)
+    if ReplicaSessionLocal is not None:
+        with ReplicaSessionLocal() as db:
+            _step("statements.replica", _warm_statements, db)
+    _step("password_hash", pwd_context.dummy_verify)
+    _ready = True
+    logger.info("warm-up finished: %s", _timings)
+
+
+def _ping(target) -> tuple[Optional[float], Optional[str]]:
+    started = time.perf_counter()
+    try:
+        with target.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as exc:
+        return None, type(exc).__name__
+    return round((time.perf_counter() - started) * 1000, 1), None
+
+
+def readiness() -> tuple[bool, dict]:
+    """(是否就绪, 响应体)"""
+    if not _ready:
+        return False, {"status": "warming", "warmup_ms": dict(_timings)}
+    db_ms: dict[str, Optional[float]] = {}
+    ok = True
+    for name, target in _engines().items():
+        ms, error = _ping(target)
+        db_ms[name] = ms
+        if error is not None:
+            logger.warning("readyz: %s unavailable (%s)", name, error)
+            ok = False
+        elif ms > settings.readyz_db_budget_ms:
+            ok = False
+    return ok, {"status": "ready" if ok else "degraded", "db_ms": db_ms, "warmup_ms": dict(_timings)}
@@ -0,0 +1 @@
+# bench: 本地性能基准脚本（不随服务部署）
@@ -0,0 +1,154 @@
+# bench/load.py
+"""
+以固定并发压测热点接口，输出可在版本之间 diff 的 JSON：
+每个接口的 p50/p95/p99 延迟（毫秒）、RPS、错误数、平均 SQL 条数（queries-per-request）。
+
+服务端需开启 EXPOSE_QUERY_COUNT=true 才能统计 SQL 条数（否则为 null）；
+压测登录接口时需关闭认证限流（RATELIMIT_ENABLED=false），否则大部分请求会被 429 拒绝。
+
+用法：
+  EXPOSE_QUERY_COUNT=true RATELIMIT_ENABLED=false uvicorn app.main:app --port 8000 &
+  python -m bench.load --base-url http://127.0.0.1:8000 --concurrency 16 --requests 2000 > before.json
+  python -m bench.load ... > after.json
+  python -m bench.load --compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from typing import Optional
+
+import httpx
+
+# (名称, 方法, 路径, 是否需要登录)；登录接口本身也纳入压测（bcrypt 的开销）
+SCENARIOS = [
+    ("POST /auth/login", "POST", "/auth/login", False),
+    ("GET /auth/me", "GET", "/auth/me", True),
+    ("GET /timesheets", "GET", "/timesheets?page=1&size=20", True),
+    ("GET /timesheets size=200", "GET", "/timesheets?page=1&size=200", True),
+    ("GET /timesheets/counts", "GET", "/timesheets/counts", True),
+    ("GET /projects", "GET", "/projects/", True),
+    ("GET /reports/approved_hours", "GET", "/reports/approved_hours", True),
+]
+
+
+def percentile(sorted_values: list, pct: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    # nearest-rank
+    k = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[k]
+
+
+async def _login(client: httpx.AsyncClient, mobile: str, password: str) -> str:
+    r = await client.post("/auth/login", json={"mobile": mobile, "password": password})
+    r.raise_for_status()
+    return r.json()["token"]
+
+
+async def run_scenario(client: httpx.AsyncClient, method: str, path: str, headers: dict,
+                       body: Optional[dict], concurrency: int, total: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        await client.request(method, path, headers=headers, json=body)
+
+    latencies: list[float] = []
+    queries: list[int] = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            t0 = time.perf_counter()
+            try:
+                r = await client.request(method, path, headers=headers, json=body)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if r.status_code >= 400:
+                errors += 1
+            if "x-db-queries" in r.headers:
+                queries.append(int(r.headers["x-db-queries"]))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / elapsed, 1) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 50), 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95), 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99), 2) if latencies else None,
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+async def run(base_url: str, mobile: str, password: str, concurrency: int, total: int,
+              warmup: int, only: Optional[list]) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        token = await _login(client, mobile, password)
+        auth = {"Authorization": f"Bearer {token}"}
+        results = {}
+        for name, method, path, needs_auth in SCENARIOS:
+            if only and name not in only:
+                continue
+            body = {"mobile": mobile, "password": password} if path == "/auth/login" else None
+            results[name] = await run_scenario(
+                client, method, path, auth if needs_auth else {}, body, concurrency, total, warmup
+            )
+            print(f"{name}: {results[name]}", file=sys.stderr)
+    return {
+        "base_url": base_url,
+        "concurrency": concurrency,
+        "requests_per_endpoint": total,
+        "endpoints": results,
+    }
+
+
+def compare(before_path: str, after_path: str) -> dict:
+    """两次结果逐项对比：after / before 的比值（<1 表示延迟下降）"""
+    with open(before_path, encoding="utf-8") as f:
+        before = json.load(f)["endpoints"]
+    with open(after_path, encoding="utf-8") as f:
+        after = json.load(f)["endpoints"]
+    out = {}
+    for name in sorted(set(before) & set(after)):
+        row = {}
+        for key in ("p50_ms", "p95_ms", "p99_ms", "rps", "queries_per_request"):
+            a, b = before[name].get(key), after[name].get(key)
+            row[key] = {"before": a, "after": b, "ratio": round(b / a, 3) if a and b is not None else None}
+        out[name] = row
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000")
+    ap.add_argument("--mobile", default="18800000000")
+    ap.add_argument("--password", default="bench123")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--requests", type=int, default=1000, help="每个接口的请求数")
+    ap.add_argument("--warmup", type=int, default=20)
+    ap.add_argument("--only", action="append", help="只压测指定场景（可重复）")
+    ap.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = ap.parse_args(argv)
+
+    if args.compare:
+        result = compare(*args.compare)
+    else:
+        result = asyncio.run(run(args.base_url, args.mobile, args.password, args.concurrency,
+                                 args.requests, args.warmup, args.only))
+    json.dump(result, sys.stdout, ensure_ascii=False, indent=2, sort_keys=True)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# bench/serialization.py
+"""
+真实接口响应的 序列化耗时 与 传输字节 对比：std JSON vs orjson；identity / gzip / brotli。
+
+用 bench.seed 生成数据，再通过 TestClient 请求 /timesheets、/users/ 等接口。
+请求经过完整的路由、response_model 校验和压缩中间件，负载就是接口实际返回的内容。
+JSON 响应类在路由注册时就已确定，所以每种 JSON_RESPONSE 各起一个子进程测量。
+耗时是整个请求的中位数；两种响应类的差值即序列化开销。
+
+用法：
+  python -m bench.serialization                                 # 临时 SQLite，默认规模
+  python -m bench.serialization --users 2000 --timesheets 50000 --repeat 20 > ser.json
+  python -m bench.serialization --url sqlite:///bench.db --no-seed   # 复用 bench.seed 已生成的库
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# (名称, 路径)；管理员身份请求（bench.seed 的 1 号用户）
+SCENARIOS = [
+    ("GET /timesheets size=200", "/timesheets/?page=1&size=200"),
+    ("GET /users/", "/users/"),
+    ("GET /users/ limit=200", "/users/?limit=200"),
+    ("GET /projects/{id}", "/projects/1"),
+    ("GET /reports/approved_hours", "/reports/approved_hours"),
+]
+JSON_CLASSES = ("std", "orjson")
+
+
+def _encodings() -> list[str]:
+    return ["identity", "gzip"] + (["br"] if brotli is not None else [])
+
+
+def measure(repeat: int) -> dict:
+    """在当前进程里请求各接口（数据库、JSON_RESPONSE 由环境变量决定，须在导入 app 之前设置）"""
+    from fastapi.testclient import TestClient
+
+    from app.config import settings
+    from app.main import app
+    from app.responses import get_json_response_class
+    from app.security import create_token
+
+    client = TestClient(app)
+    auth = {"Authorization": f"Bearer {create_token(1)}"}
+    out = {"response_class": get_json_response_class(settings.json_response).__name__, "scenarios": {}}
+    for name, path in SCENARIOS:
+        row = {}
+        for encoding in _encodings():
+            headers = {**auth, "Accept-Encoding": encoding}
+            client.get(path, headers=headers).raise_for_status()   # 预热：参考数据缓存、语句编译
+            samples = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                r = client.get(path, headers=headers)
+                samples.append(time.perf_counter() - t0)
+                r.raise_for_status()
+            row[encoding] = {
+                "bytes": r.num_bytes_downloaded,   # 线上传输的（压缩后）字节数
+                "ms": round(statistics.median(samples) * 1000, 3),
+            }
+        out["scenarios"][name] = row
+    return out
+
+
+def _run_variant(url: str, json_class: str, repeat: int) -> dict:
+    env = {**os.environ, "PRIMARY_DATABASE_URL": url, "JSON_RESPONSE": json_class,
+           "AUDIT_ENABLED": "false", "JOBS_ENABLED": "false"}
+    proc = subprocess.run(
+        [sys.executable, "-m", "bench.serialization", "--url", url, "--repeat", str(repeat), "--measure"],
+        env=env, check=True, stdout=subprocess.PIPE,
+    )
+    return json.loads(proc.stdout)
+
+
+def run(url: str, repeat: int) -> dict:
+    results = {name: _run_variant(url, name, repeat) for name in JSON_CLASSES}
+    out = {"response_class": {name: r["response_class"] for name, r in results.items()}}
+    for scenario, _ in SCENARIOS:
+        row = {}
+        for encoding in _encodings():
+            std, fast = (results[name]["scenarios"][scenario][encoding] for name in JSON_CLASSES)
+            # 两种响应类输出的都是紧凑 JSON，字节数取 orjson 一侧
+            row[encoding] = {"bytes": fast["bytes"], "std_json_ms": std["ms"], "orjson_ms": fast["ms"]}
+            if fast["ms"]:
+                row[encoding]["speedup"] = round(std["ms"] / fast["ms"], 2)
+        out[scenario] = row
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", help="SQLAlchemy URL；不传则在临时目录建 SQLite 库")
+    ap.add_argument("--no-seed", action="store_true", help="不重新生成数据（--url 指向已有数据的库）")
+    ap.add_argument("--users", type=int, default=1000)
+    ap.add_argument("--timesheets", type=int, default=20000)
+    ap.add_argument("--repeat", type=int, default=10)
+    ap.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)   # 子进程：只测当前配置
+    args = ap.parse_args(argv)
+
+    if args.measure:
+        json.dump(measure(args.repeat), sys.stdout)
+        return
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-ser-'), 'bench.db')}"
+    if not args.no_seed:
+        from bench.seed import seed
+
+        print(seed(url, users=args.users, departments=10, projects=50, timesheets=args.timesheets, days=730,
+                   password="bench123", admin_mobile="18800000000", create_schema=url.startswith("sqlite"),
+                   batch=5000, seed_value=20250901), file=sys.stderr)
+    json.dump(run(url, args.repeat), sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -69,22 +69,12 @@ api.interceptors.response.use(
 function PendingRow(props: {
   me: Me | null;
   user: User;
-  allDepartments: Department[];
-  managerDeptIds: Set<number>;
+  // 可分配部门由 /approvals/inbox 按角色返回（管理员=全量；经理=自己所在部门及其下级）
+  selectableDepartments: Department[];
   onApproved: () => void;
   onRejected: () => void;
 }) {
-  const { me, user, allDepartments, managerDeptIds, onApproved, onRejected } =
-    props;
-
-  // 可选部门（管理员=全量；经理=仅自己所在部门）
-  const selectableDepartments = useMemo(() => {
-    if (!me) return [];
-    if (me.role === "admin") return allDepartments;
-    if (me.role === "manager")
-      return allDepartments.filter((d) => managerDeptIds.has(d.id));
-    return [];
-  }, [me, allDepartments, managerDeptIds]);
+  const { user, selectableDepartments, onApproved, onRejected } = props;
 
   // 选择的部门（空串=不入部门）
   const [dept, setDept] = useState<string>("");
@@ -155,7 +145,6 @@ export default function AdminPendingWeChatPage() {
   const [me, setMe] = useState<Me | null>(null);
 
   const [departments, setDepartments] = useState<Department[]>([]);
-  const [managerDeptIds, setManagerDeptIds] = useState<Set<number>>(new Set());
 
   const [allUsers, setAllUsers] = useState<User[]>([]);
   const [q, setQ] = useState("");
@@ -177,13 +166,13 @@ export default function AdminPendingWeChatPage() {
       setMe(null);
       setAllUsers([]);
       setDepartments([]);
-      setManagerDeptIds(new Set());
       return;
     }
     api.defaults.headers.common["Authorization"] = `Bearer ${token}`;
     (async () => {
       try {
-        await loadMeAndDepts();
+        const meRes = await api.get<Me>("/auth/me");
+        setMe(meRes.data);
         await refreshUsers();
       } catch (e) {
         console.error(e);
@@ -191,36 +180,24 @@ export default function AdminPendingWeChatPage() {
     })();
   }, [token]);
 
-  const loadMeAndDepts = async () => {
-    const meRes = await api.get<Me>("/auth/me");
-    setMe(meRes.data);
-
-    // 部门全集
-    const dRes = await api.get<Department[]>("/departments/");
-    setDepartments(dRes.data || []);
-
-    // 若是 manager，找出“我所在的部门”
-    if (meRes.data.role === "manager") {
-      const set = new Set<number>();
-      for (const d of dRes.data) {
-        const det = await api.get<{ users: User[] }>(`/departments/${d.id}`);
-        if ((det.data.users || []).some((u) => u.id === meRes.data.id)) {
-          set.add(d.id);
-        }
-      }
-      setManagerDeptIds(set);
-    } else {
-      setManagerDeptIds(new Set());
-    }
-  };
-
+  // 待审批用户与可分配部门一次取回（服务端已按经理所在部门子树过滤）
   const refreshUsers = async () => {
-    const uRes = await api.get<User[]>("/users/");
-    // “待审批”即 pending；first_come 通常是首次登录把资料放进来但未提交，这里只展示 pending
-    const pendings = (uRes.data || []).filter((u) => u.status === "pending");
+    const pendings: User[] = [];
+    let depts: Department[] = [];
+    let cursor: string | undefined;
+    do {
+      const res = await api.get<{ registrations: User[]; departments: Department[] }>(
+        "/approvals/inbox",
+        { params: { kind: "registrations", limit: 200, cursor } }
+      );
+      pendings.push(...(res.data.registrations || []));
+      depts = res.data.departments || [];
+      cursor = res.headers["x-next-cursor"] || undefined;
+    } while (cursor);
     // 最新的靠前一点
     pendings.sort((a, b) => (b.id ?? 0) - (a.id ?? 0));
     setAllUsers(pendings);
+    setDepartments(depts);
   };
 
   const handleLogin = async () => {
@@ -255,7 +232,7 @@ export default function AdminPendingWeChatPage() {
     });
   }, [q, allUsers]);
 
-  // 管理员：一键清理 first_come / rejected（逐个 DELETE）
+  // 管理员：一键清理 first_come / rejected（逐个 DELETE ?purge=true 硬删除）
   const purgeJunk = async () => {
     if (!me || me.role !== "admin") return;
     if (!confirm("确认清理所有 first_come / rejected 用户吗？该操作不可恢复。")) return;
@@ -266,7 +243,7 @@ export default function AdminPendingWeChatPage() {
         (u) => u.status === "first_come" || u.status === "rejected"
       );
       for (const u of junk) {
-        await api.delete(`/users/${u.id}`);
+        await api.delete(`/users/${u.id}`, { params: { purge: true } });
       }
       alert(`已清理 ${junk.length} 个用户`);
       await refreshUsers();
@@ -353,8 +330,7 @@ export default function AdminPendingWeChatPage() {
                 key={u.id}
                 me={me}
                 user={u}
-                allDepartments={departments}
-                managerDeptIds={managerDeptIds}
+                selectableDepartments={departments}
                 onApproved={refreshUsers}
                 onRejected={refreshUsers}
               />
@@ -23,6 +23,9 @@ type User = {
   role: "employee" | "manager" | "admin";
 };
 
+// /approvals/inbox?with_members=true 的 members：可见用户 + 各自待审核条数
+type Member = User & { pending: number };
+
 type LoggedInUser = {
   id: number;
   name: string;
@@ -57,6 +60,7 @@ type Timesheet = {
   status: "submitted" | "approved" | "rejected";
   created_at?: string;
   updated_at?: string;
+  version?: number; // 乐观锁版本号：保存时放进 If-Match
 };
 
 type PageResp = {
@@ -172,8 +176,9 @@ export default function AdminTimesheetsPage() {
     api.defaults.headers.common["Authorization"] = `Bearer ${token}`;
     (async () => {
       try {
-        const visible = await loadVisibility(); // 可见集合
-        await fetchUsersAndCounts(visible);
+        const meRes = await api.get<LoggedInUser>("auth/me");
+        setMe(meRes.data);
+        await fetchUsersAndCounts(meRes.data.role);
         await fetchProjects();
       } catch {
         /* ignore */
@@ -190,59 +195,26 @@ export default function AdminTimesheetsPage() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [token, selectedUserId, status, page, allowedUserIds]);
 
-  // ===== 可见性：返回集合，避免竞态 =====
-  const loadVisibility = async (): Promise<Set<number> | null> => {
-    const meRes = await api.get<LoggedInUser>("auth/me");
-    const meUser = meRes.data;
-    setMe(meUser);
-
-    if (meUser.role === "admin") {
-      setAllowedUserIds(null);
-      return null; // 全员可见
-    }
-
-    if (meUser.role === "manager") {
-      const deptList = await api.get<{ id: number; name: string }[]>("departments/");
-      const visible = new Set<number>();
-      for (const d of deptList.data) {
-        const detail = await api.get<{ id: number; name: string; users: User[] }>(
-          `departments/${d.id}`
-        );
-        const usersInDept = detail.data.users || [];
-        if (usersInDept.some((u) => u.id === meUser.id)) {
-          usersInDept.forEach((u) => visible.add(u.id));
-        }
-      }
-      setAllowedUserIds(visible);
-      return visible;
-    }
-
-    // 其它角色不可见
-    const v = new Set<number>();
-    setAllowedUserIds(v);
-    return v;
-  };
-
-  // ===== 用户 & 待审计数 =====
-  const fetchUsersAndCounts = async (visible?: Set<number> | null) => {
+  // ===== 可见用户 & 待审计数 =====
+  // 一次请求取回：服务端按经理所在部门（含下级部门）过滤，不再逐个部门查详情再在前端过滤
+  const fetchUsersAndCounts = async (role?: LoggedInUser["role"]) => {
     try {
-      const [uRes, cRes] = await Promise.all([
-        api.get<User[]>("/users/"),
-        api.get<{ user_id: number; count: number }[]>("timesheets/counts/", {
-          params: { status: "submitted" },
-        }),
-      ]);
+      const res = await api.get<{ members: Member[] }>("approvals/inbox", {
+        params: { kind: "timesheets", limit: 1, with_members: true },
+      });
+      const members = res.data.members || [];
 
-      const visibility = visible !== undefined ? visible : allowedUserIds;
+      // 管理员全员可见；经理只能看到 members 里的人
+      const visibility = (role ?? me?.role) === "admin" ? null : new Set(members.map((m) => m.id));
+      setAllowedUserIds(visibility);
 
-      let list = [...uRes.data];
-      if (visibility) list = list.filter((u) => visibility.has(u.id));
+      const list: User[] = members.map((m) => ({ id: m.id, name: m.name, mobile: m.mobile, role: m.role }));
       list.sort((a, b) => (a.name || "").localeCompare(b.name || ""));
       setUsers(list);
 
       const map: Record<number, number> = {};
-      for (const r of cRes.data) {
-        if (!visibility || visibility.has(r.user_id)) map[r.user_id] = r.count;
+      for (const m of members) {
+        if (m.pending) map[m.id] = m.pending;
       }
       setPendingMap(map);
 
@@ -446,10 +418,18 @@ export default function AdminTimesheetsPage() {
         return;
       }
 
-      await api.put(`timesheets/${ts.id}`, body);
+      // 带上读到的版本：期间被员工或其他审批人改过时返回 412/409，而不是静默覆盖
+      const headers = ts.version != null ? { "If-Match": `"${ts.version}"` } : undefined;
+      await api.put(`timesheets/${ts.id}`, body, { headers });
       setEditingId(null);
       await fetchTimesheets();
     } catch (err: any) {
+      const status = err.response?.status;
+      if (status === 409 || status === 412) {
+        alert("保存失败：该记录已被他人修改，已刷新为最新内容");
+        await fetchTimesheets();
+        return;
+      }
       alert("保存失败：" + (err.response?.data?.detail || err.message));
     }
   };
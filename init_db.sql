@@ -16,7 +16,11 @@ CREATE TABLE IF NOT EXISTS users (
   password_hash VARCHAR(255),
   is_active TINYINT(1) DEFAULT 1,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  deleted_at DATETIME NULL,
+  INDEX idx_users_name_id (name, id),
+  INDEX idx_users_created_id (created_at, id),
+  INDEX idx_users_deleted_at (deleted_at)
 );
 CREATE TABLE IF NOT EXISTS projects (
   id BIGINT PRIMARY KEY AUTO_INCREMENT,
@@ -33,25 +37,42 @@ CREATE TABLE IF NOT EXISTS tasks (
   UNIQUE(project_id, name)
 );
 CREATE TABLE IF NOT EXISTS timesheets (
-  id BIGINT PRIMARY KEY AUTO_INCREMENT,
+  id BIGINT NOT NULL AUTO_INCREMENT,
   user_id BIGINT NOT NULL,
   project_id BIGINT NOT NULL,
   task_id BIGINT NULL,
   work_date DATE NOT NULL,
   hours DECIMAL(5,2) NOT NULL,
   overtime TINYINT(1) DEFAULT 0,
-  note VARCHAR(500),
   attach_url VARCHAR(512),
   geo_lat DECIMAL(10,7) NULL,
   geo_lng DECIMAL(10,7) NULL,
   status ENUM('submitted','approved','rejected') DEFAULT 'submitted',
   approver_id BIGINT NULL,
   approved_at DATETIME NULL,
-  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
   updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  change_seq BIGINT NOT NULL DEFAULT 0,
+  version INT NOT NULL DEFAULT 1,
+  PRIMARY KEY (id, created_at),
   INDEX idx_user_date (user_id, work_date),
-  INDEX idx_project_date (project_id, work_date)
+  INDEX idx_project_date (project_id, work_date),
+  INDEX idx_timesheets_created (created_at, id),
+  INDEX idx_timesheets_change_seq (change_seq, id),
+  INDEX idx_timesheets_user_change_seq (user_id, change_seq, id)
 );
+CREATE TABLE IF NOT EXISTS timesheets_archive LIKE timesheets;
+-- 热数据按 created_at 月度分区；月度分区由后台任务 maintain_timesheet_partitions 维护
+-- p_history 的上界是建库当月的下个月 1 号，执行时计算
+SET @p_history_until = DATE_FORMAT(CURRENT_DATE + INTERVAL 1 MONTH, '%Y-%m-01');
+SET @partition_ddl = CONCAT(
+  'ALTER TABLE timesheets PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (',
+  'PARTITION p_history VALUES LESS THAN (UNIX_TIMESTAMP(''', @p_history_until, ''')), ',
+  'PARTITION pmax VALUES LESS THAN MAXVALUE)'
+);
+PREPARE partition_stmt FROM @partition_ddl;
+EXECUTE partition_stmt;
+DEALLOCATE PREPARE partition_stmt;
 CREATE TABLE IF NOT EXISTS audit_logs (
   id BIGINT PRIMARY KEY AUTO_INCREMENT,
   actor_id BIGINT,
@@ -59,9 +80,72 @@ CREATE TABLE IF NOT EXISTS audit_logs (
   entity VARCHAR(32),
   entity_id BIGINT,
   detail JSON,
-  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  INDEX idx_audit_entity (entity, entity_id, id),
+  INDEX idx_audit_actor (actor_id, id),
+  INDEX idx_audit_action (action, id)
+);
+CREATE TABLE IF NOT EXISTS jobs (
+  id BIGINT PRIMARY KEY AUTO_INCREMENT,
+  type VARCHAR(64) NOT NULL,
+  status VARCHAR(16) NOT NULL DEFAULT 'queued',
+  params JSON NULL,
+  progress FLOAT NOT NULL DEFAULT 0,
+  message VARCHAR(255) NULL,
+  result JSON NULL,
+  result_path VARCHAR(512) NULL,
+  error TEXT NULL,
+  attempts INT NOT NULL DEFAULT 0,
+  cancel_requested TINYINT(1) NOT NULL DEFAULT 0,
+  worker VARCHAR(128) NULL,
+  created_by BIGINT NULL,
+  created_at DATETIME NULL,
+  started_at DATETIME NULL,
+  finished_at DATETIME NULL,
+  heartbeat_at DATETIME NULL,
+  INDEX idx_jobs_status_type (status, type, id),
+  INDEX idx_jobs_created_by (created_by, id)
+);
+CREATE TABLE IF NOT EXISTS cache_versions (
+  name VARCHAR(64) PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+INSERT IGNORE INTO cache_versions (name, version)
+VALUES ('projects', 0), ('departments', 0), ('users', 0), ('timesheet_tombstones_purged', 0);
+CREATE TABLE IF NOT EXISTS timesheet_change_seq (
+  seq BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+  created_at DATETIME NOT NULL,
+  INDEX idx_change_seq_created (created_at)
+);
+CREATE TABLE IF NOT EXISTS timesheet_tombstones (
+  change_seq BIGINT NOT NULL,
+  timesheet_id BIGINT NOT NULL,
+  user_id BIGINT NOT NULL,
+  deleted_at DATETIME NULL,
+  PRIMARY KEY (change_seq, timesheet_id),
+  INDEX idx_tombstones_user (user_id, change_seq, timesheet_id),
+  INDEX idx_tombstones_deleted_at (deleted_at)
 );
 INSERT IGNORE INTO departments (id, name) VALUES (1, 'General');
+CREATE TABLE IF NOT EXISTS department_closure (
+  ancestor_id BIGINT NOT NULL,
+  descendant_id BIGINT NOT NULL,
+  depth INT NOT NULL,
+  PRIMARY KEY (ancestor_id, descendant_id),
+  INDEX idx_closure_descendant (descendant_id, ancestor_id, depth),
+  CONSTRAINT fk_closure_ancestor FOREIGN KEY (ancestor_id) REFERENCES departments (id) ON DELETE CASCADE,
+  CONSTRAINT fk_closure_descendant FOREIGN KEY (descendant_id) REFERENCES departments (id) ON DELETE CASCADE
+);
+INSERT IGNORE INTO department_closure (ancestor_id, descendant_id, depth) VALUES (1, 1, 0);
+CREATE TABLE IF NOT EXISTS timesheet_details (
+  timesheet_id BIGINT PRIMARY KEY,
+  weekly_summary TEXT NULL,
+  reduce_desc TEXT NULL,
+  reason_desc TEXT NULL,
+  note TEXT NULL,
+  FULLTEXT INDEX ft_timesheet_details_text (weekly_summary, note, reduce_desc, reason_desc) WITH PARSER ngram
+);
 -- password: admin123 (bcrypt)
 INSERT IGNORE INTO users (id, name, mobile, role, department_id, password_hash)
 VALUES (1, 'Admin', '18800000000', 'admin', 1, '$2b$12$1QF7d0nIVgT7Uj1l0QZbOeA8aWbrfQXInJ8qKsVv6n2w0rS9KzOQq');
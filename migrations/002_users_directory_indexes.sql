@@ -0,0 +1,10 @@
+-- /users/ 目录搜索、过滤与游标分页所需索引
+-- 姓名前缀搜索 + 按姓名排序（id 作为游标第二键）
+CREATE INDEX idx_users_name_id ON users (name, id);
+-- 角色 / 状态过滤
+CREATE INDEX idx_users_role_status ON users (role, status);
+CREATE INDEX idx_users_status ON users (status);
+-- 按注册时间排序
+CREATE INDEX idx_users_created_id ON users (created_at, id);
+-- 按部门过滤：user_departments(department_id, user_id)
+CREATE INDEX idx_ud_dept_user ON user_departments (department_id, user_id);
@@ -0,0 +1,4 @@
+-- /audit_logs 查询：各过滤条件 + id 倒序游标
+CREATE INDEX idx_audit_entity ON audit_logs (entity, entity_id, id);
+CREATE INDEX idx_audit_actor ON audit_logs (actor_id, id);
+CREATE INDEX idx_audit_action ON audit_logs (action, id);
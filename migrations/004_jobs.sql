@@ -0,0 +1,23 @@
+-- 后台任务表（app/services/jobs.py）
+CREATE TABLE IF NOT EXISTS jobs (
+  id BIGINT PRIMARY KEY AUTO_INCREMENT,
+  type VARCHAR(64) NOT NULL,
+  status VARCHAR(16) NOT NULL DEFAULT 'queued',
+  params JSON NULL,
+  progress FLOAT NOT NULL DEFAULT 0,
+  message VARCHAR(255) NULL,
+  result JSON NULL,
+  result_path VARCHAR(512) NULL,
+  error TEXT NULL,
+  attempts INT NOT NULL DEFAULT 0,
+  cancel_requested TINYINT(1) NOT NULL DEFAULT 0,
+  worker VARCHAR(128) NULL,
+  created_by BIGINT NULL,
+  created_at DATETIME NULL,
+  started_at DATETIME NULL,
+  finished_at DATETIME NULL,
+  heartbeat_at DATETIME NULL,
+  -- 取队列 / 统计各类型运行数 / 崩溃恢复
+  INDEX idx_jobs_status_type (status, type, id),
+  INDEX idx_jobs_created_by (created_by, id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
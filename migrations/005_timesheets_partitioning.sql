@@ -0,0 +1,47 @@
+-- timesheets 冷热分层（app/services/timesheet_store.py）
+-- 0) MySQL 分区表不支持外键：timesheets 自身的外键在这里删除（引用关系由应用维护）；
+--    若其它表有外键引用 timesheets，在任何 ALTER 之前报错退出，需先人工处理这些外键再重跑。
+--    脚本内不能用 SIGNAL，报错借助查询一个不存在的表，表名即错误信息。
+SET @incoming_fks = (
+  SELECT GROUP_CONCAT(CONCAT(TABLE_NAME, '.', CONSTRAINT_NAME) SEPARATOR ', ')
+  FROM information_schema.REFERENTIAL_CONSTRAINTS
+  WHERE CONSTRAINT_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME = 'timesheets' AND TABLE_NAME <> 'timesheets'
+);
+SET @fk_guard = IF(@incoming_fks IS NULL, 'DO 0',
+  CONCAT('SELECT 1 FROM `drop foreign keys referencing timesheets first: ', @incoming_fks, '`'));
+PREPARE fk_guard_stmt FROM @fk_guard;
+EXECUTE fk_guard_stmt;
+DEALLOCATE PREPARE fk_guard_stmt;
+
+SET @own_fks = (
+  SELECT GROUP_CONCAT(CONCAT('DROP FOREIGN KEY `', CONSTRAINT_NAME, '`') SEPARATOR ', ')
+  FROM information_schema.REFERENTIAL_CONSTRAINTS
+  WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = 'timesheets'
+);
+SET @drop_fks = IF(@own_fks IS NULL, 'DO 0', CONCAT('ALTER TABLE timesheets ', @own_fks));
+PREPARE drop_fks_stmt FROM @drop_fks;
+EXECUTE drop_fks_stmt;
+DEALLOCATE PREPARE drop_fks_stmt;
+
+-- 1) 归档表：结构与 timesheets 相同，不分区；必须在分区之前创建（LIKE 会复制分区定义）
+CREATE TABLE IF NOT EXISTS timesheets_archive LIKE timesheets;
+
+-- 2) timesheets 按 created_at 做月度 RANGE 分区；主键 / 唯一键必须包含分区列
+UPDATE timesheets SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL;
+ALTER TABLE timesheets
+  MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (id, created_at),
+  ADD INDEX idx_timesheets_created (created_at, id);
+
+-- p_history 容纳现有全部数据，上界是执行当月的下个月 1 号：执行时计算，UNIX_TIMESTAMP 按会话时区求值；
+-- 之后的月度分区（pYYYYMM）由后台任务 maintain_timesheet_partitions 从 pmax 中提前拆出，归档完成后的旧分区也由它 DROP。
+SET @p_history_until = DATE_FORMAT(CURRENT_DATE + INTERVAL 1 MONTH, '%Y-%m-01');
+SET @partition_ddl = CONCAT(
+  'ALTER TABLE timesheets PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (',
+  'PARTITION p_history VALUES LESS THAN (UNIX_TIMESTAMP(''', @p_history_until, ''')), ',
+  'PARTITION pmax VALUES LESS THAN MAXVALUE)'
+);
+PREPARE partition_stmt FROM @partition_ddl;
+EXECUTE partition_stmt;
+DEALLOCATE PREPARE partition_stmt;
@@ -0,0 +1,8 @@
+-- 参考数据缓存（项目 / 部门）的跨进程失效：写操作把对应 name 的 version +1
+CREATE TABLE IF NOT EXISTS cache_versions (
+  name VARCHAR(64) PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT IGNORE INTO cache_versions (name, version) VALUES ('projects', 0), ('departments', 0);
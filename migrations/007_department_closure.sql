@@ -0,0 +1,22 @@
+-- 部门层级闭包表（app/services/department_tree.py）
+CREATE TABLE IF NOT EXISTS department_closure (
+  ancestor_id BIGINT NOT NULL,
+  descendant_id BIGINT NOT NULL,
+  depth INT NOT NULL,
+  PRIMARY KEY (ancestor_id, descendant_id),
+  -- 查某部门的全部祖先 / 移动子树时按后代删除路径
+  INDEX idx_closure_descendant (descendant_id, ancestor_id, depth),
+  CONSTRAINT fk_closure_ancestor FOREIGN KEY (ancestor_id) REFERENCES departments (id) ON DELETE CASCADE,
+  CONSTRAINT fk_closure_descendant FOREIGN KEY (descendant_id) REFERENCES departments (id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- 按现有 parent_id 回填（MySQL 8 递归 CTE）
+INSERT IGNORE INTO department_closure (ancestor_id, descendant_id, depth)
+WITH RECURSIVE paths AS (
+  SELECT id AS ancestor_id, id AS descendant_id, 0 AS depth FROM departments
+  UNION ALL
+  SELECT p.ancestor_id, d.id, p.depth + 1
+  FROM paths p JOIN departments d ON d.parent_id = p.descendant_id
+)
+SELECT ancestor_id, descendant_id, depth FROM paths;
+
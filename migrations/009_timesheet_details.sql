@@ -0,0 +1,26 @@
+-- 工时长文本拆到 1:1 明细表 timesheet_details，timesheets 行变窄（列表 / 计数 / 审批扫描更少的页）
+-- 全文检索直接使用明细表上的 ngram FULLTEXT 索引（明细表不分区；timesheets 按月分区，分区表不支持 FULLTEXT）
+CREATE TABLE IF NOT EXISTS timesheet_details (
+  timesheet_id BIGINT PRIMARY KEY,
+  weekly_summary TEXT NULL,
+  reduce_desc TEXT NULL,
+  reason_desc TEXT NULL,
+  note TEXT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- 1) 回填：热数据与归档数据的文本都搬到明细表（全为空的不建明细行）
+INSERT IGNORE INTO timesheet_details (timesheet_id, weekly_summary, reduce_desc, reason_desc, note)
+SELECT id, weekly_summary, reduce_desc, reason_desc, note
+FROM timesheets
+WHERE COALESCE(weekly_summary, reduce_desc, reason_desc, note) IS NOT NULL;
+
+INSERT IGNORE INTO timesheet_details (timesheet_id, weekly_summary, reduce_desc, reason_desc, note)
+SELECT id, weekly_summary, reduce_desc, reason_desc, note
+FROM timesheets_archive
+WHERE COALESCE(weekly_summary, reduce_desc, reason_desc, note) IS NOT NULL;
+
+-- 2) 数据就位后再建全文索引（比逐行维护快）；列顺序与 app/services/timesheet_search.py 的 SEARCH_FIELDS 一致
+ALTER TABLE timesheet_details
+  ADD FULLTEXT INDEX ft_timesheet_details_text (weekly_summary, note, reduce_desc, reason_desc) WITH PARSER ngram;
+
+-- 原表上的长文本列在 migrations/015 删除：应用切换到读取明细表之前不要执行
@@ -0,0 +1,32 @@
+-- 工时增量同步（GET /timesheets/changes，app/services/timesheet_sync.py）
+-- 1) 变更序号：已有数据全部为 0，首次同步（不带 since）时按 id 顺序全部返回
+ALTER TABLE timesheets
+  ADD COLUMN change_seq BIGINT NOT NULL DEFAULT 0,
+  ADD INDEX idx_timesheets_change_seq (change_seq, id),
+  ADD INDEX idx_timesheets_user_change_seq (user_id, change_seq, id);
+ALTER TABLE timesheets_archive
+  ADD COLUMN change_seq BIGINT NOT NULL DEFAULT 0;
+
+-- 2) 删除墓碑
+CREATE TABLE IF NOT EXISTS timesheet_tombstones (
+  change_seq BIGINT NOT NULL,
+  timesheet_id BIGINT NOT NULL,
+  user_id BIGINT NOT NULL,
+  deleted_at DATETIME NULL,
+  PRIMARY KEY (change_seq, timesheet_id),
+  INDEX idx_tombstones_user (user_id, change_seq, timesheet_id),
+  INDEX idx_tombstones_deleted_at (deleted_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- 3) 变更序号分配：AUTO_INCREMENT 取号在独立的短事务里完成（InnoDB 自增锁只在语句内持有），
+--    业务事务提交时删掉自己的取号行，写事务之间不互相加锁；
+--    表里剩下的是尚未结束的事务，/timesheets/changes 只返回其中最小序号之前的变更。
+--    需要 MySQL 8.0+（自增计数器持久化，表被清空后重启也不会回退）。
+CREATE TABLE IF NOT EXISTS timesheet_change_seq (
+  seq BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+  created_at DATETIME NOT NULL,
+  INDEX idx_change_seq_created (created_at)
+) ENGINE=InnoDB;
+
+-- 4) 墓碑清理线（与参考数据缓存共用版本号表）
+INSERT IGNORE INTO cache_versions (name, version) VALUES ('timesheet_tombstones_purged', 0);
@@ -0,0 +1,5 @@
+-- 用户软删除（DELETE /users/{id}）：列表、登录与成员查询按 deleted_at IS NULL 过滤；
+-- 后台任务 purge_deleted_users 按 deleted_at 找出到期的用户分批硬删除
+ALTER TABLE users
+  ADD COLUMN deleted_at DATETIME NULL,
+  ADD INDEX idx_users_deleted_at (deleted_at);
@@ -0,0 +1,6 @@
+-- 工时乐观锁（PUT /timesheets/{id}、审批 / 驳回）：UPDATE ... WHERE id = ? AND version = ?，
+-- 影响 0 行即被并发修改，返回 409；客户端可用 If-Match: "<version>" 声明基于哪个版本修改
+ALTER TABLE timesheets
+  ADD COLUMN version INT NOT NULL DEFAULT 1;
+ALTER TABLE timesheets_archive
+  ADD COLUMN version INT NOT NULL DEFAULT 1;
@@ -0,0 +1,4 @@
+-- 列表 ETag 的变更标记（不用 updated_at 聚合：只有秒级精度，同一秒内的修改会得到旧的 304）：
+-- 用户列表改用 cache_versions('users')，用户或部门成员关系的写入提交后单独 +1（app/services/users.py、app/refcache.py）；
+-- 项目 / 工时列表改用工时的 change_seq（app/services/timesheet_sync.change_marker），无需新表。
+INSERT IGNORE INTO cache_versions (name, version) VALUES ('users', 0);
@@ -0,0 +1,13 @@
+-- 删除 timesheets / timesheets_archive 上已迁到 timesheet_details（migrations/009）的长文本列
+-- 仅在所有应用实例都已切换到读写明细表之后执行（旧版本实例仍读写原列，提前删除会使其报错）；
+-- 分区表会整表重建，建议在低峰期执行
+ALTER TABLE timesheets
+  DROP COLUMN weekly_summary,
+  DROP COLUMN reduce_desc,
+  DROP COLUMN reason_desc,
+  DROP COLUMN note;
+ALTER TABLE timesheets_archive
+  DROP COLUMN weekly_summary,
+  DROP COLUMN reduce_desc,
+  DROP COLUMN reason_desc,
+  DROP COLUMN note;
@@ -0,0 +1,56 @@
+# tests/conftest.py
+"""
+接口级测试：SQLite 临时库 + TestClient（不进入 lifespan，不启动后台任务线程）。
+数据库 URL 必须在导入 app 之前设置。
+"""
+import os
+import tempfile
+
+_DB_FILE = os.path.join(tempfile.mkdtemp(prefix="timesheet-tests-"), "test.db")
+os.environ["PRIMARY_DATABASE_URL"] = f"sqlite:///{_DB_FILE}"
+os.environ.setdefault("AUDIT_ENABLED", "false")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models
+from app.db import Base, SessionLocal, engine
+from app.main import app
+from app.security import create_token, hash_password
+
+ADMIN_ID, EMPLOYEE_ID = 1, 2
+
+
+@pytest.fixture
+def db():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    session.add(models.Department(id=1, name="General"))
+    session.add_all([
+        models.User(id=ADMIN_ID, name="Admin", mobile="13800000001", role="admin",
+                    password_hash=hash_password("secret"), status="approved", is_active=True),
+        models.User(id=EMPLOYEE_ID, name="Emp", mobile="13800000002", role="employee",
+                    password_hash=hash_password("secret"), status="approved", is_active=True),
+    ])
+    session.add(models.Project(id=1, name="P1", status="active"))
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(db):
+    return TestClient(app)
+
+
+@pytest.fixture
+def admin() -> dict:
+    return {"Authorization": f"Bearer {create_token(ADMIN_ID)}"}
+
+
+@pytest.fixture
+def employee() -> dict:
+    return {"Authorization": f"Bearer {create_token(EMPLOYEE_ID)}"}
@@ -0,0 +1,81 @@
+# tests/test_approvals_inbox.py
+import pytest
+
+from app import models
+from app.pagination import encode_cursor
+from app.security import create_token
+
+MANAGER_ID, OUTSIDER_ID, WECHAT_ID, PENDING_B_ID = 3, 4, 5, 6
+
+
+@pytest.fixture
+def org(client, db, admin):
+    """A(经理所在) -> A1(员工 2)；B 是 A 的兄弟部门；微信注册只在默认部门 1"""
+    def dept(name, parent_id=None):
+        return client.post("/departments/", json={"name": name, "parent_id": parent_id}, headers=admin).json()["id"]
+
+    a = dept("A")
+    a1 = dept("A1", a)
+    b = dept("B")
+    for uid, name, role, status in [
+        (MANAGER_ID, "Mgr", "manager", "approved"),
+        (OUTSIDER_ID, "Out", "employee", "approved"),
+        (WECHAT_ID, "Wx", "employee", "pending"),
+        (PENDING_B_ID, "PendB", "employee", "pending"),
+    ]:
+        db.add(models.User(id=uid, name=name, mobile=f"1390000000{uid}", role=role, status=status, is_active=True))
+    db.commit()
+    for dept_id, members in ((a, [MANAGER_ID]), (a1, [2]), (b, [OUTSIDER_ID, PENDING_B_ID]), (1, [WECHAT_ID])):
+        client.post(f"/departments/{dept_id}/members", json={"user_ids": members}, headers=admin)
+    return {"a": a, "a1": a1, "b": b}
+
+
+@pytest.fixture
+def manager(org) -> dict:
+    return {"Authorization": f"Bearer {create_token(MANAGER_ID)}"}
+
+
+def _timesheets(db, user_id, n):
+    for _ in range(n):
+        db.add(models.Timesheet(user_id=user_id, project_id=1, hours=1, status="submitted"))
+    db.commit()
+
+
+def test_manager_scope_covers_subtree_and_unassigned_registrations(client, db, manager, org):
+    _timesheets(db, 2, 2)
+    _timesheets(db, OUTSIDER_ID, 1)
+    body = client.get("/approvals/inbox", params={"with_members": True}, headers=manager).json()
+
+    assert {t["user_id"] for t in body["timesheets"]} == {2}
+    # 兄弟部门的经理也能看到只在默认部门的微信注册，看不到 B 部门的
+    assert [r["id"] for r in body["registrations"]] == [WECHAT_ID]
+    assert body["counts"] == {"timesheets": 2, "registrations": 1}
+    assert {d["id"] for d in body["departments"]} == {org["a"], org["a1"]}
+    assert {(m["id"], m["pending"]) for m in body["members"]} == {(MANAGER_ID, 0), (2, 2)}
+
+
+def test_admin_sees_everything(client, db, admin, org):
+    body = client.get("/approvals/inbox", headers=admin).json()
+    assert [r["id"] for r in body["registrations"]] == [WECHAT_ID, PENDING_B_ID]
+    assert "members" not in body
+
+
+def test_pagination(client, db, admin, org):
+    _timesheets(db, 2, 5)
+    seen, cursor = [], None
+    while True:
+        r = client.get("/approvals/inbox", params={"kind": "timesheets", "limit": 2, "cursor": cursor}, headers=admin)
+        seen += [t["id"] for t in r.json()["timesheets"]]
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert seen == sorted(seen) and len(set(seen)) == 5
+
+
+@pytest.mark.parametrize("cursor", [
+    encode_cursor(["2026-01-01T00:00:00", "abc"], None),
+    encode_cursor(None, "abc"),
+    encode_cursor("x", None),
+])
+def test_invalid_cursor(client, admin, cursor):
+    assert client.get("/approvals/inbox", params={"cursor": cursor}, headers=admin).status_code == 400
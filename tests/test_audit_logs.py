@@ -0,0 +1,16 @@
+# tests/test_audit_logs.py
+from app import models
+
+
+def test_entity_id_filter(client, db, admin):
+    db.add_all([
+        models.AuditLog(actor_id=1, action="user.delete", entity="user", entity_id=2),
+        models.AuditLog(actor_id=1, action="project.delete", entity="project", entity_id=2),
+        models.AuditLog(actor_id=1, action="user.delete", entity="user", entity_id=3),
+    ])
+    db.commit()
+
+    rows = client.get("/audit_logs/", params={"entity": "user", "entity_id": 2}, headers=admin).json()
+    assert [(r["entity"], r["entity_id"]) for r in rows] == [("user", 2)]
+    # 只给 entity_id 时不能悄悄忽略它
+    assert client.get("/audit_logs/", params={"entity_id": 2}, headers=admin).status_code == 400
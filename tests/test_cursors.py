@@ -0,0 +1,21 @@
+# tests/test_cursors.py
+# 能正常解码、但值的类型不对的游标一律 400（而不是在 int() / 比较时 500）
+import pytest
+
+from app.pagination import encode_cursor
+
+BAD = encode_cursor("x", "abc")
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/users/", {"cursor": BAD, "limit": 10}),
+    ("/users/", {"cursor": encode_cursor("not-a-date", 1), "sort": "created_at", "limit": 10}),
+    ("/timesheets/search", {"q": "审批", "cursor": BAD}),
+    ("/timesheets/changes", {"since": BAD}),
+    ("/timesheets/changes", {"since": encode_cursor(True, 1)}),
+    ("/audit_logs/", {"cursor": encode_cursor("abc")}),
+])
+def test_mistyped_cursor_is_400(client, admin, path, params):
+    r = client.get(path, params=params, headers=admin)
+    assert r.status_code == 400
+    assert r.json()["detail"] == "invalid cursor"
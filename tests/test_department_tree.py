@@ -0,0 +1,72 @@
+# tests/test_department_tree.py
+from sqlalchemy import select
+
+from app.models import Department, department_closure as closure
+from app.services import department_tree
+
+
+def _create(client, admin, name, parent_id=None):
+    r = client.post("/departments/", json={"name": name, "parent_id": parent_id}, headers=admin)
+    assert r.status_code == 200
+    return r.json()["id"]
+
+
+def _subtree(client, admin, dept_id):
+    r = client.get(f"/departments/{dept_id}/subtree", headers=admin)
+    assert r.status_code == 200
+    return [(d["id"], d["depth"]) for d in r.json()]
+
+
+def _move(client, admin, dept_id, parent_id):
+    return client.patch(f"/departments/{dept_id}/parent", json={"parent_id": parent_id}, headers=admin)
+
+
+def _closure(db):
+    db.expire_all()
+    return set(db.execute(select(closure.c.ancestor_id, closure.c.descendant_id, closure.c.depth)).all())
+
+
+def test_move_subtree_keeps_closure_consistent(client, admin, db):
+    a = _create(client, admin, "A")
+    b = _create(client, admin, "B", a)
+    c = _create(client, admin, "C", b)
+    d = _create(client, admin, "D")
+    assert _subtree(client, admin, a) == [(a, 0), (b, 1), (c, 2)]
+
+    # B 连同 C 挂到 D 下
+    assert _move(client, admin, b, d).status_code == 200
+    assert _subtree(client, admin, a) == [(a, 0)]
+    assert _subtree(client, admin, d) == [(d, 0), (b, 1), (c, 2)]
+    assert sorted(department_tree.ancestors(db, c)) == sorted([(c, 0), (b, 1), (d, 2)])
+
+    # 移为顶级部门
+    assert _move(client, admin, b, None).status_code == 200
+    assert _subtree(client, admin, d) == [(d, 0)]
+    assert _subtree(client, admin, b) == [(b, 0), (c, 1)]
+
+    # 增量维护的结果与按 parent_id 整表重建一致（种子部门 1 没有闭包行，重建会补上）
+    maintained = _closure(db) | {(1, 1, 0)}
+    department_tree.rebuild(db)
+    db.commit()
+    assert _closure(db) == maintained
+
+
+def test_move_rejects_cycles(client, admin, db):
+    a = _create(client, admin, "A")
+    b = _create(client, admin, "B", a)
+    before = _closure(db)
+
+    assert _move(client, admin, a, b).status_code == 400
+    assert _move(client, admin, a, a).status_code == 400
+    assert _closure(db) == before
+    assert db.get(Department, a).parent_id is None
+
+
+def test_subtree_members_deduplicated(client, admin):
+    a = _create(client, admin, "A")
+    b = _create(client, admin, "B", a)
+    client.post(f"/departments/{a}/members", json={"user_ids": [2]}, headers=admin)
+    client.post(f"/departments/{b}/members", json={"user_ids": [1, 2]}, headers=admin)
+    r = client.get(f"/departments/{a}/subtree/members", headers=admin)
+    assert [u["id"] for u in r.json()] == [1, 2]
+    assert client.get("/departments/999/subtree", headers=admin).status_code == 404
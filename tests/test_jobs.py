@@ -0,0 +1,56 @@
+# tests/test_jobs.py
+import threading
+from datetime import datetime
+
+import pytest
+
+from app import models
+from app.db import SessionLocal
+from app.services.jobs import JobRunner, job_handler
+
+_started = threading.Event()
+
+
+@job_handler("test_wait_for_stop", max_concurrency=1)
+def _wait_for_stop(ctx, params):
+    _started.set()
+    while True:
+        ctx.progress(10.0)
+
+
+@pytest.fixture
+def runner(db, tmp_path):
+    r = JobRunner(workers=2, poll_interval=0.05, stale_seconds=60, max_attempts=3,
+                  files_dir=str(tmp_path), session_factory=SessionLocal)
+    yield r
+    r.stop(timeout=5)
+
+
+def _queue(db, n):
+    jobs = [models.Job(type="test_wait_for_stop", params={}, status="queued", progress=0.0, attempts=0,
+                       cancel_requested=False, created_at=datetime.utcnow()) for _ in range(n)]
+    db.add_all(jobs)
+    db.commit()
+    return [j.id for j in jobs]
+
+
+def test_claim_respects_type_concurrency(db, runner):
+    first, second = _queue(db, 2)
+    assert runner._claim_one()[0] == first
+    # 并发上限在认领 UPDATE 里判断：第一条仍在 running，第二条认领不到
+    assert runner._claim_one() is None
+    db.expire_all()
+    assert db.get(models.Job, second).status == "queued"
+
+
+def test_stop_requeues_running_job(db, runner):
+    _started.clear()
+    job_id = _queue(db, 1)[0]
+    runner.start()
+    assert _started.wait(5)
+    runner.stop(timeout=5)
+
+    db.expire_all()
+    job = db.get(models.Job, job_id)
+    assert (job.status, job.attempts, job.worker) == ("queued", 0, None)
+    assert job.message == "interrupted by shutdown"
@@ -0,0 +1,74 @@
+# tests/test_list_etags.py
+# 同一秒内的修改也必须让列表 ETag 失效（不能依赖 updated_at 的秒级精度）
+from app import models
+
+BODY = {"project_id": 1, "hours": 2, "note": "a"}
+
+
+def _etag(client, path, headers, **params):
+    r = client.get(path, params=params, headers=headers)
+    assert r.status_code == 200
+    return r.headers["etag"]
+
+
+def _still_fresh(client, path, headers, etag, **params):
+    return client.get(path, params=params, headers={**headers, "If-None-Match": etag}).status_code == 304
+
+
+def test_projects_etag_tracks_timesheet_moves(client, admin, employee):
+    other = client.post("/projects/", json={"name": "P2"}, headers=admin).json()["id"]
+    ts = client.post("/timesheets/", json=BODY, headers=employee).json()
+    etag = _etag(client, "/projects/", admin)
+    assert _still_fresh(client, "/projects/", admin, etag)
+
+    # 总数、max(id) 都不变，只是换了项目
+    client.put(f"/timesheets/{ts['id']}", json={**BODY, "project_id": other}, headers=employee)
+    assert not _still_fresh(client, "/projects/", admin, etag)
+    counts = {p["id"]: p["timesheet_count"] for p in client.get("/projects/", headers=admin).json()}
+    assert counts == {1: 0, other: 1}
+
+
+def test_timesheet_list_etag_tracks_updates(client, admin, employee):
+    ts = client.post("/timesheets/", json=BODY, headers=employee).json()
+    etag = _etag(client, "/timesheets/", employee)
+    client.put(f"/timesheets/{ts['id']}", json={**BODY, "hours": 3}, headers=employee)
+    assert not _still_fresh(client, "/timesheets/", employee, etag)
+
+    etag = _etag(client, "/timesheets/", employee)
+    client.post(f"/timesheets/{ts['id']}/approve", headers=admin)
+    assert not _still_fresh(client, "/timesheets/", employee, etag)
+
+
+def test_users_etag_tracks_updates_and_membership(client, admin):
+    etag = _etag(client, "/users/", admin)
+    assert _still_fresh(client, "/users/", admin, etag)
+    client.put("/users/2", json={"name": "renamed"}, headers=admin)
+    assert not _still_fresh(client, "/users/", admin, etag)
+
+    dept = client.post("/departments/", json={"name": "D2"}, headers=admin).json()["id"]
+    etag = _etag(client, "/users/", admin, department_id=dept)
+    client.post(f"/departments/{dept}/members", json={"user_ids": [2]}, headers=admin)
+    assert not _still_fresh(client, "/users/", admin, etag, department_id=dept)
+    assert [u["id"] for u in client.get("/users/", params={"department_id": dept}, headers=admin).json()] == [2]
+
+    etag = _etag(client, "/users/", admin, department_id=dept)
+    client.request("DELETE", f"/departments/{dept}/members", json={"user_ids": [2]}, headers=admin)
+    assert not _still_fresh(client, "/users/", admin, etag, department_id=dept)
+
+
+def test_users_version_bumps_after_commit_only(db):
+    from app import refcache
+    from app.db import SessionLocal
+    from app.services.users import USERS_VERSION
+
+    before = refcache.current_version(db, USERS_VERSION)
+    with SessionLocal() as s:
+        s.get(models.User, 2).name = "x"
+        s.flush()
+        s.rollback()
+    assert refcache.current_version(db, USERS_VERSION) == before
+
+    with SessionLocal() as s:
+        s.get(models.User, 2).name = "y"
+        s.commit()
+    assert refcache.current_version(db, USERS_VERSION) == before + 1
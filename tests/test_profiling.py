@@ -0,0 +1,37 @@
+# tests/test_profiling.py
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.profiling import ProfileMiddleware
+
+
+@pytest.fixture
+def profiled(db, tmp_path, monkeypatch):
+    # 默认配置不注册中间件，这里直接包一层
+    monkeypatch.setattr(settings, "profile_dir", str(tmp_path))
+    return TestClient(ProfileMiddleware(app)), tmp_path
+
+
+def test_non_admin_profile_header_ignored(profiled, employee):
+    client, profile_dir = profiled
+    r = client.get("/timesheets/", headers={**employee, "X-Profile": "1"})
+    assert r.status_code == 200
+    assert "x-profile-id" not in r.headers
+    assert os.listdir(profile_dir) == []
+
+    r = client.get("/timesheets/", headers={"X-Profile": "1", "Authorization": "Bearer bogus"})
+    assert "x-profile-id" not in r.headers
+    assert os.listdir(profile_dir) == []
+
+
+def test_admin_request_is_profiled(profiled, admin):
+    client, profile_dir = profiled
+    assert "x-profile-id" not in client.get("/timesheets/", headers=admin).headers
+
+    r = client.get("/timesheets/", headers={**admin, "X-Profile": "1"})
+    assert r.status_code == 200
+    assert os.listdir(profile_dir) == [f"{r.headers['x-profile-id']}.json"]
@@ -0,0 +1,46 @@
+# tests/test_ratelimit.py
+import pytest
+
+from app import ratelimit
+from app.config import settings
+from app.ratelimit import ConcurrencyLimiter, TokenBucketLimiter, per_worker, per_worker_count
+
+LOGIN = {"mobile": "13800000002", "password": "secret"}
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(settings, "ratelimit_enabled", True)
+    monkeypatch.setattr(ratelimit, "ip_limiter", TokenBucketLimiter(60, 100))
+    monkeypatch.setattr(ratelimit, "identity_limiter", TokenBucketLimiter(1, 1))
+    monkeypatch.setattr(ratelimit, "auth_slots", ConcurrencyLimiter(1))
+
+
+def test_identity_limit_returns_429_with_retry_after(client, limits):
+    assert client.post("/auth/login", json=LOGIN).status_code == 200
+    r = client.post("/auth/login", json=LOGIN)
+    assert r.status_code == 429
+    assert 1 <= int(r.headers["retry-after"]) <= 60
+    # 其它账号不受影响
+    assert client.post("/auth/login", json={"mobile": "13800000001", "password": "secret"}).status_code == 200
+
+
+def test_concurrency_limit_sheds_with_503(client, limits):
+    assert ratelimit.auth_slots.try_acquire()
+    try:
+        r = client.post("/auth/login", json=LOGIN)
+        assert r.status_code == 503
+        assert r.headers["retry-after"] == str(settings.auth_shed_retry_after)
+    finally:
+        ratelimit.auth_slots.release()
+    # 名额释放后恢复，且请求结束时会归还名额
+    assert client.post("/auth/login", json=LOGIN).status_code == 200
+    assert ratelimit.auth_slots.try_acquire()
+    ratelimit.auth_slots.release()
+
+
+def test_limits_split_across_workers():
+    assert per_worker(30, 4) == 7.5
+    assert per_worker_count(10, 4) == 3
+    assert per_worker_count(1, 4) == 1
+    assert per_worker_count(0, 4) == 0
@@ -0,0 +1,63 @@
+# tests/test_read_routing.py
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app import db as db_module
+from app.config import settings
+from app.db import STICKY_COOKIE, STICKY_HEADER, get_read_db
+
+
+@pytest.fixture
+def replica(monkeypatch, db, tmp_path):
+    """副本用另一个 SQLite 文件（只有一张标记表），按会话连到哪个库判断路由"""
+    from sqlalchemy import create_engine
+    engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE replica_marker (x INTEGER)"))
+    monkeypatch.setattr(db_module, "ReplicaSessionLocal", sessionmaker(bind=engine))
+    return engine
+
+
+class _Request:
+    def __init__(self, headers=None, cookies=None):
+        self.headers = headers or {}
+        self.cookies = cookies or {}
+
+
+def _routed_to_replica(request, primary) -> bool:
+    gen = get_read_db(request, primary)
+    session = next(gen)
+    try:
+        return session is not primary
+    finally:
+        gen.close()
+
+
+def test_routing(replica, db):
+    now = time.time()
+    assert _routed_to_replica(_Request(), db)
+    assert not _routed_to_replica(_Request(cookies={STICKY_COOKIE: str(now + 2)}), db)
+    assert not _routed_to_replica(_Request(headers={STICKY_HEADER: str(now + 2)}), db)
+    # 已过期 / 超出窗口长度（伪造的）/ 无法解析的都不算
+    assert _routed_to_replica(_Request(cookies={STICKY_COOKIE: str(now - 1)}), db)
+    assert _routed_to_replica(_Request(cookies={STICKY_COOKIE: str(now + 3600)}), db)
+    assert _routed_to_replica(_Request(cookies={STICKY_COOKIE: "x"}), db)
+
+
+def test_write_response_carries_deadline(replica, client, employee):
+    r = client.post("/timesheets/", json={"project_id": 1, "hours": 2}, headers=employee)
+    until = float(r.headers[STICKY_HEADER])
+    assert 0 < until - time.time() <= settings.read_your_writes_seconds
+    assert client.cookies.get(STICKY_COOKIE) == r.headers[STICKY_HEADER]
+
+    # 只读请求不续期
+    r = client.get("/projects/", headers={**employee, STICKY_HEADER: r.headers[STICKY_HEADER]})
+    assert STICKY_HEADER not in r.headers
+
+
+def test_no_deadline_without_replica(client, employee):
+    r = client.post("/timesheets/", json={"project_id": 1, "hours": 2}, headers=employee)
+    assert STICKY_HEADER not in r.headers
@@ -0,0 +1,25 @@
+# tests/test_readyz.py
+from app import warmup
+
+
+def test_readyz_503_until_warmed_up(client, monkeypatch):
+    # TestClient 未进入 lifespan：预热没有跑过
+    monkeypatch.setattr(warmup, "_ready", False)
+    r = client.get("/readyz")
+    assert r.status_code == 503
+    assert r.json()["status"] == "warming"
+    assert client.get("/healthz").status_code == 200
+
+    monkeypatch.setattr(warmup, "_ready", True)
+    r = client.get("/readyz")
+    assert r.status_code == 200
+    assert r.json()["status"] == "ready"
+    assert set(r.json()["db_ms"]) == {"primary"}
+
+
+def test_readyz_503_when_db_over_budget(client, monkeypatch):
+    monkeypatch.setattr(warmup, "_ready", True)
+    monkeypatch.setattr(warmup.settings, "readyz_db_budget_ms", -1.0)
+    r = client.get("/readyz")
+    assert r.status_code == 503
+    assert r.json()["status"] == "degraded"
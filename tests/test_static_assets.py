@@ -0,0 +1,54 @@
+# tests/test_static_assets.py
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from app.static_assets import IMMUTABLE, REVALIDATE, AssetStaticFiles, build
+
+CSS = "body { background: url(img/logo.png); }\n" + "/* padding */\n" * 40
+
+
+@pytest.fixture
+def built(tmp_path):
+    src, out = tmp_path / "src", tmp_path / "out"
+    (src / "img").mkdir(parents=True)
+    (src / "img" / "logo.png").write_bytes(b"\x89PNG fake")
+    (src / "app.css").write_text(CSS)
+    (src / "index.html").write_text('<link href="/static/app.css"><img src="img/logo.png">')
+    manifest = build(str(src), str(out), "/static")
+    app = Starlette(routes=[Mount("/static", AssetStaticFiles(directory=str(out)))])
+    return manifest, TestClient(app)
+
+
+def test_build_fingerprints_and_rewrites(built):
+    manifest, client = built
+    css, logo = manifest["assets"]["app.css"], manifest["assets"]["img/logo.png"]
+    assert css != "app.css" and logo != "img/logo.png"
+    assert manifest["files"]["index.html"]["immutable"] is False
+    assert "gzip" in manifest["files"][css]["encodings"]
+
+    html = client.get("/static/index.html").text
+    assert f'href="/static/{css}"' in html and f'src="{logo}"' in html
+    assert f"url({logo})" in client.get(f"/static/{css}").text
+
+
+def test_fingerprinted_files_are_immutable(built):
+    manifest, client = built
+    css = manifest["assets"]["app.css"]
+    r = client.get(f"/static/{css}", headers={"Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["cache-control"] == IMMUTABLE
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.text == CSS.replace("img/logo.png", manifest["assets"]["img/logo.png"])
+    assert r.headers["vary"] == "Accept-Encoding"
+
+
+def test_html_revalidates_with_304(built):
+    manifest, client = built
+    r = client.get("/static/index.html")
+    assert r.headers["cache-control"] == REVALIDATE
+    assert r.headers["etag"] == f'"{manifest["files"]["index.html"]["hash"]}"'
+    again = client.get("/static/index.html", headers={"If-None-Match": r.headers["etag"]})
+    assert again.status_code == 304
+    assert again.content == b""
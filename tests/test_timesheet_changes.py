@@ -0,0 +1,56 @@
+# tests/test_timesheet_changes.py
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from app import models
+
+
+def _changes(client, headers, since=None):
+    params = {"since": since} if since else {}
+    r = client.get("/timesheets/changes", params=params, headers=headers)
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_changes_report_updates_and_deletes(client, admin, employee):
+    first = client.post("/timesheets/", json={"project_id": 1, "hours": 2, "note": "a"}, headers=employee).json()
+    second = client.post("/timesheets/", json={"project_id": 1, "hours": 3}, headers=employee).json()
+    page = _changes(client, employee)
+    assert [i["id"] for i in page["items"]] == [first["id"], second["id"]]
+    token = page["next_token"]
+
+    assert _changes(client, employee, token)["items"] == []
+
+    # 只改明细也要换新序号
+    client.put(f"/timesheets/{first['id']}", json={"project_id": 1, "hours": 2, "note": "b"}, headers=employee)
+    client.delete(f"/timesheets/{second['id']}", headers=employee)
+    page = _changes(client, employee, token)
+    assert [(i["id"], i["note"]) for i in page["items"]] == [(first["id"], "b")]
+    assert page["deleted"] == [second["id"]]
+
+
+def test_changes_stop_at_pending_transaction(client, db, employee):
+    first = client.post("/timesheets/", json={"project_id": 1, "hours": 1}, headers=employee).json()
+    # 模拟一个已取号、尚未提交的事务
+    pending = db.execute(
+        insert(models.timesheet_change_seq).values(created_at=datetime.utcnow())
+    ).inserted_primary_key[0]
+    db.commit()
+    later = client.post("/timesheets/", json={"project_id": 1, "hours": 1}, headers=employee).json()
+
+    page = _changes(client, employee)
+    assert [i["id"] for i in page["items"]] == [first["id"]]
+
+    db.execute(models.timesheet_change_seq.delete().where(models.timesheet_change_seq.c.seq == pending))
+    db.commit()
+    page = _changes(client, employee, page["next_token"])
+    assert [i["id"] for i in page["items"]] == [later["id"]]
+
+
+def test_allocation_rows_do_not_accumulate(client, db, employee):
+    for _ in range(3):
+        client.post("/timesheets/", json={"project_id": 1, "hours": 1}, headers=employee)
+    assert db.execute(select(models.timesheet_change_seq.c.seq)).all() == []
+    seqs = db.execute(select(models.Timesheet.change_seq).order_by(models.Timesheet.id)).scalars().all()
+    assert seqs == sorted(seqs) and len(set(seqs)) == 3
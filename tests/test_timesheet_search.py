@@ -0,0 +1,13 @@
+# tests/test_timesheet_search.py
+def _search(client, headers, q):
+    return client.get("/timesheets/search", params={"q": q}, headers=headers)
+
+
+def test_single_character_words_are_ignored(client, employee):
+    ts = client.post("/timesheets/", json={"project_id": 1, "hours": 2, "note": "接口联调 审批流程"},
+                     headers=employee).json()
+
+    assert [h["id"] for h in _search(client, employee, "审批").json()] == [ts["id"]]
+    # 单字词不参与匹配，不会把整个查询变成空结果
+    assert [h["id"] for h in _search(client, employee, "审批 流 x").json()] == [ts["id"]]
+    assert _search(client, employee, "审 x").status_code == 400
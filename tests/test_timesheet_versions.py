@@ -0,0 +1,63 @@
+# tests/test_timesheet_versions.py
+import pytest
+from fastapi import HTTPException
+
+from app import models
+from app.db import SessionLocal
+from app.routers.timesheets import _commit_versioned
+
+BODY = {"project_id": 1, "hours": 2, "note": "a"}
+
+
+@pytest.fixture
+def ts(client, employee):
+    return client.post("/timesheets/", json=BODY, headers=employee).json()
+
+
+def test_update_bumps_version_and_returns_etag(client, employee, ts):
+    assert ts["version"] == 1
+    r = client.put(f"/timesheets/{ts['id']}", json={**BODY, "hours": 3}, headers={**employee, "If-Match": '"1"'})
+    assert r.status_code == 200
+    assert r.json()["version"] == 2
+    assert r.headers["etag"] == '"2"'
+
+
+def test_stale_if_match_returns_412_with_current_state(client, employee, ts):
+    client.put(f"/timesheets/{ts['id']}", json={**BODY, "hours": 3}, headers=employee)
+    r = client.put(f"/timesheets/{ts['id']}", json={**BODY, "hours": 5}, headers={**employee, "If-Match": '"1"'})
+    assert r.status_code == 412
+    assert r.json()["detail"]["current"]["hours"] == 3
+    assert r.headers["etag"] == '"2"'
+
+
+def test_approve_and_delete_honour_if_match(client, admin, employee, ts):
+    assert client.post(f"/timesheets/{ts['id']}/approve", headers={**admin, "If-Match": '"9"'}).status_code == 412
+    r = client.post(f"/timesheets/{ts['id']}/approve", headers={**admin, "If-Match": '"1"'})
+    assert r.json() == {"ok": True, "version": 2}
+    assert client.delete(f"/timesheets/{ts['id']}", headers={**employee, "If-Match": '"1"'}).status_code == 412
+    assert client.delete(f"/timesheets/{ts['id']}", headers={**employee, "If-Match": '"2"'}).status_code == 200
+
+
+def test_concurrent_write_loses_with_409(ts):
+    mine, theirs = SessionLocal(), SessionLocal()
+    try:
+        row = mine.get(models.Timesheet, ts["id"])
+        other = theirs.get(models.Timesheet, ts["id"])
+        other.hours = 9
+        theirs.commit()
+
+        row.status = "rejected"
+        with pytest.raises(HTTPException) as exc:
+            _commit_versioned(mine, ts["id"])
+        assert exc.value.status_code == 409
+        assert exc.value.detail["current"]["hours"] == 9
+        assert exc.value.detail["current"]["version"] == 2
+    finally:
+        mine.close()
+        theirs.close()
+
+
+def test_bulk_approve_bumps_version(client, admin, ts):
+    client.post("/timesheets/bulk_approve", headers=admin)
+    items = client.get("/timesheets/", headers=admin).json()["items"]
+    assert [(i["status"], i["version"]) for i in items] == [("approved", 2)]
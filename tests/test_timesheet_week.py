@@ -0,0 +1,73 @@
+# tests/test_timesheet_week.py
+from sqlalchemy import event
+
+from app.db import engine
+
+WEEK = "2026-W42"
+
+
+def entry(**kw):
+    return {"project_id": 1, "hours": 8, **kw}
+
+
+def put_week(client, headers, entries):
+    return client.put(f"/timesheets/week/{WEEK}", json=entries, headers=headers)
+
+
+def counts(body):
+    return {k: body[k] for k in ("inserted", "updated", "deleted", "unchanged")}
+
+
+def test_week_diff_counts(client, employee):
+    r = put_week(client, employee, [entry(note="mon"), entry(note="tue"), entry(note="wed")])
+    assert r.status_code == 200
+    mon, tue, wed = r.json()["items"]
+    assert counts(r.json()) == {"inserted": 3, "updated": 0, "deleted": 0, "unchanged": 0}
+
+    r = put_week(client, employee, [
+        entry(id=mon["id"], note="mon"),
+        entry(id=tue["id"], note="TUE", hours=7),
+        entry(note="thu"),
+    ])
+    body = r.json()
+    assert counts(body) == {"inserted": 1, "updated": 1, "deleted": 1, "unchanged": 1}
+    by_id = {i["id"]: i for i in body["items"]}
+    assert wed["id"] not in by_id
+    assert by_id[mon["id"]]["version"] == mon["version"]
+    assert (by_id[tue["id"]]["note"], by_id[tue["id"]]["hours"]) == ("TUE", 7)
+
+
+def test_unchanged_week_issues_no_writes(client, employee):
+    items = put_week(client, employee, [entry(note="a"), entry(note="b")]).json()["items"]
+    writes = []
+
+    def record(conn, cursor, statement, *args):
+        if statement.split()[0] in ("INSERT", "UPDATE", "DELETE"):
+            writes.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        r = put_week(client, employee, [entry(id=i["id"], note=i["note"]) for i in items])
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert counts(r.json()) == {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 2}
+    assert writes == []
+
+
+def test_approved_rows_are_locked(client, admin, employee):
+    ts = put_week(client, employee, [entry(note="a")]).json()["items"][0]
+    client.post(f"/timesheets/{ts['id']}/approve", headers=admin)
+
+    assert put_week(client, employee, [entry(id=ts["id"], note="changed")]).status_code == 403
+    body = put_week(client, employee, []).json()
+    assert body["deleted"] == 0
+    assert [i["status"] for i in body["items"]] == ["approved"]
+
+
+def test_rejects_foreign_ids_and_stale_versions(client, admin, employee):
+    other = client.post("/timesheets/", json=entry(week_no=WEEK), headers=admin).json()
+    assert put_week(client, employee, [entry(id=other["id"])]).status_code == 400
+
+    ts = put_week(client, employee, [entry(note="a")]).json()["items"][0]
+    assert put_week(client, employee, [entry(id=ts["id"], note="a", version=ts["version"] + 1)]).status_code == 409
+    assert put_week(client, employee, [entry(id=ts["id"]), entry(id=ts["id"])]).status_code == 400
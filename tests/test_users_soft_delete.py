@@ -0,0 +1,75 @@
+# tests/test_users_soft_delete.py
+from sqlalchemy import func, select
+
+from app import models
+from app.config import settings
+
+
+def _add_timesheets(db, user_id, n):
+    for i in range(n):
+        db.add(models.Timesheet(user_id=user_id, project_id=1, hours=1 + i, note=f"n{i}", status="approved"))
+    db.commit()
+
+
+def test_soft_delete_hides_user_and_keeps_timesheets(client, db, admin, employee):
+    _add_timesheets(db, 2, 2)
+    assert client.delete("/users/2", headers=admin).status_code == 204
+
+    assert [u["id"] for u in client.get("/users/", headers=admin).json()] == [1]
+    assert client.get("/users/2", headers=admin).status_code == 404
+    assert [u["id"] for u in client.get("/users/batch", params={"ids": "1,2"}, headers=admin).json()] == [1]
+    assert client.get("/auth/me", headers=employee).status_code == 401
+    assert client.post("/auth/login", json={"mobile": "13800000002", "password": "secret"}).status_code == 400
+    assert [r["user_id"] for r in client.get("/reports/approved_hours", headers=admin).json()] == [1]
+    assert client.get("/timesheets/counts", headers=admin).json() == []
+
+    db.expire_all()
+    kept = db.execute(select(func.count(models.Timesheet.id)).where(models.Timesheet.user_id == 2)).scalar()
+    assert kept == 2
+
+
+def test_status_endpoints_do_not_revive_deleted_user(client, db, admin, employee):
+    client.delete("/users/2", headers=admin)
+    for path in ("/users/2/approve", "/users/2/reject", "/users/2/suspend"):
+        assert client.post(path, headers=admin).status_code == 404
+    assert client.patch("/users/2/status", json={"status": "approved"}, headers=admin).status_code == 404
+
+    # 即使有人直接改了状态标记，已删除账号的旧 token 也不能再用
+    user = db.get(models.User, 2)
+    db.refresh(user)
+    user.is_active = True
+    user.status = "approved"
+    db.commit()
+    assert client.get("/auth/me", headers=employee).status_code == 401
+
+
+def test_restore(client, db, admin, employee):
+    client.delete("/users/2", headers=admin)
+    r = client.post("/users/2/restore", headers=admin)
+    assert r.status_code == 200
+    assert client.get("/auth/me", headers=employee).status_code == 200
+    assert client.post("/users/2/restore", headers=admin).status_code == 404
+
+
+def test_purge_inline_removes_user_timesheets_and_details(client, db, admin):
+    _add_timesheets(db, 2, 3)
+    assert client.delete("/users/2", params={"purge": True}, headers=admin).status_code == 204
+
+    db.expire_all()
+    assert db.get(models.User, 2) is None
+    assert db.execute(select(func.count(models.Timesheet.id))).scalar() == 0
+    assert db.execute(select(func.count(models.TimesheetDetail.timesheet_id))).scalar() == 0
+    tombstones = db.execute(select(models.TimesheetTombstone.timesheet_id)).scalars().all()
+    assert len(tombstones) == 3
+
+
+def test_purge_large_user_goes_to_background_job(client, db, admin, monkeypatch):
+    _add_timesheets(db, 2, 3)
+    monkeypatch.setattr(settings, "user_purge_batch", 2)
+    r = client.delete("/users/2", params={"purge": True}, headers=admin)
+    assert r.status_code == 202
+
+    db.expire_all()
+    job = db.get(models.Job, r.json()["job_id"])
+    assert job.type == "purge_deleted_users"
+    assert db.get(models.User, 2).deleted_at is not None